@@ -0,0 +1,166 @@
+# rynek_syntetyczny.py
+import os
+import sys
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+# Stała data końcowa – te same parametry zawsze dają te same dane
+END_DATE = "2025-06-30"
+
+
+class SyntheticMarket:
+    # Deterministyczny rynek N tickerów × M sesji: notowania OHLCV generowane naraz
+    # dla całego panelu, słowniki .info i sprawozdania finansowe na żądanie.
+
+    def __init__(self, n_tickers, days=260, seed=0):
+        self.tickers = [f"S{i:05d}.WA" for i in range(n_tickers)]
+        self.columns = {ticker: i for i, ticker in enumerate(self.tickers)}
+        self.days = days
+        self.seed = seed
+        rng = np.random.default_rng(seed)
+        self.dates = pd.bdate_range(end=END_DATE, periods=days)
+
+        drift = rng.normal(0.0003, 0.0005, n_tickers)
+        vol = rng.uniform(0.01, 0.04, n_tickers)
+        returns = rng.standard_normal((days, n_tickers)) * vol + drift
+        close = rng.uniform(5, 500, n_tickers) * np.exp(np.cumsum(returns, axis=0))
+        spread = np.abs(rng.standard_normal((days, n_tickers))) * vol / 2
+        self.fields = {
+            "Open": close * (1 + rng.standard_normal((days, n_tickers)) * vol / 4),
+            "High": close * (1 + spread),
+            "Low": close * (1 - spread),
+            "Close": close,
+            "Volume": rng.integers(1_000, 2_000_000, (days, n_tickers)).astype(float),
+        }
+
+    def _rng(self, ticker, salt):
+        return np.random.default_rng([self.seed, self.columns[ticker], salt])
+
+    def history(self, ticker, period=None):
+        import dostawca_danych
+
+        i = self.columns.get(ticker)
+        if i is None:
+            return pd.DataFrame(columns=list(self.fields))
+        hist = pd.DataFrame({field: values[:, i] for field, values in self.fields.items()}, index=self.dates)
+        return dostawca_danych.slice_period(hist, period) if period else hist
+
+    def download(self, tickers, period=None):
+        import dostawca_danych
+
+        idx = [self.columns[t] for t in tickers if t in self.columns]
+        names = [t for t in tickers if t in self.columns]
+        frames = {field: pd.DataFrame(values[:, idx], index=self.dates, columns=names)
+                  for field, values in self.fields.items()}
+        data = pd.concat(frames, axis=1)
+        return dostawca_danych.slice_period(data, period) if period else data
+
+    def info(self, ticker):
+        # Te same pola i rozkłady co dostawca_danych.FakeProvider
+        import dostawca_danych
+
+        price = float(self.fields["Close"][-1, self.columns[ticker]])
+        return dostawca_danych.synthetic_info(ticker, price, self._rng(ticker, 1))
+
+    def statements(self, ticker):
+        import dostawca_danych
+
+        periods = pd.to_datetime([f"{pd.Timestamp(END_DATE).year - i - 1}-12-31" for i in range(4)])
+        return dostawca_danych.synthetic_statements(self._rng(ticker, 2), periods)
+
+    def merged_frame(self):
+        # Ramka w układzie scalona_ocena (fundamenty + technika + Target) do pomiaru
+        # punktacji, walidacji, modelu i eksportu bez pobierania danych
+        import schemat_danych
+
+        rng = np.random.default_rng([self.seed, 3])
+        n = len(self.tickers)
+        close = self.fields["Close"][-1]
+        df = pd.DataFrame({
+            "Date": pd.Timestamp(END_DATE),
+            "Company": [f"{t} S.A." for t in self.tickers],
+            "Ticker": self.tickers,
+            "Price": close.round(2),
+        })
+        for column, kind in schemat_danych.MERGED_SCHEMA.items():
+            if kind == "float" and column not in df:
+                df[column] = rng.normal(20, 15, n).round(2)
+        df["P/E"] = rng.uniform(-5, 60, n).round(2)
+        df["Debt/Assets"] = rng.uniform(0, 1.8, n).round(2)
+        df["ROE (%)"] = rng.uniform(-30, 40, n).round(2)
+        df["RSI"] = rng.uniform(5, 95, n).round(2)
+        df["Strefa"] = rng.choice(schemat_danych.CATEGORIES["Strefa"], n)
+        df["EMA Crossover"] = rng.choice(schemat_danych.CATEGORIES["EMA Crossover"], n)
+        df["Error"] = np.nan
+        # ok. 3% braków, jak przy niepełnych danych z yfinance
+        for column in ["PEG", "EV/FCF", "Beta", "Dividend Yield (%)"]:
+            df.loc[rng.random(n) < 0.03, column] = np.nan
+        df["Target (6m +10%)"] = (rng.random(n) < 0.4).astype(float)
+        return schemat_danych.apply_schema(df, schemat_danych.MERGED_SCHEMA)
+
+
+class FakeTicker:
+    # Zamiennik yf.Ticker – te same atrybuty, dane z SyntheticMarket
+
+    def __init__(self, market, ticker):
+        self._market = market
+        self.ticker = ticker
+
+    @property
+    def info(self):
+        return self._market.info(self.ticker)
+
+    @property
+    def financials(self):
+        return self._market.statements(self.ticker)[0]
+
+    @property
+    def balance_sheet(self):
+        return self._market.statements(self.ticker)[1]
+
+    @property
+    def fast_info(self):
+        hist = self._market.history(self.ticker)
+        return {"lastPrice": float(hist["Close"].iloc[-1]), "lastVolume": float(hist["Volume"].iloc[-1])}
+
+    def history(self, period="1mo", **kwargs):
+        return self._market.history(self.ticker, period)
+
+
+class FakeYFinance:
+    # Zamiennik modułu yfinance (Ticker, download) dla YFinanceProvider
+
+    def __init__(self, market):
+        self.market = market
+
+    def Ticker(self, ticker):
+        return FakeTicker(self.market, ticker)
+
+    def download(self, tickers, period="1mo", **kwargs):
+        if isinstance(tickers, str):
+            tickers = tickers.split()
+        return self.market.download(list(tickers), period)
+
+
+@contextmanager
+def fake_yfinance(market):
+    # Podmienia yfinance w sys.modules i ustawia YFinanceProvider bez cache,
+    # więc mierzony jest ten sam kod, który działa na prawdziwych danych
+    import dostawca_danych
+
+    previous_module = sys.modules.get("yfinance")
+    previous_provider = dostawca_danych._provider
+    sys.modules["yfinance"] = FakeYFinance(market)
+    dostawca_danych.set_provider(dostawca_danych.YFinanceProvider())
+    try:
+        yield market
+    finally:
+        if previous_module is None:
+            sys.modules.pop("yfinance", None)
+        else:
+            sys.modules["yfinance"] = previous_module
+        dostawca_danych.set_provider(previous_provider)
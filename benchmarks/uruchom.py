@@ -0,0 +1,228 @@
+# uruchom.py
+import argparse
+import contextlib
+import gc
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+from rynek_syntetyczny import SyntheticMarket, fake_yfinance
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+RESULTS_DIR = os.path.join(BENCH_DIR, "wyniki")
+SIZES = [10, 100, 1000, 10000]
+
+# name -> (fabryka zwracająca mierzoną funkcję, maksymalna liczba tickerów bez --full)
+BENCHMARKS = {}
+
+
+def benchmark(name, max_tickers=None):
+    def register(factory):
+        BENCHMARKS[name] = (factory, max_tickers)
+        return factory
+    return register
+
+
+@benchmark("fetch_technical_signals", max_tickers=1000)
+def _fetch_technical(market):
+    # Pętla po tickerach: osobna historia i wskaźniki dla każdego
+    import analiza_techniczna
+    return lambda: [analiza_techniczna.fetch_technical_signals(t) for t in market.tickers]
+
+
+@benchmark("technical_signals_panel")
+def _technical_panel(market):
+    # Jeden panel i wskaźniki liczone naraz (ścieżka analyze_many)
+    import panel_cenowy
+    import wskazniki_wektorowe
+
+    def run():
+        panel = panel_cenowy.load_price_panel(market.tickers)
+        return wskazniki_wektorowe.technical_signals(panel, market.tickers, period="6mo")
+    return run
+
+
+@benchmark("analyze_advanced_signals", max_tickers=1000)
+def _advanced(market):
+    import advanced_tech_analysis
+    return lambda: [advanced_tech_analysis.analyze_advanced_signals(t) for t in market.tickers]
+
+
+@benchmark("analyze_company", max_tickers=1000)
+def _company(market):
+    import analiza_fundamentalna
+    return lambda: [analiza_fundamentalna.analyze_company(t) for t in market.tickers]
+
+
+@benchmark("score_frame")
+def _score(market):
+    # Następca score_company/df.apply: punktacja i klasyfikacje z tabeli reguł
+    import scalona_ocena
+
+    df = market.merged_frame()
+    return lambda: scalona_ocena.score(df.copy())
+
+
+@benchmark("validate_data")
+def _validate(market):
+    import walidacja_danych
+
+    df = market.merged_frame()
+    return lambda: walidacja_danych.validate_data(df.copy())
+
+
+@benchmark("train_model")
+def _train(market):
+    # Rejestr modeli czyścimy przy każdym powtórzeniu, żeby mierzyć uczenie, a nie odczyt
+    import rejestr_modeli
+    import scalona_ocena
+
+    df = market.merged_frame()
+
+    def run():
+        shutil.rmtree(rejestr_modeli.MODEL_DIR, ignore_errors=True)
+        return scalona_ocena.train_model(df.copy(), scalona_ocena.FEATURES)
+    return run
+
+
+@benchmark("write_report", max_tickers=10000)
+def _report(market):
+    # Następca format_excel_file/add_legend_sheet: eksport w jednym przebiegu
+    import eksport_excel
+    import scalona_ocena
+
+    df = scalona_ocena.score(market.merged_frame())
+    return lambda: eksport_excel.write_report(df, os.path.join("..", "data", "raport.xlsx"))
+
+
+@benchmark("rolling_rebalance", max_tickers=500)
+def _rolling(market):
+    # Rebalansowanie miesięczne przez 10 lat (ok. 108 optymalizacji) – historia dłuższa niż --days
+    import konstrukcja_portfela as kp
+
+    years = SyntheticMarket(len(market.tickers), days=10 * kp.TRADING_DAYS, seed=market.seed)
+    returns = years.download(years.tickers)["Close"].pct_change().iloc[1:]
+    return lambda: kp.rolling_rebalance(returns, "min_var")
+
+
+def _measure(func, repeat):
+    wall, cpu = [], []
+    with open(os.devnull, "w") as devnull:
+        for _ in range(repeat):
+            gc.collect()
+            start_wall, start_cpu = time.perf_counter(), time.process_time()
+            with contextlib.redirect_stdout(devnull):
+                func()
+            wall.append(time.perf_counter() - start_wall)
+            cpu.append(time.process_time() - start_cpu)
+    return wall, cpu
+
+
+def _meta(args):
+    import numpy
+    import pandas
+    import sklearn
+
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BENCH_DIR,
+                                capture_output=True, text=True).stdout.strip()
+    except OSError:
+        commit = None
+    return {
+        "date": datetime.now().isoformat(timespec="seconds"),
+        "commit": commit or None,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "numpy": numpy.__version__,
+        "pandas": pandas.__version__,
+        "sklearn": sklearn.__version__,
+        "days": args.days,
+        "repeat": args.repeat,
+    }
+
+
+def run_benchmarks(sizes=SIZES, days=260, repeat=3, only=None, full=False):
+    results = []
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp:
+        # Moduły zapisują do ../data – w katalogu tymczasowym nie nadpiszemy prawdziwych plików
+        os.makedirs(os.path.join(tmp, "src"))
+        os.makedirs(os.path.join(tmp, "data"))
+        os.chdir(os.path.join(tmp, "src"))
+        try:
+            for n in sizes:
+                market = SyntheticMarket(n, days)
+                with fake_yfinance(market):
+                    for name, (factory, max_tickers) in BENCHMARKS.items():
+                        if only and name not in only:
+                            continue
+                        if max_tickers and n > max_tickers and not full:
+                            print(f"{name:28} {n:>6}  pominięto (limit {max_tickers}, użyj --full)")
+                            continue
+                        wall, cpu = _measure(factory(market), repeat)
+                        row = {
+                            "benchmark": name,
+                            "tickers": n,
+                            "seconds_min": round(min(wall), 4),
+                            "seconds_median": round(statistics.median(wall), 4),
+                            "cpu_seconds_median": round(statistics.median(cpu), 4),
+                            "per_ticker_ms": round(min(wall) / n * 1000, 4),
+                        }
+                        results.append(row)
+                        print(f"{name:28} {n:>6}  {row['seconds_min']:>9.3f} s  {row['per_ticker_ms']:>9.3f} ms/ticker")
+        finally:
+            os.chdir(cwd)
+    return results
+
+
+def compare(results, previous_path, threshold=1.2):
+    # Porównanie z wcześniejszym plikiem wyników; wolniej o > threshold oznacza regresję
+    with open(previous_path, encoding="utf-8") as f:
+        previous = {(r["benchmark"], r["tickers"]): r for r in json.load(f)["results"]}
+    regressions = 0
+    print(f"\nPorównanie z {previous_path}:")
+    for row in results:
+        old = previous.get((row["benchmark"], row["tickers"]))
+        if old is None:
+            continue
+        ratio = row["seconds_min"] / old["seconds_min"] if old["seconds_min"] else float("inf")
+        flag = "  ⚠️ wolniej" if ratio > threshold else ""
+        regressions += ratio > threshold
+        print(f"{row['benchmark']:28} {row['tickers']:>6}  {old['seconds_min']:>9.3f} -> {row['seconds_min']:>9.3f} s"
+              f"  x{ratio:.2f}{flag}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Pomiary wydajności na syntetycznym rynku")
+    parser.add_argument("--sizes", type=int, nargs="+", default=SIZES, help="liczby tickerów")
+    parser.add_argument("--days", type=int, default=260, help="liczba sesji w historii")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--only", nargs="+", choices=sorted(BENCHMARKS), help="wybrane pomiary")
+    parser.add_argument("--full", action="store_true", help="bez limitów tickerów dla wolnych pętli")
+    parser.add_argument("--output", help="plik JSON z wynikami (domyślnie wyniki/<data>.json)")
+    parser.add_argument("--compare", help="wcześniejszy plik JSON do porównania")
+    args = parser.parse_args(argv)
+
+    results = run_benchmarks(args.sizes, args.days, args.repeat, args.only, args.full)
+    output = args.output or os.path.join(RESULTS_DIR, datetime.now().strftime("%Y%m%d-%H%M%S") + ".json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump({"meta": _meta(args), "results": results}, f, ensure_ascii=False, indent=2)
+    print(f"\nZapisano wyniki do: {output}")
+
+    if args.compare:
+        return 1 if compare(results, args.compare) else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
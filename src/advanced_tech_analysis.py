@@ -1,11 +1,14 @@
 # advanced_tech_analysis.py
-import yfinance as yf
 import pandas as pd
+import dostawca_danych
+import stan_wskaznikow
+import instrumentacja
 
-def analyze_advanced_signals(ticker):
-    stock = yf.Ticker(ticker)
+@instrumentacja.traced("analyze_advanced_signals", "ticker", ticker_arg=True)
+def analyze_advanced_signals(ticker, hist=None):
     try:
-        hist = stock.history(period="3mo")  # 3 miesiące
+        if hist is None:
+            hist = dostawca_danych.get_provider().history(ticker, "3mo")  # 3 miesiące
         if hist.empty:
             return {
                 "Swing High (%)": "N/A",
@@ -50,3 +53,8 @@ def analyze_advanced_signals(ticker):
             "EMA12/26": "N/A",
             "VWAP Diff (%)": "N/A"
         }
+
+def analyze_advanced_incremental(tickers, state_path=stan_wskaznikow.STATE_PATH):
+    # Sygnały z zapisanego stanu – bez pobierania pełnej historii
+    states = stan_wskaznikow.refresh_states(tickers, state_path)
+    return {ticker: states[ticker].advanced_signals() for ticker in tickers}
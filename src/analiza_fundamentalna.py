@@ -1,31 +1,44 @@
 # analiza_fundamentalna.py
-import yfinance as yf
-import csv
-import os
 from datetime import datetime
+import numpy as np
+import pandas as pd
+import dostawca_danych
+import pobieranie_rownolegle
+import schemat_danych
+import magazyn_migawek
+import instrumentacja
 
-def fetch_financial_details(ticker):
-    stock = yf.Ticker(ticker)
+FINANCIAL_FIELDS = [
+    "EBIT", "Interest Expense", "Total Assets", "Total Debt",
+    "Interest Coverage", "Debt/Assets", "EPS Growth (%)", "Revenue Growth (%)",
+]
+
+def _percent(value):
+    return round(value * 100, 2) if value else np.nan
+
+@instrumentacja.traced("fetch_financial_details", "ticker", ticker_arg=True)
+def fetch_financial_details(ticker, info=None):
+    provider = dostawca_danych.get_provider()
     try:
-        fin = stock.financials
-        bs = stock.balance_sheet
-        info = stock.info
+        fin = provider.financials(ticker)
+        bs = provider.balance_sheet(ticker)
+        info = info if info is not None else provider.info(ticker)
 
-        ebit = fin.loc["EBIT"].iloc[0] if "EBIT" in fin.index else "N/A"
-        interest_expense = fin.loc["Interest Expense"].iloc[0] if "Interest Expense" in fin.index else "N/A"
-        total_assets = bs.loc["Total Assets"].iloc[0] if "Total Assets" in bs.index else "N/A"
-        total_debt = bs.loc["Total Debt"].iloc[0] if "Total Debt" in bs.index else "N/A"
+        ebit = fin.loc["EBIT"].iloc[0] if "EBIT" in fin.index else np.nan
+        interest_expense = fin.loc["Interest Expense"].iloc[0] if "Interest Expense" in fin.index else np.nan
+        total_assets = bs.loc["Total Assets"].iloc[0] if "Total Assets" in bs.index else np.nan
+        total_debt = bs.loc["Total Debt"].iloc[0] if "Total Debt" in bs.index else np.nan
 
-        interest_coverage = round(ebit / abs(interest_expense), 2) if ebit != "N/A" and interest_expense != "N/A" and interest_expense != 0 else "N/A"
-        debt_to_assets = round(total_debt / total_assets, 2) if total_debt != "N/A" and total_assets != "N/A" and total_assets != 0 else "N/A"
+        interest_coverage = round(ebit / abs(interest_expense), 2) if pd.notna(ebit) and pd.notna(interest_expense) and interest_expense != 0 else np.nan
+        debt_to_assets = round(total_debt / total_assets, 2) if pd.notna(total_debt) and pd.notna(total_assets) and total_assets != 0 else np.nan
 
         eps_ttm = info.get("trailingEps")
         eps_forward = info.get("forwardEps")
-        eps_growth = round((eps_ttm - eps_forward) / abs(eps_forward) * 100, 2) if eps_ttm and eps_forward != 0 else "N/A"
+        eps_growth = round((eps_ttm - eps_forward) / abs(eps_forward) * 100, 2) if eps_ttm and eps_forward != 0 else np.nan
 
         revenue_ttm = info.get("totalRevenue")
-        previous_year_revenue = stock.financials.loc["Total Revenue"].iloc[1] if "Total Revenue" in stock.financials.index and stock.financials.shape[1] > 1 else None
-        revenue_growth = str(round((revenue_ttm - previous_year_revenue) / abs(previous_year_revenue) * 100, 2)) if revenue_ttm and previous_year_revenue else "N/A"
+        previous_year_revenue = fin.loc["Total Revenue"].iloc[1] if "Total Revenue" in fin.index and fin.shape[1] > 1 else None
+        revenue_growth = round((revenue_ttm - previous_year_revenue) / abs(previous_year_revenue) * 100, 2) if revenue_ttm and previous_year_revenue else np.nan
 
         return {
             "EBIT": ebit,
@@ -38,64 +51,79 @@ def fetch_financial_details(ticker):
             "Revenue Growth (%)": revenue_growth
         }
 
-    except Exception:
-        return {
-            "EBIT": "N/A",
-            "Interest Expense": "N/A",
-            "Total Assets": "N/A",
-            "Total Debt": "N/A",
-            "Interest Coverage": "N/A",
-            "Debt/Assets": "N/A",
-            "EPS Growth (%)": "N/A",
-            "Revenue Growth (%)": "N/A",
-        }
+    except Exception as e:
+        # Błąd sieci lub limitu zapytań wraca do FetchEngine, który ponawia cały ticker;
+        # niekompletne sprawozdanie to brak danych
+        if pobieranie_rownolegle.is_transient(e):
+            raise
+        return {field: np.nan for field in FINANCIAL_FIELDS}
+
+@instrumentacja.traced("analyze_company", "ticker", ticker_arg=True)
+def analyze_company(ticker):
+    info = dostawca_danych.get_provider().info(ticker)
+    financials = fetch_financial_details(ticker, info)
+    enterprise_value = info.get("enterpriseValue")
+    free_cashflow = info.get("freeCashflow")
+
+    data = {
+        "Date": datetime.today().strftime('%Y-%m-%d'),
+        "Company": info.get("longName", "N/A"),
+        "Ticker": ticker,
+        "Price": info.get("currentPrice", np.nan),
+        "P/E": info.get("trailingPE", np.nan),
+        "PEG": info.get("pegRatio", np.nan),
+        "Price/Sales": info.get("priceToSalesTrailing12Months", np.nan),
+        "Price/Book": info.get("priceToBook", np.nan),
+        "ROE (%)": _percent(info.get("returnOnEquity")),
+        "ROA (%)": _percent(info.get("returnOnAssets")),
+        "Operating Margin (%)": _percent(info.get("operatingMargins")),
+        "Gross Margin (%)": _percent(info.get("grossMargins")),
+        "Current Ratio": info.get("currentRatio", np.nan),
+        "Quick Ratio": info.get("quickRatio", np.nan),
+        "Beta": info.get("beta", np.nan),
+        "Free Cash Flow": free_cashflow if free_cashflow is not None else np.nan,
+        "EV/FCF": round(enterprise_value / free_cashflow, 2) if enterprise_value not in [None, 0] and free_cashflow not in [None, 0] else np.nan,
+        "Dividend Yield (%)": _percent(info.get("dividendYield")) if info.get("dividendYield") and info.get("dividendYield") < 1 else np.nan,
+        "Dividend Rate": info.get("dividendRate", np.nan),
+        "EPS Growth (%)": financials.get("EPS Growth (%)", np.nan),
+        "Revenue Growth (%)": financials.get("Revenue Growth (%)", np.nan),
+    }
+
+    data.update(financials)
+
+    return data
+
+@instrumentacja.traced("fundamental.analyze_multiple_companies", "step")
+def analyze_multiple_companies(tickers, file_path, engine=None, store=None, progress=None, cancel_event=None):
+    engine = engine or pobieranie_rownolegle.FetchEngine()
+    rows = []
+    results = engine.run(tickers, analyze_company, progress=progress, cancel_event=cancel_event)
+    if cancel_event is not None and cancel_event.is_set():
+        print("Anulowano pobieranie – nic nie zapisano")
+        return
+    for result in results:
+        if result.error is not None:
+            print(f"Błąd przy analizie {result.ticker}: {result.error}")
+            continue
+        rows.append(result.value)
+        print(f"Pobrano dane dla: {result.ticker}")
+
+    if not rows:
+        print("Brak danych do zapisania")
+        return
+
+    # Jeden zapis dla całej partii; ponowne uruchomienie tego samego dnia nadpisuje wiersze
+    df = schemat_danych.apply_schema(pd.DataFrame(rows), schemat_danych.FUNDAMENTAL_SCHEMA)
+    store = store or magazyn_migawek.fundamental_store()
+    try:
+        store.upsert(df)
+        df = store.read(df["Date"].iloc[0])
+    except ImportError:
+        print("Brak pyarrow – pomijam magazyn migawek")
 
-def analyze_multiple_companies(tickers, file_path):
-    for ticker in tickers:
-        try:
-            stock = yf.Ticker(ticker)
-            info = stock.info
-            financials = fetch_financial_details(ticker)
-            enterprise_value = info.get("enterpriseValue")
-            free_cashflow = info.get("freeCashflow")
-
-            data = {
-                "Date": datetime.today().strftime('%Y-%m-%d'),
-                "Company": info.get("longName", "N/A"),
-                "Ticker": ticker,
-                "Price": info.get("currentPrice", "N/A"),
-                "P/E": info.get("trailingPE", "N/A"),
-                "PEG": info.get("pegRatio", "N/A"),
-                "Price/Sales": info.get("priceToSalesTrailing12Months", "N/A"),
-                "Price/Book": info.get("priceToBook", "N/A"),
-                "ROE (%)": str(round(info.get("returnOnEquity", 0) * 100, 2)) if info.get("returnOnEquity") else "N/A",
-                "ROA (%)": str(round(info.get("returnOnAssets", 0) * 100, 2)) if info.get("returnOnAssets") else "N/A",
-                "Operating Margin (%)": str(round(info.get("operatingMargins", 0) * 100, 2)) if info.get("operatingMargins") else "N/A",
-                "Gross Margin (%)": str(round(info.get("grossMargins", 0) * 100, 2)) if info.get("grossMargins") else "N/A",
-                "Current Ratio": info.get("currentRatio", "N/A"),
-                "Quick Ratio": info.get("quickRatio", "N/A"),
-                "Beta": info.get("beta", "N/A"),
-                "Free Cash Flow": free_cashflow,
-                "EV/FCF": str(round(enterprise_value / free_cashflow, 2)) if enterprise_value not in [None, 0] and free_cashflow not in [None, 0] else "N/A",
-                "Dividend Yield (%)": str(round(info.get("dividendYield", 0) * 100, 2)) if info.get("dividendYield") and info.get("dividendYield") < 1 else "N/A",
-                "Dividend Rate": info.get("dividendRate", "N/A"),
-                "EPS Growth (%)": financials.get("EPS Growth (%)", "N/A"),
-                "Revenue Growth (%)": financials.get("Revenue Growth (%)", "N/A"),
-            }
-
-            data.update(financials)
-            file_exists = os.path.isfile(file_path)
-
-            with open(file_path, mode="a", newline="", encoding="utf-8-sig") as file:
-                writer = csv.DictWriter(file, fieldnames=data.keys())
-                if not file_exists:
-                    writer.writeheader()
-                writer.writerow(data)
-
-            print(f"Zapisano dane dla: {ticker}")
-
-        except Exception as e:
-            print(f"Błąd przy analizie {ticker}: {e}")
+    df.to_csv(file_path, index=False, encoding="utf-8-sig")
+    schemat_danych.write_columnar(df, file_path)
+    print(f"Zapisano dane {len(df)} spółek do: {file_path}")
 
 if __name__ == "__main__":
     with open("../data/tickers.txt") as f:
@@ -1,12 +1,20 @@
 # analiza_techniczna.py
-import yfinance as yf
+import numpy as np
 import pandas as pd
-import os
+import dostawca_danych
+import panel_cenowy
+import pobieranie_rownolegle
+import wskazniki_wektorowe
+import stan_wskaznikow
+import schemat_danych
+import magazyn_migawek
+import instrumentacja
 
-def fetch_technical_signals(ticker):
-    stock = yf.Ticker(ticker)
+@instrumentacja.traced("fetch_technical_signals", "ticker", ticker_arg=True)
+def fetch_technical_signals(ticker, hist=None):
     try:
-        hist = stock.history(period="6mo")
+        if hist is None:
+            hist = dostawca_danych.get_provider().history(ticker, "6mo")
         if hist.empty:
             return {"Ticker": ticker, "Error": "Brak danych historycznych"}
 
@@ -16,8 +24,8 @@ def fetch_technical_signals(ticker):
         max60 = close[-60:].max()
         min60 = close[-60:].min()
         sma50 = close.rolling(window=50).mean().iloc[-1]
-        sma100 = close.rolling(window=100).mean().iloc[-1] if len(close) >= 100 else "N/A"
-        sma200 = close.rolling(window=200).mean().iloc[-1] if len(close) >= 200 else "N/A"
+        sma100 = close.rolling(window=100).mean().iloc[-1] if len(close) >= 100 else np.nan
+        sma200 = close.rolling(window=200).mean().iloc[-1] if len(close) >= 200 else np.nan
         ema20 = close.ewm(span=20).mean().iloc[-1]
         ema50 = close.ewm(span=50).mean().iloc[-1]
         ema12 = close.ewm(span=12).mean().iloc[-1]
@@ -54,8 +62,8 @@ def fetch_technical_signals(ticker):
             "Max (60d)": round(max60, 2),
             "Drop from ATH (%)": drop_high,
             "SMA50": round(sma50, 2),
-            "SMA100": round(sma100, 2) if sma100 != "N/A" else "N/A",
-            "SMA200": round(sma200, 2) if sma200 != "N/A" else "N/A",
+            "SMA100": round(sma100, 2),
+            "SMA200": round(sma200, 2),
             "EMA20": round(ema20, 2),
             "EMA50": round(ema50, 2),
             "EMA12": round(ema12, 2),
@@ -70,23 +78,42 @@ def fetch_technical_signals(ticker):
         }
 
     except Exception as e:
+        # Błąd sieci lub limitu zapytań przekazujemy dalej, żeby wywołujący mógł ponowić
+        if pobieranie_rownolegle.is_transient(e):
+            raise
         return {"Ticker": ticker, "Error": str(e)}
 
+@instrumentacja.traced("technical.save", "step")
+def save_technical(df_out, output_path, store=None):
+    df_out = schemat_danych.apply_schema(df_out, schemat_danych.TECHNICAL_SCHEMA)
+    store = store or magazyn_migawek.technical_store()
+    try:
+        store.upsert(df_out.assign(Date=pd.Timestamp.today().normalize()))
+    except ImportError:
+        print("Brak pyarrow – pomijam magazyn migawek")
+    df_out.to_csv(output_path, index=False, encoding="utf-8-sig")
+    schemat_danych.write_columnar(df_out, output_path)
+    print(f"Zapisano do pliku: {output_path}")
+
 def analyze_many_from_csv(csv_path, output_path):
-    df = pd.read_csv(csv_path)
-    tickers = df["Ticker"].drop_duplicates().tolist()
+    df = schemat_danych.read_dataset(csv_path, schemat_danych.FUNDAMENTAL_SCHEMA)
+    analyze_many(df["Ticker"].drop_duplicates().tolist(), output_path)
 
-    results = []
-    for ticker in tickers:
-        print(f"Analiza techniczna: {ticker}")
-        result = fetch_technical_signals(ticker)
-        results.append(result)
+@instrumentacja.traced("technical.analyze_many", "step")
+def analyze_many(tickers, output_path, store=None):
+    # Historia wszystkich tickerów w jednym zapytaniu, wskaźniki liczone naraz dla całego panelu
+    panel = panel_cenowy.load_price_panel(tickers)
+    print(f"Analiza techniczna: {len(tickers)} tickerów")
+    df_out = wskazniki_wektorowe.technical_signals(panel, tickers, period="6mo")
+    save_technical(df_out, output_path, store)
 
-    df_out = pd.DataFrame(results)
-    df_out.to_csv(output_path, index=False, encoding="utf-8-sig")
-    print(f"Zapisano do pliku: {output_path}")
+def analyze_many_incremental(tickers, output_path, state_path=stan_wskaznikow.STATE_PATH):
+    # Dzienne odświeżenie: tylko nowe sesje aktualizują zapisany stan wskaźników
+    states = stan_wskaznikow.refresh_states(tickers, state_path)
+    df_out = pd.DataFrame([states[ticker].signals() for ticker in tickers])
+    save_technical(df_out, output_path)
 
 if __name__ == "__main__":
-    input_csv = os.path.join("C:\\", "Portfel2025", "data", "analiza_fundamentalna.csv")
-    output_csv = os.path.join("C:\\", "Portfel2025", "data", "analiza_techniczna.csv")
-    analyze_many_from_csv(input_csv, output_csv)
+    with open("../data/tickers.txt") as f:
+        tickers = [line.strip() for line in f if line.strip()]
+    analyze_many(tickers, "../data/analiza_techniczna.csv")
@@ -0,0 +1,141 @@
+# cache_sprawozdan.py
+import os
+import pickle
+import sqlite3
+import threading
+import time
+
+import pandas as pd
+
+import instrumentacja
+
+STATEMENTS_PATH = os.path.join("..", "data", "cache", "sprawozdania.sqlite")
+
+# Rodzaj sprawozdania -> długość okresu w miesiącach
+KINDS = {
+    "financials": 12,
+    "balance_sheet": 12,
+    "quarterly_financials": 3,
+    "quarterly_balance_sheet": 3,
+}
+# Okno publikacji kolejnego okresu w dniach od jego końca (raport roczny do 4 miesięcy,
+# kwartalny do 2, z zapasem na opóźnienia dostawcy)
+FILING_WINDOW_DAYS = {12: (45, 150), 3: (20, 90)}
+# W oknie publikacji sprawdzamy co kilka dni; poza nim tylko po przekroczeniu MAX_AGE (korekty)
+RECHECK_DAYS = 5
+MAX_AGE_DAYS = 90
+
+DAY = 24 * 3600
+
+
+class StatementCache:
+    # Sprawozdania finansowe zapisane osobno dla każdego okresu (kolumny w układzie yfinance).
+    # Ponowne pobranie tylko, gdy minął termin publikacji kolejnego okresu albo kopia
+    # jest starsza niż MAX_AGE_DAYS. Pozostałe metody (info, notowania) idą do `provider`,
+    # więc ceny i wskaźniki rynkowe są odświeżane jak dotąd.
+
+    def __init__(self, provider, source=None, path=STATEMENTS_PATH, recheck_days=RECHECK_DAYS,
+                 max_age_days=MAX_AGE_DAYS):
+        self.provider = provider
+        self.source = source or provider
+        self.path = path
+        self.recheck = recheck_days * DAY
+        self.max_age = max_age_days * DAY
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.executescript(
+            "CREATE TABLE IF NOT EXISTS periods ("
+            "ticker TEXT, kind TEXT, period TEXT, payload BLOB, PRIMARY KEY (ticker, kind, period));"
+            "CREATE TABLE IF NOT EXISTS checks ("
+            "ticker TEXT, kind TEXT, checked REAL, latest TEXT, PRIMARY KEY (ticker, kind));"
+        )
+        self._conn.commit()
+
+    def __getattr__(self, attr):
+        return getattr(self.provider, attr)
+
+    def latest_period(self, ticker, kind):
+        with self._lock:
+            row = self._conn.execute("SELECT latest FROM checks WHERE ticker = ? AND kind = ?",
+                                     (ticker, kind)).fetchone()
+        return pd.Timestamp(row[0]) if row and row[0] else None
+
+    def due(self, ticker, kind, now=None):
+        # Czy trzeba zapytać dostawcę: brak danych, kopia zbyt stara albo trwa okno publikacji
+        now = time.time() if now is None else now
+        with self._lock:
+            row = self._conn.execute("SELECT checked, latest FROM checks WHERE ticker = ? AND kind = ?",
+                                     (ticker, kind)).fetchone()
+        if row is None:
+            return True
+        checked, latest = row
+        age = now - checked
+        if latest is None:
+            # Brak sprawozdań (np. ETF) – nie odpytujemy przy każdym uruchomieniu
+            return age > self.recheck
+        if age > self.max_age:
+            return True
+        months = KINDS[kind]
+        expected = pd.Timestamp(latest) + pd.DateOffset(months=months)
+        start, end = FILING_WINDOW_DAYS[months]
+        today = pd.Timestamp(now, unit="s")
+        in_window = expected + pd.Timedelta(days=start) <= today <= expected + pd.Timedelta(days=end)
+        return in_window and age > self.recheck
+
+    def _store(self, ticker, kind, frame, now):
+        rows = []
+        if frame is not None and len(frame.columns):
+            for period in frame.columns:
+                rows.append((ticker, kind, pd.Timestamp(period).strftime("%Y-%m-%d"),
+                             pickle.dumps(frame[period], protocol=pickle.HIGHEST_PROTOCOL)))
+        with self._lock:
+            stored = self._conn.execute("SELECT MAX(period) FROM periods WHERE ticker = ? AND kind = ?",
+                                        (ticker, kind)).fetchone()[0]
+            latest = max([r[2] for r in rows] + ([stored] if stored else []), default=None)
+            self._conn.executemany("INSERT OR REPLACE INTO periods VALUES (?, ?, ?, ?)", rows)
+            self._conn.execute("INSERT OR REPLACE INTO checks VALUES (?, ?, ?, ?)", (ticker, kind, now, latest))
+            self._conn.commit()
+
+    def _load(self, ticker, kind):
+        with self._lock:
+            rows = self._conn.execute("SELECT period, payload FROM periods WHERE ticker = ? AND kind = ? "
+                                      "ORDER BY period DESC", (ticker, kind)).fetchall()
+        if not rows:
+            return pd.DataFrame()
+        # Najnowszy okres w pierwszej kolumnie – jak w yfinance
+        return pd.DataFrame({pd.Timestamp(period): pickle.loads(payload) for period, payload in rows})
+
+    def statement(self, ticker, kind):
+        if kind not in KINDS:
+            raise ValueError(f"Nieznany rodzaj sprawozdania: {kind}")
+        if self.due(ticker, kind):
+            instrumentacja.count("statements.fetch")
+            self._store(ticker, kind, getattr(self.source, kind)(ticker), time.time())
+        else:
+            instrumentacja.count("statements.cached")
+        return self._load(ticker, kind)
+
+    def financials(self, ticker):
+        return self.statement(ticker, "financials")
+
+    def balance_sheet(self, ticker):
+        return self.statement(ticker, "balance_sheet")
+
+    def quarterly_financials(self, ticker):
+        return self.statement(ticker, "quarterly_financials")
+
+    def quarterly_balance_sheet(self, ticker):
+        return self.statement(ticker, "quarterly_balance_sheet")
+
+    def clear(self, ticker=None):
+        with self._lock:
+            if ticker is None:
+                self._conn.execute("DELETE FROM periods")
+                self._conn.execute("DELETE FROM checks")
+            else:
+                self._conn.execute("DELETE FROM periods WHERE ticker = ?", (ticker,))
+                self._conn.execute("DELETE FROM checks WHERE ticker = ?", (ticker,))
+            self._conn.commit()
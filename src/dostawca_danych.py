@@ -0,0 +1,351 @@
+# dostawca_danych.py
+import hashlib
+import os
+import pickle
+import random
+import sqlite3
+import threading
+import time
+import zlib
+
+import numpy as np
+import pandas as pd
+
+# Czas ważności wpisów w cache (sekundy) – osobno dla każdego rodzaju danych
+TTL = {
+    "quote": 60,
+    "history": 6 * 3600,
+    "statements": 7 * 24 * 3600,
+    "info": 24 * 3600,
+}
+
+CACHE_PATH = os.path.join("..", "data", "cache", "rynek.sqlite")
+
+
+def period_to_offset(period):
+    # "6mo", "1y", "5d", "2wk" -> pd.DateOffset; "max" -> None
+    if period == "max":
+        return None
+    units = {"mo": "months", "y": "years", "d": "days", "wk": "weeks"}
+    for suffix, name in units.items():
+        if period.endswith(suffix) and period[:-len(suffix)].isdigit():
+            return pd.DateOffset(**{name: int(period[:-len(suffix)])})
+    raise ValueError(f"Nieznany okres: {period}")
+
+
+def slice_period(hist, period):
+    offset = period_to_offset(period)
+    if offset is None or hist.empty:
+        return hist
+    return hist[hist.index > hist.index[-1] - offset]
+
+
+class YFinanceProvider:
+    # Cienka warstwa nad yfinance – jedyne miejsce, w którym wołamy yf.Ticker
+
+    def __init__(self):
+        import yfinance as yf
+        self._yf = yf
+
+    def info(self, ticker):
+        return self._yf.Ticker(ticker).info
+
+    def financials(self, ticker):
+        return self._yf.Ticker(ticker).financials
+
+    def balance_sheet(self, ticker):
+        return self._yf.Ticker(ticker).balance_sheet
+
+    def quarterly_financials(self, ticker):
+        return self._yf.Ticker(ticker).quarterly_financials
+
+    def quarterly_balance_sheet(self, ticker):
+        return self._yf.Ticker(ticker).quarterly_balance_sheet
+
+    def history(self, ticker, period):
+        return self._yf.Ticker(ticker).history(period=period)
+
+    def download(self, tickers, period):
+        # Jedno zbiorcze zapytanie o historię wielu tickerów; kolumny (pole, ticker)
+        data = self._yf.download(list(tickers), period=period, group_by="column", auto_adjust=True,
+                                 progress=False, threads=True)
+        if not isinstance(data.columns, pd.MultiIndex):
+            data.columns = pd.MultiIndex.from_product([data.columns, list(tickers)])
+        return data
+
+    def quote(self, ticker):
+        fast = self._yf.Ticker(ticker).fast_info
+        return {"Ticker": ticker, "Price": fast["lastPrice"], "Volume": fast["lastVolume"]}
+
+
+def synthetic_info(ticker, price, rng):
+    # Słownik .info w układzie yfinance z losowymi wskaźnikami – wspólny dla FakeProvider
+    # i rynku syntetycznego benchmarków
+    return {
+        "longName": f"{ticker} S.A.",
+        "currentPrice": price,
+        "trailingPE": rng.uniform(-5, 60),
+        "pegRatio": rng.uniform(0.2, 3),
+        "priceToSalesTrailing12Months": rng.uniform(0.2, 8),
+        "priceToBook": rng.uniform(0.3, 6),
+        "returnOnEquity": rng.uniform(-0.1, 0.35),
+        "returnOnAssets": rng.uniform(-0.05, 0.15),
+        "operatingMargins": rng.uniform(-0.05, 0.4),
+        "grossMargins": rng.uniform(0.05, 0.6),
+        "currentRatio": rng.uniform(0.5, 3),
+        "quickRatio": rng.uniform(0.3, 2.5),
+        "beta": rng.uniform(0.2, 1.8),
+        "freeCashflow": rng.uniform(-1e8, 2e9),
+        "enterpriseValue": rng.uniform(1e8, 5e10),
+        "dividendYield": rng.uniform(0, 0.09),
+        "dividendRate": rng.uniform(0, 10),
+        "trailingEps": rng.uniform(-2, 20),
+        "forwardEps": rng.uniform(0.5, 20),
+        "totalRevenue": rng.uniform(1e8, 1e10),
+    }
+
+
+def synthetic_statements(rng, periods):
+    # (financials, balance_sheet) w układzie yfinance: wiersze = pozycje, kolumny = okresy
+    n = len(periods)
+    revenue = rng.uniform(1e8, 1e10) * np.cumprod(rng.uniform(0.9, 1.2, n))
+    ebit = revenue * rng.uniform(0.02, 0.25, n)
+    fin = pd.DataFrame([revenue, ebit, ebit * rng.uniform(0.02, 0.2, n)],
+                       index=["Total Revenue", "EBIT", "Interest Expense"], columns=periods)
+    assets = revenue * rng.uniform(1, 3, n)
+    bs = pd.DataFrame([assets, assets * rng.uniform(0.05, 0.7, n)],
+                      index=["Total Assets", "Total Debt"], columns=periods)
+    return fin, bs
+
+
+class FakeProvider:
+    # Lokalny dostawca do testów i pracy offline. Dane można podać wprost,
+    # a dla pozostałych tickerów generowane są deterministyczne dane syntetyczne.
+    # `latency` i `failure_rate` symulują wolną lub zawodną sieć.
+
+    def __init__(self, infos=None, financials=None, balance_sheets=None, histories=None, days=260,
+                 latency=0.0, failure_rate=0.0):
+        self.infos = infos or {}
+        self.financials_data = financials or {}
+        self.balance_sheets = balance_sheets or {}
+        self.histories = histories or {}
+        self.days = days
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self._failures = random.Random(0)
+        self._generated = {}
+
+    def _simulate_network(self):
+        if self.latency:
+            time.sleep(self.latency)
+        if self.failure_rate and self._failures.random() < self.failure_rate:
+            raise ConnectionError("Symulowany błąd sieci")
+
+    def _rng(self, ticker, salt):
+        return np.random.default_rng(zlib.crc32(f"{ticker}:{salt}".encode()))
+
+    def _synthetic_history(self, ticker):
+        rng = self._rng(ticker, "history")
+        dates = pd.bdate_range(end=pd.Timestamp.today().normalize(), periods=self.days)
+        close = 100 * np.exp(np.cumsum(rng.normal(0.0003, 0.02, self.days)))
+        spread = np.abs(rng.normal(0, 0.01, self.days))
+        return pd.DataFrame({
+            "Open": close * (1 + rng.normal(0, 0.005, self.days)),
+            "High": close * (1 + spread),
+            "Low": close * (1 - spread),
+            "Close": close,
+            "Volume": rng.integers(10_000, 1_000_000, self.days).astype(float),
+        }, index=dates)
+
+    def _synthetic_statements(self, ticker, quarterly=False):
+        rng = self._rng(ticker, "quarterly" if quarterly else "statements")
+        if quarterly:
+            periods = pd.date_range(end=pd.Timestamp.today() - pd.DateOffset(months=2), periods=4, freq="QE")[::-1]
+        else:
+            periods = pd.to_datetime([f"{pd.Timestamp.today().year - i - 1}-12-31" for i in range(4)])
+        return synthetic_statements(rng, periods)
+
+    def _history(self, ticker):
+        hist = self.histories.get(ticker)
+        if hist is None:
+            hist = self._generated.get(ticker)
+        if hist is None:
+            hist = self._generated[ticker] = self._synthetic_history(ticker)
+        return hist
+
+    def info(self, ticker):
+        self._simulate_network()
+        if ticker in self.infos:
+            return self.infos[ticker]
+        price = float(self._history(ticker)["Close"].iloc[-1])
+        return synthetic_info(ticker, price, self._rng(ticker, "info"))
+
+    def financials(self, ticker):
+        self._simulate_network()
+        if ticker in self.financials_data:
+            return self.financials_data[ticker]
+        return self._synthetic_statements(ticker)[0]
+
+    def balance_sheet(self, ticker):
+        self._simulate_network()
+        if ticker in self.balance_sheets:
+            return self.balance_sheets[ticker]
+        return self._synthetic_statements(ticker)[1]
+
+    def quarterly_financials(self, ticker):
+        self._simulate_network()
+        return self._synthetic_statements(ticker, quarterly=True)[0]
+
+    def quarterly_balance_sheet(self, ticker):
+        self._simulate_network()
+        return self._synthetic_statements(ticker, quarterly=True)[1]
+
+    def history(self, ticker, period):
+        self._simulate_network()
+        return slice_period(self._history(ticker), period)
+
+    def download(self, tickers, period):
+        self._simulate_network()
+        frames = {ticker: slice_period(self._history(ticker), period) for ticker in tickers}
+        return pd.concat(frames, axis=1).swaplevel(axis=1).sort_index(axis=1)
+
+    def quote(self, ticker):
+        self._simulate_network()
+        last = self._history(ticker).iloc[-1]
+        return {"Ticker": ticker, "Price": float(last["Close"]), "Volume": float(last["Volume"])}
+
+
+class CachedProvider:
+    # Trwały cache SQLite przed dowolnym dostawcą. Wpisy wygasają wg TTL dla
+    # danego rodzaju danych, więc ponowne uruchomienie (także po awarii)
+    # czyta dane lokalnie zamiast z sieci.
+
+    def __init__(self, provider, path=CACHE_PATH, ttl=None):
+        self.provider = provider
+        self.path = path
+        self.ttl = dict(TTL, **(ttl or {}))
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS cache ("
+            "key TEXT PRIMARY KEY, kind TEXT, stored REAL, payload BLOB)"
+        )
+        self._conn.commit()
+
+    def _get(self, key, kind):
+        with self._lock:
+            row = self._conn.execute("SELECT stored, payload FROM cache WHERE key = ?", (key,)).fetchone()
+        if row is None or time.time() - row[0] > self.ttl[kind]:
+            return None
+        return pickle.loads(row[1])
+
+    def _put(self, key, kind, value):
+        payload = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO cache (key, kind, stored, payload) VALUES (?, ?, ?, ?)",
+                (key, kind, time.time(), payload),
+            )
+            self._conn.commit()
+
+    def _cached(self, kind, key, fetch):
+        value = self._get(key, kind)
+        if value is not None:
+            return value
+        value = fetch()
+        # Pustych odpowiedzi nie zapisujemy – to zwykle chwilowy błąd sieci
+        if value is not None and len(value) > 0:
+            self._put(key, kind, value)
+        return value
+
+    def info(self, ticker):
+        return self._cached("info", f"info:{ticker}", lambda: self.provider.info(ticker))
+
+    def financials(self, ticker):
+        return self._cached("statements", f"financials:{ticker}", lambda: self.provider.financials(ticker))
+
+    def balance_sheet(self, ticker):
+        return self._cached("statements", f"balance_sheet:{ticker}", lambda: self.provider.balance_sheet(ticker))
+
+    def quarterly_financials(self, ticker):
+        return self._cached("statements", f"quarterly_financials:{ticker}",
+                            lambda: self.provider.quarterly_financials(ticker))
+
+    def quarterly_balance_sheet(self, ticker):
+        return self._cached("statements", f"quarterly_balance_sheet:{ticker}",
+                            lambda: self.provider.quarterly_balance_sheet(ticker))
+
+    def history(self, ticker, period):
+        return self._cached("history", f"history:{ticker}:{period}", lambda: self.provider.history(ticker, period))
+
+    def download(self, tickers, period):
+        key = ",".join(sorted(tickers))
+        return self._cached("history", f"download:{period}:{hashlib.sha1(key.encode()).hexdigest()}",
+                            lambda: self.provider.download(tickers, period))
+
+    def quote(self, ticker):
+        return self._cached("quote", f"quote:{ticker}", lambda: self.provider.quote(ticker))
+
+    def clear(self, kind=None):
+        with self._lock:
+            if kind is None:
+                self._conn.execute("DELETE FROM cache")
+            else:
+                self._conn.execute("DELETE FROM cache WHERE kind = ?", (kind,))
+            self._conn.commit()
+
+
+_provider = None
+_cache_dir = None
+# Opakowanie dostawcy (instrumentacja.enable) nakładane przy każdym jego utworzeniu lub podmianie
+_wrapper = None
+
+
+def default_provider(cache_dir=None):
+    # yfinance za cache SQLite; sprawozdania w cache okresów, pobierane prosto z yfinance
+    # tylko po terminie publikacji nowego okresu
+    import cache_sprawozdan
+
+    source = YFinanceProvider()
+    if cache_dir is None:
+        return cache_sprawozdan.StatementCache(CachedProvider(source), source)
+    return cache_sprawozdan.StatementCache(CachedProvider(source, os.path.join(cache_dir, "rynek.sqlite")), source,
+                                           os.path.join(cache_dir, "sprawozdania.sqlite"))
+
+
+def get_provider():
+    # PORTFEL_PROVIDER=fake uruchamia cały pipeline offline na danych syntetycznych
+    global _provider
+    if _provider is None:
+        if os.environ.get("PORTFEL_PROVIDER") == "fake":
+            _provider = FakeProvider()
+        else:
+            _provider = default_provider(_cache_dir)
+        if _wrapper is not None:
+            _provider = _wrapper(_provider)
+    return _provider
+
+
+def use_cache_dir(cache_dir):
+    # Cache notowań i sprawozdań w katalogu danych; dostawca tworzony przy pierwszym użyciu,
+    # więc polecenia bez pobierania nie ładują yfinance (dostawca syntetyczny nie ma cache)
+    global _provider, _cache_dir
+    if os.environ.get("PORTFEL_PROVIDER") != "fake":
+        _cache_dir = cache_dir
+        _provider = None
+
+
+def set_provider(provider):
+    global _provider
+    _provider = _wrapper(provider) if _wrapper is not None and provider is not None else provider
+
+
+def set_wrapper(wrapper):
+    # Opakowuje bieżącego dostawcę (jeśli już utworzony) i każdego tworzonego później,
+    # także po use_cache_dir; None – nowi dostawcy bez opakowania
+    global _wrapper
+    _wrapper = wrapper
+    set_provider(_provider)
@@ -0,0 +1,253 @@
+# eksport_excel.py
+import re
+import zipfile
+from xml.sax.saxutils import escape
+
+import numpy as np
+import pandas as pd
+from openpyxl.utils import get_column_letter
+
+import instrumentacja
+
+COLORS = {
+    "Undervalued": "00FF00", "Fairly Valued": "FFFF00", "Overvalued": "FF0000", "Unknown": "FFFFFF",
+    "Strong": "00FF00", "Medium": "FFFF00", "Weak": "FF0000",
+    "Dobra i tania": "008000", "Dobra w dobrej cenie": "00FF00", "Spółka średnia": "C0C0C0", "Spółka słaba": "FF0000",  "Kupuj": "00FF00", "Obserwuj": "FFFF00", "Unikaj": "FF0000"
+}
+COLORED_COLUMNS = ["Valuation Status", "Fundamental Strength", "Ocena końcowa"]
+
+CHUNK_ROWS = 10000
+# Excel liczy daty od 1899-12-30; 25569 = 1970-01-01
+EXCEL_EPOCH = 25569
+MAX_TEXT = 32767
+ILLEGAL_XML = re.compile("[\x00-\x08\x0b\x0c\x0e-\x1f\ufffe\uffff]")
+
+MAIN_NS = "http://schemas.openxmlformats.org/spreadsheetml/2006/main"
+REL_NS = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+PKG_REL_NS = "http://schemas.openxmlformats.org/package/2006/relationships"
+HEADER = '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+
+LEGEND = [
+    ["Legenda"], [],
+    ["ML_Predicted: 1 = Kupuj, 0 = Nie kupuj"], [],
+    ["Valuation Status:"],
+    ["Undervalued: RSI < 30 lub Drop from ATH > 20%"],
+    ["Overvalued: RSI > 70"],
+    ["Fairly Valued: Pomiędzy"],
+    ["Unknown: Brak danych"], [],
+    ["Fundamental Strength:"],
+    ["Strong: P/E < 25 AND ROE > 15% AND Debt/Assets < 0.5"],
+    ["Medium: Częściowo spełnione"],
+    ["Weak: Brak danych lub słabe"], [],
+    ["Ocena końcowa:"],
+    ["Dobra i tania: Score >= 9"],
+    ["Dobra w dobrej cenie: 6–8"],
+    ["Średnia: 4–5"],
+    ["Słaba: < 4"],
+    ["Ocena AI:"],
+    ["Kupuj: ML_Points >= 80 i Score >= 6"],
+    ["Obserwuj: ML_Points >= 60 i Score >= 5"],
+    ["Unikaj: pozostałe przypadki"],
+]
+
+def column_widths(df):
+    # Szerokość = najdłuższa niepusta wartość (lub nagłówek) + 2, liczona kolumnami
+    widths = []
+    for name in df.columns:
+        column = df[name]
+        if pd.api.types.is_datetime64_any_dtype(column):
+            text = column[column.notna()].dt.strftime("%Y-%m-%d %H:%M:%S").to_numpy()
+        elif pd.api.types.is_numeric_dtype(column) or pd.api.types.is_bool_dtype(column):
+            text = [repr(v) for v in column[column.notna() & (column != 0)].tolist()]
+        else:
+            text = column[column.notna()].astype(str)
+            text = text[text != ""].tolist()
+        longest = max(map(len, text), default=0)
+        widths.append(max(longest, len(str(name))) + 2)
+    return widths
+
+
+def _formatting_rules(df):
+    # (kolumna, operator, wartość, kolor) – jedna reguła formatowania warunkowego na zakres kolumny
+    rules = []
+    for idx, name in enumerate(df.columns):
+        if name in COLORED_COLUMNS:
+            rules += [(idx, "equal", f'"{value}"', color) for value, color in COLORS.items()]
+        elif name == "ML_Predicted":
+            rules += [(idx, "equal", "1", "00CCFF"), (idx, "notEqual", "1", "CCCCCC")]
+    return rules
+
+
+def _text(value):
+    # Zawartość komórki tekstowej: bez znaków niedozwolonych w XML, z limitem długości Excela
+    text = ILLEGAL_XML.sub("", str(value))[:MAX_TEXT]
+    space = ' xml:space="preserve"' if text != text.strip() else ""
+    return f' t="inlineStr"><is><t{space}>{escape(text)}</t></is></c>'
+
+
+def _column_cells(column, letter, rows):
+    # Komórki jednej kolumny fragmentu jako napisy XML ("" = pusta komórka). Typ sprawdzany raz
+    # na kolumnę, a nie dla każdej komórki; tekst kategorii escapowany raz na kategorię.
+    if isinstance(column.dtype, pd.CategoricalDtype):
+        categories = [_text(c) for c in column.cat.categories]
+        codes = column.cat.codes.to_numpy()
+        return [f'<c r="{letter}{r}"{categories[k]}' if k >= 0 else "" for r, k in zip(rows, codes.tolist())]
+    if pd.api.types.is_bool_dtype(column):
+        values = column.to_numpy(dtype=object, na_value=None).tolist()
+        return [f'<c r="{letter}{r}" t="b"><v>{int(v)}</v></c>' if v is not None else ""
+                for r, v in zip(rows, values)]
+    if pd.api.types.is_datetime64_any_dtype(column):
+        if getattr(column.dt, "tz", None) is not None:
+            column = column.dt.tz_convert(None)
+        nanos = column.to_numpy(dtype="datetime64[ns]")
+        present = ~np.isnat(nanos)
+        serial = nanos.astype(np.int64) / 86_400e9 + EXCEL_EPOCH
+        return [f'<c r="{letter}{r}" s="1"><v>{v!r}</v></c>' if ok else ""
+                for r, v, ok in zip(rows, serial.tolist(), present.tolist())]
+    if pd.api.types.is_numeric_dtype(column):
+        # repr liczby Pythona (najkrótszy zapis dokładny) jest kilka razy szybszy niż astype(str)
+        values = column.to_numpy(dtype=np.float64, na_value=np.nan)
+        present = np.isfinite(values)
+        if pd.api.types.is_integer_dtype(column) and present.all():
+            values = column.to_numpy(dtype=np.int64)
+        return [f'<c r="{letter}{r}"><v>{v!r}</v></c>' if ok else ""
+                for r, v, ok in zip(rows, values.tolist(), present.tolist())]
+    return [_object_cell(v, letter, r) for r, v in zip(rows, column.tolist())]
+
+
+def _object_cell(value, letter, row):
+    # Kolumna obiektowa (np. stare pliki z "N/A" obok liczb): typ sprawdzany dla każdej wartości
+    if value is None or (not isinstance(value, str) and pd.isna(value)):
+        return ""
+    if isinstance(value, (bool, np.bool_)):
+        return f'<c r="{letter}{row}" t="b"><v>{int(value)}</v></c>'
+    if isinstance(value, (int, float, np.integer, np.floating)):
+        value = float(value)
+        return f'<c r="{letter}{row}"><v>{value!r}</v></c>' if np.isfinite(value) else ""
+    if isinstance(value, (pd.Timestamp, np.datetime64)) or hasattr(value, "isoformat"):
+        try:
+            stamp = pd.Timestamp(value)
+        except (TypeError, ValueError):
+            stamp = None
+        if stamp is not None:
+            if stamp.tzinfo is not None:
+                stamp = stamp.tz_convert(None)
+            serial = stamp.value / 86_400e9 + EXCEL_EPOCH
+            return f'<c r="{letter}{row}" s="1"><v>{serial!r}</v></c>'
+    return f'<c r="{letter}{row}"{_text(value)}'
+
+
+def _sheet_rows(df, first_row=2, chunk_rows=CHUNK_ROWS):
+    # Wiersze arkusza fragmentami po chunk_rows – w pamięci tylko bieżący fragment jako tekst XML
+    letters = [get_column_letter(i + 1) for i in range(df.shape[1])]
+    for start in range(0, len(df), chunk_rows):
+        chunk = df.iloc[start:start + chunk_rows]
+        rows = [str(r) for r in range(first_row + start, first_row + start + len(chunk))]
+        columns = [_column_cells(chunk.iloc[:, j], letters[j], rows) for j in range(chunk.shape[1])]
+        yield "".join(f'<row r="{r}">{"".join(cells)}</row>' for r, cells in zip(rows, zip(*columns)))
+
+
+def _write_sheet(zf, index, df, widths=None, rules=(), dxf_ids=None, selected=False):
+    # Kolejność elementów jak w schemacie SpreadsheetML: dimension, sheetViews, cols, sheetData,
+    # conditionalFormatting, pageMargins
+    last = get_column_letter(max(df.shape[1], 1))
+    with zf.open(f"xl/worksheets/sheet{index}.xml", "w", force_zip64=True) as f:
+        def write(text):
+            f.write(text.encode("utf-8"))
+
+        write(f'{HEADER}<worksheet xmlns="{MAIN_NS}" xmlns:r="{REL_NS}">')
+        write(f'<dimension ref="A1:{last}{len(df) + 1}"/>')
+        view = ' tabSelected="1"' if selected else ""
+        write(f'<sheetViews><sheetView{view} workbookViewId="0"/></sheetViews>')
+        write('<sheetFormatPr defaultRowHeight="15"/>')
+        if widths:
+            write("<cols>" + "".join(f'<col min="{i}" max="{i}" width="{w}" customWidth="1"/>'
+                                     for i, w in enumerate(widths, start=1)) + "</cols>")
+        write('<sheetData><row r="1">')
+        write("".join(f'<c r="{get_column_letter(i + 1)}1"{_text(title)}' for i, title in enumerate(df.columns)))
+        write("</row>")
+        for part in _sheet_rows(df):
+            write(part)
+        write("</sheetData>")
+        if len(df):
+            priority = 0
+            for idx in dict.fromkeys(idx for idx, _, _, _ in rules):
+                letter = get_column_letter(idx + 1)
+                write(f'<conditionalFormatting sqref="{letter}2:{letter}{len(df) + 1}">')
+                for _, op, value, color in (rule for rule in rules if rule[0] == idx):
+                    priority += 1
+                    write(f'<cfRule type="cellIs" dxfId="{dxf_ids[color]}" priority="{priority}" '
+                          f'operator="{op}"><formula>{escape(value)}</formula></cfRule>')
+                write("</conditionalFormatting>")
+        write('<pageMargins left="0.7" right="0.7" top="0.75" bottom="0.75" header="0.3" footer="0.3"/>')
+        write("</worksheet>")
+
+
+def _styles(colors):
+    # Styl 1 – data i godzina; dxf dla każdego koloru formatowania warunkowego
+    dxfs = "".join(f'<dxf><fill><patternFill><bgColor rgb="FF{color}"/></patternFill></fill></dxf>'
+                   for color in colors)
+    return (f'{HEADER}<styleSheet xmlns="{MAIN_NS}">'
+            '<numFmts count="1"><numFmt numFmtId="164" formatCode="yyyy-mm-dd hh:mm:ss"/></numFmts>'
+            '<fonts count="1"><font><sz val="11"/><name val="Calibri"/><family val="2"/></font></fonts>'
+            '<fills count="2"><fill><patternFill patternType="none"/></fill>'
+            '<fill><patternFill patternType="gray125"/></fill></fills>'
+            '<borders count="1"><border><left/><right/><top/><bottom/><diagonal/></border></borders>'
+            '<cellStyleXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0"/></cellStyleXfs>'
+            '<cellXfs count="2"><xf numFmtId="0" fontId="0" fillId="0" borderId="0" xfId="0"/>'
+            '<xf numFmtId="164" fontId="0" fillId="0" borderId="0" xfId="0" applyNumberFormat="1"/></cellXfs>'
+            '<cellStyles count="1"><cellStyle name="Normal" xfId="0" builtinId="0"/></cellStyles>'
+            f'<dxfs count="{len(colors)}">{dxfs}</dxfs></styleSheet>')
+
+
+def _write_package(path, sheets, rules, legend):
+    # Skoroszyt .xlsx pisany wprost (zip z częściami XML): tekst w komórkach inline, bez
+    # sharedStrings, więc każdy wiersz trafia do pliku raz, bez pośrednich obiektów komórek
+    names = list(sheets) + (["Legenda"] if legend else [])
+    colors = list(dict.fromkeys(color for _, _, _, color in rules))
+    dxf_ids = {color: i for i, color in enumerate(colors)}
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED, compresslevel=1) as zf:
+        overrides = "".join(
+            f'<Override PartName="/xl/worksheets/sheet{i}.xml" '
+            'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+            for i in range(1, len(names) + 1))
+        zf.writestr("[Content_Types].xml", (
+            f'{HEADER}<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+            '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+            '<Default Extension="xml" ContentType="application/xml"/>'
+            '<Override PartName="/xl/workbook.xml" '
+            'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+            '<Override PartName="/xl/styles.xml" '
+            'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"/>'
+            f'{overrides}</Types>'))
+        zf.writestr("_rels/.rels", (
+            f'{HEADER}<Relationships xmlns="{PKG_REL_NS}"><Relationship Id="rId1" '
+            f'Type="{REL_NS}/officeDocument" Target="xl/workbook.xml"/></Relationships>'))
+        titles = [escape(name, {'"': "&quot;"}) for name in names]
+        zf.writestr("xl/workbook.xml", (
+            f'{HEADER}<workbook xmlns="{MAIN_NS}" xmlns:r="{REL_NS}"><bookViews><workbookView/></bookViews>'
+            "<sheets>" + "".join(f'<sheet name="{title}" sheetId="{i}" r:id="rId{i}"/>'
+                                 for i, title in enumerate(titles, start=1)) + "</sheets></workbook>"))
+        zf.writestr("xl/_rels/workbook.xml.rels", (
+            f'{HEADER}<Relationships xmlns="{PKG_REL_NS}">'
+            + "".join(f'<Relationship Id="rId{i}" Type="{REL_NS}/worksheet" Target="worksheets/sheet{i}.xml"/>'
+                      for i in range(1, len(names) + 1))
+            + f'<Relationship Id="rId{len(names) + 1}" Type="{REL_NS}/styles" Target="styles.xml"/>'
+            "</Relationships>"))
+        zf.writestr("xl/styles.xml", _styles(colors))
+        for i, (name, df) in enumerate(sheets.items(), start=1):
+            _write_sheet(zf, i, df, column_widths(df), rules if i == 1 else (), dxf_ids, selected=i == 1)
+        if legend:
+            # Puste wiersze legendy zostają pustymi wierszami arkusza
+            rows = pd.DataFrame({"Legenda": [row[0] if row else None for row in LEGEND[1:]]})
+            _write_sheet(zf, len(names), rows)
+
+
+@instrumentacja.traced("write_report", "step")
+def write_report(df, path, sheet_name="Sheet1", extra_sheets=None, legend=True):
+    # Jeden przebieg: dane, szerokości kolumn, formatowanie warunkowe i Legenda, bez ponownego
+    # wczytywania skoroszytu. Komórki kolumny formatowane naraz dla fragmentu wierszy – zapis
+    # przez xlsxwriter/openpyxl kosztował kilka µs na komórkę (ok. 20 s dla 50k × 47).
+    sheets = {sheet_name: df, **(extra_sheets or {})}
+    _write_package(path, sheets, _formatting_rules(df), legend)
+    return path
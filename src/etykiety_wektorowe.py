@@ -0,0 +1,200 @@
+# etykiety_wektorowe.py
+import numpy as np
+import pandas as pd
+import panel_cenowy
+import reguly_oceny
+import wskazniki_wektorowe
+import instrumentacja
+
+# Horyzonty etykiet w sesjach giełdowych
+HORIZONS = {"1m": 21, "3m": 63, "6m": 126, "12m": 252}
+# Progi stopy zwrotu (%) dla etykiet binarnych
+THRESHOLDS = [0, 5, 10, 20]
+
+FEATURES = [
+    "P/E", "PEG", "ROE (%)", "Debt/Assets", "EV/FCF",
+    "EPS Growth (%)", "Revenue Growth (%)", "RSI", "Drop from ATH (%)",
+    "SMA50", "SMA200", "Beta", "Dividend Yield (%)",
+    "EMA Crossover", "Strefa"
+]
+
+
+def return_column(horizon):
+    return f"Return {horizon} (%)"
+
+
+def target_column(horizon, threshold):
+    return f"Target ({horizon} +{threshold}%)"
+
+
+def _labels(returns, threshold):
+    # 1/0 według progu, NaN gdy zwrot nieznany
+    returns = np.asarray(returns, dtype=float)
+    with np.errstate(invalid="ignore"):
+        return np.where(np.isnan(returns), np.nan, (returns >= threshold).astype(float))
+
+
+def trailing_returns(panel, tickers=None, period="7mo"):
+    # Zwrot (%) od pierwszej do ostatniej sesji okna – get_return dla całego uniwersum naraz
+    tickers = list(tickers) if tickers is not None else panel.tickers
+    close_df = panel.field("Close").reindex(columns=tickers)
+    if not len(close_df.index):
+        return pd.Series(np.nan, index=tickers, name="Return (%)")
+    close = close_df.to_numpy(dtype=float)
+    mask = wskazniki_wektorowe.period_mask(close_df, period)
+    columns = np.arange(close.shape[1])
+    first = close[np.argmax(mask, axis=0), columns]
+    last = close[mask.shape[0] - 1 - np.argmax(mask[::-1], axis=0), columns]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        returns = (last - first) / first * 100
+    returns = np.where(mask.sum(axis=0) >= 2, returns, np.nan)
+    return pd.Series(returns, index=tickers, name="Return (%)")
+
+
+@instrumentacja.traced("trailing_labels", "step")
+def trailing_labels(panel, tickers=None, period="7mo", threshold=10):
+    # Dotychczasowa etykieta "Target (6m +10%)" dla dnia bieżącego
+    returns = trailing_returns(panel, tickers, period)
+    return pd.Series(_labels(returns, threshold), index=returns.index, name="Target (6m +10%)")
+
+
+def forward_returns(close_df, horizons=HORIZONS):
+    # Zwrot (%) z kolejnych `h` sesji dla każdej daty i tickera; NaN, gdy horyzont jeszcze trwa
+    close = close_df.to_numpy(dtype=float)
+    out = {}
+    for name, steps in horizons.items():
+        fwd = np.full_like(close, np.nan)
+        if steps < len(close):
+            with np.errstate(divide="ignore", invalid="ignore"):
+                fwd[:-steps] = (close[steps:] / close[:-steps] - 1) * 100
+        out[name] = pd.DataFrame(fwd, index=close_df.index, columns=close_df.columns)
+    return out
+
+
+def label_frame(panel, horizons=HORIZONS, thresholds=THRESHOLDS, dates=None):
+    # Wszystkie horyzonty i progi naraz w formacie długim: Date, Ticker, Return …, Target …
+    close_df = panel.field("Close")
+    if dates is not None:
+        dates = pd.DatetimeIndex(dates).intersection(close_df.index)
+    else:
+        dates = close_df.index
+    rows = close_df.index.get_indexer(dates)
+    listed = ~np.isnan(close_df.to_numpy(dtype=float)[rows]).ravel()
+
+    index = pd.MultiIndex.from_product([dates, close_df.columns], names=["Date", "Ticker"])
+    df = pd.DataFrame(index=index[listed])
+    for name, fwd in forward_returns(close_df, horizons).items():
+        values = fwd.to_numpy()[rows].ravel()[listed]
+        df[return_column(name)] = np.round(values, 2)
+        for threshold in thresholds:
+            df[target_column(name, threshold)] = _labels(values, threshold)
+    return df.reset_index()
+
+
+def rebalance_dates(panel, warmup=HORIZONS["6m"], start=None):
+    # Ostatnia sesja każdego miesiąca, po okresie rozgrzewki wskaźników
+    dates = panel.dates[warmup:]
+    if start is not None:
+        dates = dates[dates >= pd.Timestamp(start)]
+    last = pd.Series(dates, index=dates).groupby(dates.to_period("M")).max()
+    return pd.DatetimeIndex(last.to_numpy())
+
+
+def _fit(train, target, params=None, min_rows=50):
+    # Model uczony wyłącznie na etykietach znanych w dniu oceny; None, gdy danych za mało
+    import rejestr_modeli
+
+    train = train[train[target].isin([0, 1])]
+    features = [f for f in FEATURES if f in train and train[f].notna().any()]
+    if len(train) < min_rows or train[target].nunique() < 2 or not features:
+        return None
+    pipeline = rejestr_modeli.build_pipeline(features, params)
+    pipeline.fit(train[features], train[target].astype(int))
+    return pipeline, features
+
+
+@instrumentacja.traced("backtest", "step")
+def backtest(panel, dates=None, store=None, horizon="6m", threshold=10, train=True, params=None,
+             refit_every=1):
+    # Odtworzenie punktacji i modelu ML w każdej dacie przeszłej bez wglądu w przyszłość:
+    # wskaźniki z notowań do tej daty, fundamenty z migawki na tę datę, model uczony tylko
+    # na etykietach, których horyzont zakończył się przed datą oceny. Uczenie dominuje
+    # czas działania – refit_every > 1 używa modelu ponownie przez kilka kolejnych dat.
+    dates = rebalance_dates(panel) if dates is None else pd.DatetimeIndex(dates)
+    close_df = panel.field("Close")
+    steps = HORIZONS[horizon]
+    fwd = forward_returns(close_df, {horizon: steps})[horizon]
+    ret_col, target_col = return_column(horizon), target_column(horizon, threshold)
+
+    history = []
+    model, last_fit = None, None
+    for i, date in enumerate(dates):
+        pos = close_df.index.get_indexer([date])[0]
+        if pos < 0:
+            print(f"Pomijam {date.date()} – brak sesji w panelu")
+            continue
+        live = close_df.columns[close_df.iloc[pos].notna()]
+        df = wskazniki_wektorowe.technical_signals(panel.until(date, "7mo"), live)
+        if store is not None:
+            fundamentals = store.as_of(date).drop(columns="Date")
+            df = fundamentals.merge(df, on="Ticker", how="right")
+
+        df["Score"] = reguly_oceny.score_frame(df)
+        df["Ocena końcowa"] = reguly_oceny.classify_scores(df["Score"])
+        df["Fundamental Strength"] = reguly_oceny.classify_fundamental_frame(df)
+        df["Valuation Status"] = reguly_oceny.classify_valuation_frame(df)
+        df.insert(0, "Date", date)
+        df[ret_col] = np.round(fwd.iloc[pos].reindex(df["Ticker"]).to_numpy(), 2)
+        df[target_col] = _labels(df[ret_col], threshold)
+        df["Label End"] = close_df.index[pos + steps] if pos + steps < len(close_df.index) else pd.NaT
+
+        if train:
+            if model is None or i - last_fit >= refit_every:
+                known = [h for h in history if h["Label End"].iloc[0] <= date]
+                model = _fit(pd.concat(known, ignore_index=True), target_col, params) if known else None
+                last_fit = i if model is not None else None
+            if model is not None:
+                pipeline, features = model
+                df["ML_Points"] = pipeline.predict_proba(df[features])[:, 1] * 100
+            else:
+                df["ML_Points"] = np.nan
+            df["Ocena AI"] = reguly_oceny.classify_ai(df)
+
+        print(f"📅 {date.date()}: {len(df)} spółek")
+        history.append(df)
+
+    if not history:
+        return pd.DataFrame()
+    return pd.concat(history, ignore_index=True)
+
+
+def summarize_backtest(results, horizon="6m", threshold=10):
+    # Średni zrealizowany zwrot i trafność dla każdej oceny oraz korelacja rang Score ze zwrotem
+    ret_col, target_col = return_column(horizon), target_column(horizon, threshold)
+    done = results[results[ret_col].notna()]
+    groups = ["Ocena końcowa"] + (["Ocena AI"] if "Ocena AI" in done else [])
+    summary = {}
+    for column in groups:
+        summary[column] = done.groupby(column)[[ret_col, target_col]].agg(
+            {ret_col: ["count", "mean", "median"], target_col: "mean"}).round(2)
+    ranks = done.groupby("Date")[["Score", ret_col]].rank()
+    summary["IC"] = ranks.groupby(done["Date"]).apply(lambda g: g["Score"].corr(g[ret_col])).rename("IC")
+    return summary
+
+
+if __name__ == "__main__":
+    import magazyn_migawek
+
+    with open("../data/tickers.txt", encoding="utf-8") as f:
+        tickers = [line.strip() for line in f if line.strip()]
+    panel = panel_cenowy.load_price_panel(tickers, period="5y")
+
+    labels = label_frame(panel)
+    labels.to_csv("../data/etykiety_wielohoryzontowe.csv", index=False, encoding="utf-8-sig")
+    print(f"Zapisano {len(labels)} etykiet do: ../data/etykiety_wielohoryzontowe.csv")
+
+    results = backtest(panel, store=magazyn_migawek.fundamental_store())
+    results.to_csv("../data/backtest.csv", index=False, encoding="utf-8-sig")
+    for name, table in summarize_backtest(results).items():
+        print(f"\n📊 {name}")
+        print(table)
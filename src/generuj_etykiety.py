@@ -1,34 +1,13 @@
-import yfinance as yf
-import pandas as pd
-
-def get_return(ticker, months=6):
-    try:
-        stock = yf.Ticker(ticker)
-        hist = stock.history(period=f"{months+1}mo")  # +1 to zapewnić dane
-        if hist.empty or len(hist) < 2:
-            return "N/A"
-
-        price_now = hist["Close"].iloc[-1]
-        price_then = hist["Close"].iloc[0]
-
-        return_pct = round((price_now - price_then) / price_then * 100, 2)
-        return return_pct
-    except:
-        return "N/A"
+import etykiety_wektorowe
+import panel_cenowy
+import schemat_danych
 
 def generate_labels(fundamental_csv, output_csv):
-    df = pd.read_csv(fundamental_csv)
-
-    labels = []
-    for ticker in df["Ticker"]:
-        print(f"Pobieranie: {ticker}")
-        ret = get_return(ticker, months=6)
-        if ret == "N/A":
-            labels.append("N/A")
-        else:
-            labels.append(1 if ret >= 10 else 0)
+    df = schemat_danych.read_dataset(fundamental_csv, schemat_danych.FUNDAMENTAL_SCHEMA)
 
-    df["Target (6m +10%)"] = labels
+    # Jedno zapytanie o panel i etykiety liczone naraz dla wszystkich spółek
+    panel = panel_cenowy.load_price_panel(df["Ticker"])
+    df["Target (6m +10%)"] = etykiety_wektorowe.trailing_labels(panel, df["Ticker"]).to_numpy()
     df.to_csv(output_csv, index=False, encoding="utf-8-sig")
     print(f"Zapisano do: {output_csv}")
 
@@ -0,0 +1,256 @@
+# instrumentacja.py
+import cProfile
+import functools
+import io
+import json
+import os
+import pickle
+import pstats
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+import pandas as pd
+
+# Metody dostawcy danych, które liczymy i mierzymy
+PROVIDER_METHODS = ["info", "financials", "balance_sheet", "quarterly_financials", "quarterly_balance_sheet",
+                    "history", "download", "quote"]
+
+
+def payload_size(obj):
+    # Przybliżony rozmiar danych w bajtach (ramki – pamięć kolumn, reszta – pickle)
+    if isinstance(obj, (pd.DataFrame, pd.Series)):
+        return int(obj.memory_usage(deep=True).sum()) if isinstance(obj, pd.DataFrame) \
+            else int(obj.memory_usage(deep=True))
+    try:
+        return len(pickle.dumps(obj))
+    except Exception:
+        return 0
+
+
+class Tracer:
+    # Zbiera zdarzenia (czas ścienny, czas CPU wątku, rozmiar danych) dla etapów,
+    # tickerów i wywołań dostawcy. Wyłączony nie robi nic poza jednym sprawdzeniem flagi.
+
+    def __init__(self):
+        self.enabled = False
+        self.profile = False
+        self.events = []
+        self.counters = {}
+        self.profiles = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._origin = time.perf_counter()
+        self._threads = {}
+
+    def reset(self):
+        with self._lock:
+            self.events, self.counters, self.profiles = [], {}, {}
+            self._origin = time.perf_counter()
+
+    def count(self, name, n=1):
+        if not self.enabled:
+            return
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def _tid(self):
+        ident = threading.get_ident()
+        with self._lock:
+            return self._threads.setdefault(ident, len(self._threads) + 1)
+
+    @contextmanager
+    def span(self, name, category="stage", ticker=None, **args):
+        if not self.enabled:
+            yield {}
+            return
+        depth = getattr(self._local, "depth", 0)
+        self._local.depth = depth + 1
+        extra = dict(args)
+        profiler = None
+        # cProfile i tracemalloc tylko dla etapów najwyższego poziomu w danym wątku
+        if self.profile and category in ("stage", "step") and depth == 0:
+            profiler = cProfile.Profile()
+            try:
+                profiler.enable()
+            except ValueError:
+                profiler = None
+            memory_before = tracemalloc.take_snapshot() if tracemalloc.is_tracing() else None
+        start, cpu_start = time.perf_counter(), time.thread_time()
+        error = None
+        try:
+            yield extra
+        except Exception as e:
+            error = type(e).__name__
+            raise
+        finally:
+            wall, cpu = time.perf_counter() - start, time.thread_time() - cpu_start
+            self._local.depth = depth
+            if profiler is not None:
+                profiler.disable()
+                self._store_profile(name, profiler, memory_before, wall)
+            event = {"name": name, "cat": category, "ts": (start - self._origin) * 1e6, "dur": wall * 1e6,
+                     "cpu": cpu * 1e6, "tid": self._tid(), "ticker": ticker, "error": error, "args": extra}
+            with self._lock:
+                self.events.append(event)
+
+    def _store_profile(self, name, profiler, memory_before, wall):
+        stream = io.StringIO()
+        pstats.Stats(profiler, stream=stream).sort_stats("cumulative").print_stats(25)
+        memory = ""
+        if memory_before is not None:
+            diff = tracemalloc.take_snapshot().compare_to(memory_before, "lineno")
+            memory = "\n".join(str(stat) for stat in diff[:15])
+        with self._lock:
+            self.profiles[name] = {"seconds": wall, "cprofile": stream.getvalue(), "tracemalloc": memory}
+
+    def summary(self):
+        # Tabela: kategoria, nazwa, liczba wywołań, czasy, rozmiar danych, błędy
+        if not self.events:
+            return pd.DataFrame(columns=["cat", "name", "calls", "wall_s", "mean_ms", "max_ms", "cpu_s",
+                                         "bytes", "errors"])
+        df = pd.DataFrame(self.events)
+        df["bytes"] = [e["args"].get("bytes", 0) for e in self.events]
+        out = df.groupby(["cat", "name"]).agg(
+            calls=("dur", "size"), wall_s=("dur", "sum"), mean_ms=("dur", "mean"), max_ms=("dur", "max"),
+            cpu_s=("cpu", "sum"), bytes=("bytes", "sum"), errors=("error", "count")).reset_index()
+        out["wall_s"] /= 1e6
+        out["cpu_s"] /= 1e6
+        out["mean_ms"] /= 1e3
+        out["max_ms"] /= 1e3
+        return out.sort_values("wall_s", ascending=False, ignore_index=True).round(4)
+
+    def slowest_tickers(self, n=10):
+        per_ticker = [e for e in self.events if e["ticker"]]
+        if not per_ticker:
+            return pd.DataFrame(columns=["ticker", "wall_s", "calls"])
+        df = pd.DataFrame(per_ticker)
+        out = df.groupby("ticker").agg(wall_s=("dur", "sum"), calls=("dur", "size")).reset_index()
+        out["wall_s"] /= 1e6
+        return out.nlargest(n, "wall_s").round(4)
+
+    def print_summary(self, n=20):
+        with pd.option_context("display.width", 200, "display.max_columns", 20):
+            print("\n⏱️  Podsumowanie przebiegu:")
+            print(self.summary().head(n).to_string(index=False))
+            slowest = self.slowest_tickers()
+            if len(slowest):
+                print("\n🐢 Najwolniejsze tickery:")
+                print(slowest.to_string(index=False))
+            if self.counters:
+                print("\n🔢 Liczniki:")
+                for name, value in sorted(self.counters.items()):
+                    print(f"  {name}: {value}")
+
+    def write_trace(self, path, top_profiles=3):
+        # Format Chrome trace (chrome://tracing, Perfetto): zdarzenia "X" z czasem CPU w args
+        trace = []
+        for e in self.events:
+            args = {"cpu_ms": round(e["cpu"] / 1e3, 3), **e["args"]}
+            if e["ticker"]:
+                args["ticker"] = e["ticker"]
+            if e["error"]:
+                args["error"] = e["error"]
+            trace.append({"name": e["name"], "cat": e["cat"], "ph": "X", "ts": round(e["ts"], 1),
+                          "dur": round(e["dur"], 1), "pid": os.getpid(), "tid": e["tid"], "args": args})
+        data = {"traceEvents": trace, "displayTimeUnit": "ms",
+                "otherData": {"counters": self.counters,
+                              "summary": self.summary().to_dict(orient="records")}}
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, default=str)
+
+        # Profile najcięższych etapów obok pliku śladu
+        heaviest = sorted(self.profiles.items(), key=lambda item: item[1]["seconds"], reverse=True)
+        for name, profile in heaviest[:top_profiles]:
+            profile_path = f"{os.path.splitext(path)[0]}.{name}.profil.txt"
+            with open(profile_path, "w", encoding="utf-8") as f:
+                f.write(f"# {name}: {profile['seconds']:.2f} s\n\n## cProfile\n{profile['cprofile']}")
+                if profile["tracemalloc"]:
+                    f.write(f"\n## tracemalloc (przyrost pamięci)\n{profile['tracemalloc']}\n")
+        return path
+
+
+tracer = Tracer()
+
+
+def span(name, category="stage", ticker=None, **args):
+    return tracer.span(name, category, ticker, **args)
+
+
+def count(name, n=1):
+    tracer.count(name, n)
+
+
+def traced(name=None, category="stage", ticker_arg=False):
+    # Dekorator: cała funkcja jako zdarzenie; ticker_arg=True bierze ticker z pierwszego argumentu
+    def decorate(func):
+        label = name or func.__name__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not tracer.enabled:
+                return func(*args, **kwargs)
+            ticker = args[0] if ticker_arg and args and isinstance(args[0], str) else None
+            with tracer.span(label, category, ticker):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+class InstrumentedProvider:
+    # Opakowanie dostawcy: czas, liczba wywołań, błędy i rozmiar odpowiedzi każdej metody
+
+    def __init__(self, provider):
+        self.provider = provider
+
+    def __getattr__(self, attr):
+        target = getattr(self.provider, attr)
+        if attr not in PROVIDER_METHODS:
+            return target
+
+        def call(*args, **kwargs):
+            if not tracer.enabled:
+                return target(*args, **kwargs)
+            ticker = args[0] if args and isinstance(args[0], str) else None
+            tracer.count(f"provider.{attr}")
+            with tracer.span(f"provider.{attr}", "provider", ticker) as extra:
+                try:
+                    result = target(*args, **kwargs)
+                except Exception:
+                    tracer.count(f"provider.{attr}.errors")
+                    raise
+                extra["bytes"] = payload_size(result)
+                if attr == "download":
+                    extra["tickers"] = len(args[0]) if args else 0
+                return result
+        return call
+
+
+def _instrument(provider):
+    return provider if isinstance(provider, InstrumentedProvider) else InstrumentedProvider(provider)
+
+
+def enable(profile=False):
+    # Włącza zbieranie zdarzeń i opakowuje dostawcę danych – bieżącego i tworzonego później
+    # (dostawca powstaje przy pierwszym użyciu, już po wyborze katalogu cache)
+    import dostawca_danych
+
+    tracer.enabled = True
+    tracer.profile = profile
+    if profile and not tracemalloc.is_tracing():
+        tracemalloc.start()
+    dostawca_danych.set_wrapper(_instrument)
+
+
+def disable():
+    import dostawca_danych
+
+    tracer.enabled = False
+    if tracemalloc.is_tracing():
+        tracemalloc.stop()
+    dostawca_danych.set_wrapper(None)
+    provider = dostawca_danych._provider
+    if isinstance(provider, InstrumentedProvider):
+        dostawca_danych.set_provider(provider.provider)
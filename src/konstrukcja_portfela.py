@@ -0,0 +1,292 @@
+# konstrukcja_portfela.py
+import os
+
+import numpy as np
+import pandas as pd
+
+import instrumentacja
+
+WEIGHTS_PATH = os.path.join("..", "data", "portfel_wagi.csv")
+
+METHODS = ["min_var", "risk_parity", "score"]
+TRADING_DAYS = 252
+WINDOW = 252
+REBALANCE_EVERY = 21
+MAX_WEIGHT = 0.10
+
+
+def select_candidates(df, top=30, min_score=None):
+    # Najwyżej oceniane spółki: Score, przy remisie ML_Points; bez wierszy z błędnymi danymi
+    df = df.dropna(subset=["Ticker", "Score"])
+    if "Status" in df:
+        df = df[df["Status"].astype(str) != "Błędne dane"]
+    if min_score is not None:
+        df = df[df["Score"] >= min_score]
+    by = ["Score", "ML_Points"] if "ML_Points" in df else ["Score"]
+    return df.sort_values(by, ascending=False, na_position="last").drop_duplicates("Ticker").head(top)
+
+
+def daily_returns(panel, tickers):
+    # Dzienne stopy zwrotu (sesje, w których notowana była choć jedna spółka)
+    close = panel.field("Close").reindex(columns=list(tickers))
+    return close.pct_change(fill_method=None).iloc[1:].dropna(how="all")
+
+
+class RollingCovariance:
+    # Statystyki dostateczne okna zwrotów: X'X i (X²)'(X²). Dodanie lub usunięcie k sesji to
+    # aktualizacja rzędu k zamiast liczenia całego okna od nowa. Zwroty traktujemy jako
+    # wyśrodkowane (średnia dzienna ≈ 0), jak ledoit_wolf(..., assume_centered=True);
+    # brak notowania to zerowy wkład do sum.
+
+    def __init__(self, n_assets):
+        self.n = 0
+        self.xx = np.zeros((n_assets, n_assets))
+        self.x2x2 = np.zeros((n_assets, n_assets))
+
+    def _update(self, rows, sign):
+        rows = np.nan_to_num(np.asarray(rows, dtype=np.float64))
+        squared = rows * rows
+        self.xx += sign * (rows.T @ rows)
+        self.x2x2 += sign * (squared.T @ squared)
+        self.n += sign * len(rows)
+
+    def add(self, rows):
+        self._update(rows, 1)
+
+    def remove(self, rows):
+        self._update(rows, -1)
+
+    def shrunk(self):
+        # Ledoit–Wolf: kombinacja macierzy próbkowej i μI z optymalną intensywnością skurczenia
+        n, p = self.n, len(self.xx)
+        if n < 2:
+            raise ValueError("Za mało sesji do estymacji kowariancji")
+        sample = self.xx / n
+        mu = np.trace(sample) / p
+        delta = (np.sum(sample ** 2) - 2 * mu * np.trace(sample) + p * mu ** 2) / p
+        beta = (self.x2x2.sum() / n - np.sum(sample ** 2)) / (p * n)
+        shrinkage = 0.0 if delta <= 0 else min(max(beta, 0.0), delta) / delta
+        cov = (1 - shrinkage) * sample
+        cov[np.diag_indices(p)] += shrinkage * mu
+        return cov, shrinkage
+
+
+def shrunk_covariance(returns):
+    rolling = RollingCovariance(returns.shape[1])
+    rolling.add(returns)
+    return rolling.shrunk()
+
+
+def project_capped_simplex(v, cap):
+    # Rzut na {0 <= w <= cap, suma w = 1}: w = clip(v - τ, 0, cap). Suma jest odcinkami liniowa
+    # i nierosnąca w τ z załamaniami w v i v - cap – τ z sum sufiksowych posortowanych wartości
+    p = len(v)
+    if cap * p < 1 - 1e-12:
+        raise ValueError(f"Limit {cap:.0%} na spółkę nie pozwala zainwestować całości w {p} spółek")
+    a = np.sort(v)
+    c = a - cap
+    suffix_a = np.concatenate([np.cumsum(a[::-1])[::-1], [0.0]])
+    suffix_c = np.concatenate([np.cumsum(c[::-1])[::-1], [0.0]])
+    taus = np.sort(np.concatenate([a, c]))
+    ka = np.searchsorted(a, taus, side="right")
+    kc = np.searchsorted(c, taus, side="right")
+    total = suffix_a[ka] - (p - ka) * taus - (suffix_c[kc] - (p - kc) * taus)
+    j = max(int(np.searchsorted(-total, -1.0, side="right")) - 1, 0)
+    tau = taus[j]
+    if j + 1 < len(taus) and total[j] > total[j + 1]:
+        tau += (total[j] - 1.0) / (total[j] - total[j + 1]) * (taus[j + 1] - taus[j])
+    w = np.clip(v - tau, 0, cap)
+    return w / w.sum()
+
+
+def _projected_gradient(cov, linear, cap, w, iterations, tol):
+    # Przyspieszony gradient rzutowany z restartem pędu, gdy krok przestaje zmniejszać cel;
+    # krok z ograniczenia Gerszgorina na największą wartość własną (bez rozkładu macierzy)
+    step = 1.0 / np.abs(cov).sum(axis=1).max()
+    y, t = w.copy(), 1.0
+    for _ in range(iterations):
+        w_next = project_capped_simplex(y - step * (cov @ y - linear), cap)
+        if (y - w_next) @ (w_next - w) > 0:
+            t = 1.0
+        t_next = (1 + np.sqrt(1 + 4 * t * t)) / 2
+        y = w_next + (t - 1) / t_next * (w_next - w)
+        if np.abs(w_next - w).sum() < tol:
+            return w_next
+        w, t = w_next, t_next
+    return w
+
+
+def _capped_qp(cov, linear=None, cap=MAX_WEIGHT, w0=None, iterations=200, tol=1e-10):
+    # min ½ w'Σw - linear'w przy 0 <= w <= cap, suma w = 1. Bez punktu startowego krótki gradient
+    # rzutowany wskazuje, które wagi leżą na granicach (z poprzednimi wagami przy rebalansowaniu
+    # są już prawie trafione); dokładne rozwiązanie daje metoda zbioru aktywnego
+    p = len(cov)
+    linear = np.zeros(p) if linear is None else linear
+    w = project_capped_simplex(np.full(p, 1.0 / p) if w0 is None else w0, cap)
+    if w0 is None:
+        w = _projected_gradient(cov, linear, cap, w, iterations, tol)
+    exact = _active_set(cov, linear, cap, w, tol * np.mean(np.diag(cov)))
+    if exact is not None:
+        return exact
+    instrumentacja.count("portfolio.qp_fallback")
+    return _projected_gradient(cov, linear, cap, w, 5000, tol)
+
+
+def _kkt_solve(cov, linear, cap, lower, upper):
+    # Wagi przy ustalonych granicach: w_L = 0, w_U = cap, na wolnych wagach układ KKT
+    # [Σ_FF 1; 1' 0][w_F; ν] = [linear_F - cap·Σ_FU 1; 1 - cap·|U|]. Zwraca (w, g + ν),
+    # gdzie g = Σw - linear; na wolnych wagach g + ν = 0
+    free = np.flatnonzero(~(lower | upper))
+    w = np.where(upper, cap, 0.0)
+    kkt = np.ones((len(free) + 1, len(free) + 1))
+    kkt[:-1, :-1] = cov[np.ix_(free, free)]
+    kkt[-1, -1] = 0.0
+    rhs = np.append(linear[free] - cov[np.ix_(free, np.flatnonzero(upper))].sum(axis=1) * cap,
+                    1.0 - cap * upper.sum())
+    solution = np.linalg.solve(kkt, rhs)
+    w[free] = solution[:-1]
+    return w, cov @ w - linear + solution[-1]
+
+
+def _active_set(cov, linear, cap, w, tol, iterations=30):
+    # Metoda prymalno-dualna zbioru aktywnego: z bieżących wag i mnożników granic zgadujemy naraz
+    # wszystkie wagi na granicach, rozwiązujemy układ KKT na pozostałych i powtarzamy, aż zbiory
+    # przestaną się zmieniać – wtedy wynik jest dokładnym optimum. Zwykle kilka układów |F| + 1
+    # zamiast tysięcy kroków gradientu; None, gdy zbiory się nie ustaliły.
+    scale = np.mean(np.diag(cov))
+    lower, upper = w <= 1e-12, w >= cap - 1e-12
+    for _ in range(iterations):
+        if cap * upper.sum() > 1 or not (~(lower | upper)).any():
+            break
+        x, slack = _kkt_solve(cov, linear, cap, lower, upper)
+        lower_next = slack - scale * x > tol
+        upper_next = -slack - scale * (cap - x) > tol
+        if np.array_equal(lower_next, lower) and np.array_equal(upper_next, upper):
+            x = np.clip(x, 0.0, cap)
+            return x / x.sum()
+        lower, upper = lower_next, upper_next & ~lower_next
+    return None
+
+
+def min_variance(cov, cap=MAX_WEIGHT, w0=None):
+    return _capped_qp(cov, cap=cap, w0=w0)
+
+
+def risk_parity(cov, cap=MAX_WEIGHT, budgets=None, iterations=50, tol=1e-12):
+    # Równy (lub zadany) wkład w ryzyko: metoda Newtona dla wypukłego min ½x'Σx - Σ b·log x
+    # (w optimum x_i·(Σx)_i = b_i), potem normalizacja i limit pozycji
+    p = len(cov)
+    budgets = np.full(p, 1.0 / p) if budgets is None else np.asarray(budgets, dtype=float) / np.sum(budgets)
+    x = 1.0 / np.sqrt(np.diag(cov))
+    x *= np.sqrt(1.0 / (x @ cov @ x))
+
+    def objective(x):
+        return 0.5 * x @ cov @ x - budgets @ np.log(x)
+
+    value = objective(x)
+    for _ in range(iterations):
+        gradient = cov @ x - budgets / x
+        hessian = cov + np.diag(budgets / (x * x))
+        step = np.linalg.solve(hessian, -gradient)
+        if -gradient @ step < tol:
+            break
+        alpha = 1.0
+        # Krok skracany, aż x pozostaje dodatnie i cel maleje
+        while np.any(x + alpha * step <= 0) or objective(x + alpha * step) > value:
+            alpha /= 2
+            if alpha < 1e-10:
+                break
+        x = x + alpha * step
+        value = objective(x)
+    w = x / x.sum()
+    return w if w.max() <= cap else project_capped_simplex(w, cap)
+
+
+def score_tilted(cov, scores, cap=MAX_WEIGHT, tilt=1.0, w0=None):
+    # Minimalna wariancja z premią za ocenę: linear = tilt · z(Score) · średnia wariancja,
+    # więc tilt nie zależy od skali zwrotów (tilt=0 – czysta minimalna wariancja)
+    scores = np.asarray(scores, dtype=float)
+    spread = np.nanstd(scores)
+    z = np.nan_to_num((scores - np.nanmean(scores)) / spread) if spread > 0 else np.zeros(len(scores))
+    return _capped_qp(cov, linear=tilt * z * np.mean(np.diag(cov)), cap=cap, w0=w0)
+
+
+def weights(cov, method="min_var", scores=None, cap=MAX_WEIGHT, tilt=1.0, w0=None):
+    if method == "min_var":
+        return min_variance(cov, cap, w0)
+    if method == "risk_parity":
+        return risk_parity(cov, cap)
+    if method == "score":
+        return score_tilted(cov, scores, cap, tilt, w0)
+    raise ValueError(f"Nieznana metoda: {method} (dostępne: {', '.join(METHODS)})")
+
+
+def risk_contributions(w, cov):
+    total = w @ cov @ w
+    return w * (cov @ w) / total
+
+
+@instrumentacja.traced("build_portfolio", "step")
+def build_portfolio(returns, method="min_var", scores=None, cap=MAX_WEIGHT, window=WINDOW, tilt=1.0):
+    # Wagi na ostatnią sesję z kowariancji `window` ostatnich sesji
+    tickers = list(returns.columns)
+    cov, shrinkage = shrunk_covariance(returns.tail(window).to_numpy())
+    w = weights(cov, method, scores, cap, tilt)
+    vol = np.sqrt(np.diag(cov) * TRADING_DAYS)
+    out = pd.DataFrame({"Ticker": tickers, "Weight": w, "Volatility (%)": vol * 100,
+                        "Risk Contribution": risk_contributions(w, cov)})
+    if scores is not None:
+        out["Score"] = np.asarray(scores)
+    portfolio_vol = np.sqrt(w @ cov @ w * TRADING_DAYS) * 100
+    print(f"📐 {method}: {int((w > 1e-6).sum())} pozycji, zmienność {portfolio_vol:.1f}% rocznie, "
+          f"skurczenie {shrinkage:.2f}")
+    return out.sort_values("Weight", ascending=False, ignore_index=True)
+
+
+@instrumentacja.traced("rolling_rebalance", "step")
+def rolling_rebalance(returns, method="min_var", scores=None, cap=MAX_WEIGHT, window=WINDOW,
+                      every=REBALANCE_EVERY, tilt=1.0):
+    # Rebalansowanie co `every` sesji: okno kowariancji przesuwane przyrostowo (dopisanie nowych
+    # sesji, usunięcie najstarszych), poprzednie wagi jako punkt startowy optymalizatora.
+    # Zwraca wagi w datach rebalansowania i dzienne zwroty portfela poza próbą.
+    X = returns.to_numpy()
+    dates = returns.index
+    rolling = RollingCovariance(X.shape[1])
+    rolling.add(X[:window])
+    w, rows, daily = None, [], []
+    for start in range(window, len(X), every):
+        if start > window:
+            rolling.add(X[start - every:start])
+            rolling.remove(X[start - every - window:start - window])
+        cov, _ = rolling.shrunk()
+        # Spółki bez notowań w oknie nie dostają wagi
+        listed = np.isfinite(X[start - window:start]).any(axis=0) & (np.diag(cov) > 0)
+        w_new = np.zeros(X.shape[1])
+        sub = np.ix_(listed, listed)
+        w0 = w[listed] if w is not None and w[listed].sum() > 0 else None
+        w_new[listed] = weights(cov[sub], method, None if scores is None else np.asarray(scores)[listed],
+                                max(cap, 1.0 / listed.sum()), tilt, w0)
+        turnover = np.abs(w_new - (w if w is not None else 0)).sum() / 2
+        w = w_new
+        rows.append(pd.Series(w, index=returns.columns, name=dates[start]).to_frame().T.assign(Turnover=turnover))
+        period = np.nan_to_num(X[start:start + every])
+        daily.append(pd.Series(period @ w, index=dates[start:start + every]))
+    if not rows:
+        raise ValueError(f"Za krótka historia: potrzeba więcej niż {window} sesji")
+    return pd.concat(rows), pd.concat(daily)
+
+
+def summarize_returns(daily):
+    growth = (1 + daily).cumprod()
+    years = len(daily) / TRADING_DAYS
+    drawdown = growth / growth.cummax() - 1
+    vol = daily.std() * np.sqrt(TRADING_DAYS)
+    annual = growth.iloc[-1] ** (1 / years) - 1 if years > 0 else np.nan
+    return {"Zwrot roczny (%)": round(annual * 100, 2), "Zmienność (%)": round(vol * 100, 2),
+            "Sharpe": round(annual / vol, 2) if vol > 0 else np.nan,
+            "Maks. obsunięcie (%)": round(drawdown.min() * 100, 2), "Sesje": len(daily)}
+
+
+def save_weights(df, path=WEIGHTS_PATH):
+    df.to_csv(path, index=False, encoding="utf-8-sig")
+    print(f"Zapisano wagi do: {path}")
@@ -0,0 +1,261 @@
+# magazyn_cech.py
+import hashlib
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+import instrumentacja
+import schemat_danych
+
+STORE_ROOT = os.path.join("..", "data", "cechy")
+
+FEATURES = [
+    "P/E", "PEG", "ROE (%)", "Debt/Assets", "EV/FCF",
+    "EPS Growth (%)", "Revenue Growth (%)", "RSI", "Drop from ATH (%)",
+    "SMA50", "SMA200", "Beta", "Dividend Yield (%)",
+    "EMA Crossover", "Strefa"
+]
+
+# Pliki macierzy: nazwa -> typ elementu (wiersze w kolejności (Date, Ticker))
+FILES = {"values": np.float32, "codes": np.int8, "missing": np.uint8, "tickers": np.int32}
+FORMAT = 1
+
+
+def spec(features=FEATURES):
+    numeric = [f for f in features if f not in schemat_danych.CATEGORIES]
+    categorical = [f for f in features if f in schemat_danych.CATEGORIES]
+    return {"format": FORMAT, "features": list(features), "numeric": numeric, "categorical": categorical,
+            "categories": {c: schemat_danych.CATEGORIES[c] for c in categorical}}
+
+
+def version(features=FEATURES):
+    # Zmiana listy cech, słowników kategorii lub formatu zapisu = nowa wersja w osobnym katalogu
+    return hashlib.sha256(json.dumps(spec(features), sort_keys=True).encode()).hexdigest()[:12]
+
+
+class FeatureBlock:
+    # Zakodowane cechy: float32 (NaN = brak, także ±inf), kody kategorii int8 (-1 = brak)
+    # i maska braków spakowana bitowo – wiersz kompletny, gdy jego bajty maski są zerowe
+
+    def __init__(self, spec, dates, tickers, values, codes, missing):
+        self.spec = spec
+        self.dates = dates
+        self.tickers = tickers
+        self.values = values
+        self.codes = codes
+        self.missing = missing
+
+    def __len__(self):
+        return len(self.tickers)
+
+    def complete(self):
+        return ~self.missing.any(axis=1)
+
+    def frame(self, index=None):
+        # Ramka cech o typach jak po schemat_danych.apply_schema – bez konwersji z tekstu
+        columns = {f: self.values[:, j] for j, f in enumerate(self.spec["numeric"])}
+        for j, f in enumerate(self.spec["categorical"]):
+            columns[f] = pd.Categorical.from_codes(self.codes[:, j], categories=self.spec["categories"][f])
+        return pd.DataFrame(columns, index=index)[self.spec["features"]]
+
+    def matrix(self):
+        # Jedna macierz float32: cechy liczbowe, potem kategorie jako kolumny 0/1
+        parts = [np.asarray(self.values, dtype=np.float32)]
+        names = list(self.spec["numeric"])
+        for j, f in enumerate(self.spec["categorical"]):
+            categories = self.spec["categories"][f]
+            parts.append((self.codes[:, j, None] == np.arange(len(categories))).astype(np.float32))
+            names += [f"{f}={c}" for c in categories]
+        return np.hstack(parts), names
+
+    def align(self, tickers):
+        # Wiersze w kolejności `tickers`; nieobecne tickery jako wiersze z samymi brakami
+        tickers = np.asarray(tickers, dtype=object)
+        position = pd.Index(self.tickers).get_indexer(tickers)
+        found = position >= 0
+        rows = np.where(found, position, 0)
+        values = np.where(found[:, None], self.values[rows], np.float32(np.nan)).astype(np.float32)
+        codes = np.where(found[:, None], self.codes[rows], np.int8(-1)).astype(np.int8)
+        missing = np.where(found[:, None], self.missing[rows], np.uint8(0xFF)).astype(np.uint8)
+        n = len(self.spec["features"])
+        if n % 8:
+            # Bity dopełnienia zawsze zerowe
+            missing[:, -1] &= np.uint8((0xFF << (8 - n % 8)) & 0xFF)
+        dates = self.dates[rows] if len(self.dates) else self.dates
+        return FeatureBlock(self.spec, dates, tickers, values, codes, missing), found
+
+
+def encode(df, features=FEATURES, date=None):
+    # Jednorazowe kodowanie ramki (obiektowej lub po schemacie) do tablic FeatureBlock
+    s = spec(features)
+    index = df.index
+    values = np.empty((len(df), len(s["numeric"])), dtype=np.float32)
+    for j, f in enumerate(s["numeric"]):
+        column = pd.to_numeric(df[f], errors="coerce") if f in df else pd.Series(np.nan, index=index)
+        values[:, j] = column.to_numpy(dtype=np.float64, na_value=np.nan)
+    values[~np.isfinite(values)] = np.nan
+    codes = np.empty((len(df), len(s["categorical"])), dtype=np.int8)
+    for j, f in enumerate(s["categorical"]):
+        column = df[f] if f in df else pd.Series(None, index=index, dtype=object)
+        # Wartości spoza słownika (i braki) dostają kod -1
+        codes[:, j] = pd.Index(s["categories"][f]).get_indexer(column.astype(object))
+    mask = np.hstack([np.isnan(values), codes < 0]) if len(df) else np.zeros((0, len(features)), bool)
+    # Kolejność bitów maski = kolejność cech w spec (liczbowe, potem kategorie)
+    missing = np.packbits(mask, axis=1) if mask.shape[1] else np.zeros((len(df), 0), np.uint8)
+    tickers = df["Ticker"].astype(str).to_numpy(dtype=object)
+    day = np.datetime64(pd.Timestamp(date).date(), "D") if date is not None else np.datetime64("NaT", "D")
+    dates = np.full(len(df), day, dtype="datetime64[D]")
+    return FeatureBlock(s, dates, tickers, values, codes, missing)
+
+
+def source_hash(df, features=FEATURES):
+    # Skrót kolumn, z których kodowane są cechy (Ticker i cechy w kolejności wierszy ramki) –
+    # tańszy niż ponowne kodowanie; kategorie jako kody i słownik, liczby jako float64
+    digest = hashlib.sha256("\0".join(df["Ticker"].astype(str).tolist()).encode())
+    for f in features:
+        if f not in df:
+            continue
+        column = df[f]
+        digest.update(f"\0{f}\0{column.dtype}\0".encode())
+        if isinstance(column.dtype, pd.CategoricalDtype):
+            digest.update("\0".join(map(str, column.cat.categories)).encode())
+            digest.update(column.cat.codes.to_numpy().tobytes())
+        elif pd.api.types.is_numeric_dtype(column):
+            digest.update(column.to_numpy(dtype=np.float64, na_value=np.nan).tobytes())
+        else:
+            digest.update("\0".join(column.astype(str).tolist()).encode())
+    return digest.hexdigest()
+
+
+class FeatureStore:
+    # Zakodowane cechy wszystkich migawek w ciągłych plikach binarnych (wiersze posortowane po
+    # (Date, Ticker)); meta.json trzyma daty, przesunięcia i słownik tickerów. Odczyt zakresu dat
+    # to widok na np.memmap bez kopiowania; nowa data (typowo dzisiejsza) jest dopisywana na końcu.
+    # Dla każdej daty meta.json trzyma też skrót ramki źródłowej (source_hash).
+
+    def __init__(self, root=STORE_ROOT, features=FEATURES):
+        self.spec = spec(features)
+        self.version = version(features)
+        self.path = os.path.join(root, self.version)
+
+    def _file(self, name):
+        return os.path.join(self.path, f"{name}.bin")
+
+    def _meta(self):
+        path = os.path.join(self.path, "meta.json")
+        if not os.path.isfile(path):
+            return {"version": self.version, "spec": self.spec, "dates": [], "offsets": [0], "tickers": []}
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+
+    def _save_meta(self, meta):
+        path = os.path.join(self.path, "meta.json")
+        with open(path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(meta, f, ensure_ascii=False)
+        os.replace(path + ".tmp", path)
+
+    def _widths(self):
+        n = len(self.spec["features"])
+        return {"values": len(self.spec["numeric"]), "codes": len(self.spec["categorical"]),
+                "missing": (n + 7) // 8, "tickers": 1}
+
+    def dates(self):
+        return list(self._meta()["dates"])
+
+    def __contains__(self, date):
+        return pd.Timestamp(date).strftime("%Y-%m-%d") in self._meta()["dates"]
+
+    def _arrays(self, rows):
+        widths = self._widths()
+        arrays = {}
+        for name, dtype in FILES.items():
+            shape = (rows, widths[name]) if name != "tickers" else (rows,)
+            if rows == 0 or shape[-1] == 0:
+                arrays[name] = np.zeros(shape, dtype=dtype)
+            else:
+                arrays[name] = np.memmap(self._file(name), dtype=dtype, mode="r", shape=shape)
+        return arrays
+
+    def write(self, date, df):
+        # Migawka cech na `date`; ponowny zapis tej samej daty zastępuje jej wiersze
+        day = pd.Timestamp(date).strftime("%Y-%m-%d")
+        source = df
+        df = df.dropna(subset=["Ticker"]).drop_duplicates("Ticker", keep="last").sort_values("Ticker")
+        block = encode(df, self.spec["features"], day)
+        os.makedirs(self.path, exist_ok=True)
+        meta = self._meta()
+        vocabulary = {t: i for i, t in enumerate(meta["tickers"])}
+        for ticker in block.tickers:
+            if ticker not in vocabulary:
+                vocabulary[ticker] = len(meta["tickers"])
+                meta["tickers"].append(ticker)
+        new = {"values": block.values, "codes": block.codes, "missing": block.missing,
+               "tickers": np.array([vocabulary[t] for t in block.tickers], dtype=np.int32)}
+
+        dates, offsets = meta["dates"], meta["offsets"]
+        if not dates or day > dates[-1] or day == dates[-1]:
+            # Dopisanie na końcu (ta sama data – najpierw obcięcie jej poprzednich wierszy)
+            keep = len(dates) - 1 if dates and day == dates[-1] else len(dates)
+            start = offsets[keep]
+            widths = self._widths()
+            for name, dtype in FILES.items():
+                path = self._file(name)
+                with open(path, "ab") as f:
+                    f.truncate(start * widths[name] * np.dtype(dtype).itemsize)
+                    f.write(np.ascontiguousarray(new[name], dtype=dtype).tobytes())
+            meta["dates"] = dates[:keep] + [day]
+            meta["offsets"] = offsets[:keep + 1] + [start + len(block)]
+        else:
+            # Data wcześniejsza niż ostatnia – przepisanie plików z wstawionym blokiem
+            arrays = {name: np.array(a) for name, a in self._arrays(offsets[-1]).items()}
+            i = int(np.searchsorted(dates, day))
+            replace = i < len(dates) and dates[i] == day
+            lo, hi = offsets[i], offsets[i + 1] if replace else offsets[i]
+            for name, dtype in FILES.items():
+                merged = np.concatenate([arrays[name][:lo], new[name].astype(dtype), arrays[name][hi:]])
+                with open(self._file(name) + ".tmp", "wb") as f:
+                    f.write(np.ascontiguousarray(merged).tobytes())
+                os.replace(self._file(name) + ".tmp", self._file(name))
+            counts = np.diff(offsets).tolist()
+            counts[i:i + 1 if replace else i] = [len(block)]
+            meta["dates"] = dates[:i] + [day] + dates[i + 1 if replace else i:]
+            meta["offsets"] = np.concatenate([[0], np.cumsum(counts)]).astype(int).tolist()
+        meta.setdefault("hashes", {})[day] = source_hash(source, self.spec["features"])
+        self._save_meta(meta)
+        return len(block)
+
+    def load(self, start=None, end=None, tickers=None):
+        # Zakres dat jako widok na pliki (bez kopii); filtr tickerów wybiera wiersze (kopia)
+        meta = self._meta()
+        dates, offsets = meta["dates"], meta["offsets"]
+        first = 0 if start is None else int(np.searchsorted(dates, pd.Timestamp(start).strftime("%Y-%m-%d")))
+        last = len(dates) if end is None else \
+            int(np.searchsorted(dates, pd.Timestamp(end).strftime("%Y-%m-%d"), side="right"))
+        lo, hi = offsets[first], offsets[max(first, last)]
+        arrays = {name: a[lo:hi] for name, a in self._arrays(offsets[-1]).items()}
+        counts = np.diff(offsets[first:max(first, last) + 1])
+        row_dates = np.repeat(np.array(dates[first:last], dtype="datetime64[D]"), counts)
+        vocabulary = np.array(meta["tickers"], dtype=object)
+        if tickers is not None:
+            wanted = pd.Index(vocabulary).get_indexer(pd.Index(tickers).unique())
+            rows = np.flatnonzero(np.isin(arrays["tickers"], wanted[wanted >= 0]))
+            arrays = {name: a[rows] for name, a in arrays.items()}
+            row_dates = row_dates[rows]
+        return FeatureBlock(meta["spec"], row_dates, vocabulary[np.asarray(arrays["tickers"])],
+                            arrays["values"], arrays["codes"], arrays["missing"])
+
+    def snapshot(self, df, date):
+        # Cechy tickerów z `df` na `date` w kolejności wierszy `df`. Zapisana migawka jest używana,
+        # gdy skrót `df` zgadza się ze skrótem ramki, z której ją zapisano; inaczej (brak migawki,
+        # nowe tickery, dane pobrane ponownie tego samego dnia) jest zapisywana od nowa
+        tickers = df["Ticker"].astype(str)
+        meta = self._meta()
+        day = pd.Timestamp(date).strftime("%Y-%m-%d")
+        if day in meta["dates"]:
+            if meta.get("hashes", {}).get(day) == source_hash(df, self.spec["features"]):
+                return self.load(date, date).align(tickers)[0]
+            instrumentacja.count("feature_store.stale")
+        self.write(date, df)
+        return self.load(date, date).align(tickers)[0]
@@ -0,0 +1,115 @@
+# magazyn_migawek.py
+import os
+import pandas as pd
+import schemat_danych
+
+STORE_ROOT = os.path.join("..", "data", "migawki")
+
+
+class SnapshotStore:
+    # Historia dziennych migawek podzielona na partycje Date=RRRR-MM-DD.
+    # Zapis jest idempotentny względem (Date, Ticker), więc ponowne uruchomienie
+    # tego samego dnia nadpisuje wiersze zamiast je dublować. Wymaga pyarrow.
+
+    def __init__(self, name, schema, root=STORE_ROOT):
+        self.name = name
+        self.schema = schema
+        self.path = os.path.join(root, name)
+
+    def _partition_path(self, date):
+        return os.path.join(self.path, f"Date={date}", "part.parquet")
+
+    def dates(self):
+        if not os.path.isdir(self.path):
+            return []
+        return sorted(d[len("Date="):] for d in os.listdir(self.path)
+                      if d.startswith("Date=") and os.path.isfile(os.path.join(self.path, d, "part.parquet")))
+
+    def _read_partition(self, date, columns=None):
+        df = pd.read_parquet(self._partition_path(date), columns=columns)
+        df.insert(0, "Date", pd.Timestamp(date))
+        return df
+
+    def upsert(self, df):
+        # Jeden zapis na partycję: nowe wiersze zastępują istniejące o tym samym tickerze
+        df = schemat_danych.apply_schema(df, self.schema)
+        days = df["Date"].dt.strftime("%Y-%m-%d")
+        for date, part in df.groupby(days, sort=True):
+            part = part.drop(columns="Date")
+            path = self._partition_path(date)
+            if os.path.isfile(path):
+                existing = pd.read_parquet(path)
+                part = pd.concat([existing, part], ignore_index=True)
+            part = part.drop_duplicates("Ticker", keep="last").sort_values("Ticker", ignore_index=True)
+            part = schemat_danych.apply_schema(part, self.schema)
+
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = path + ".tmp"
+            part.to_parquet(tmp_path, index=False)
+            os.replace(tmp_path, path)
+
+    def _empty(self):
+        return pd.DataFrame(columns=list(self.schema))
+
+    def read(self, date):
+        date = pd.Timestamp(date).strftime("%Y-%m-%d")
+        if not os.path.isfile(self._partition_path(date)):
+            return self._empty()
+        return self._read_partition(date)
+
+    def as_of(self, date, lookback=5):
+        # Stan na dzień `date`: najnowszy wiersz każdego tickera z ostatnich `lookback` partycji
+        date = pd.Timestamp(date).strftime("%Y-%m-%d")
+        dates = [d for d in self.dates() if d <= date]
+        if lookback is not None:
+            dates = dates[-lookback:]
+        if not dates:
+            return self._empty()
+        frames = [self._read_partition(d) for d in reversed(dates)]
+        df = pd.concat(frames, ignore_index=True).drop_duplicates("Ticker", keep="first")
+        return df.sort_values("Ticker", ignore_index=True)
+
+    def _scan(self, start=None, end=None, ticker=None, columns=None):
+        # Jeden skan pyarrow.dataset po partycjach – filtry dat i tickera są stosowane
+        # przy odczycie, a pliki czytane są równolegle
+        import pyarrow as pa
+        import pyarrow.dataset as ds
+
+        if not self.dates():
+            return self._empty()
+        partitioning = ds.partitioning(pa.schema([("Date", pa.string())]), flavor="hive")
+        dataset = ds.dataset(self.path, format="parquet", partitioning=partitioning,
+                             exclude_invalid_files=True)
+        expression = None
+        conditions = []
+        if start is not None:
+            conditions.append(ds.field("Date") >= pd.Timestamp(start).strftime("%Y-%m-%d"))
+        if end is not None:
+            conditions.append(ds.field("Date") <= pd.Timestamp(end).strftime("%Y-%m-%d"))
+        if ticker is not None:
+            conditions.append(ds.field("Ticker") == ticker)
+        for condition in conditions:
+            expression = condition if expression is None else expression & condition
+        if columns is not None:
+            columns = ["Date"] + [c for c in columns if c != "Date"]
+        df = dataset.to_table(filter=expression, columns=columns).to_pandas()
+        df["Date"] = pd.to_datetime(df["Date"])
+        df = df[["Date"] + [c for c in df.columns if c != "Date"]]
+        df = schemat_danych.apply_schema(df, self.schema)
+        return df.sort_values(["Date", "Ticker"], ignore_index=True)
+
+    def history(self, ticker, start=None, end=None):
+        # Historia jednego tickera ze wszystkich (lub wybranych) dni
+        return self._scan(start, end, ticker=ticker)
+
+    def load_all(self, start=None, end=None, columns=None):
+        # Wszystkie migawki z zakresu dat w jednej ramce (np. do walidacji lub uczenia)
+        return self._scan(start, end, columns=columns)
+
+
+def fundamental_store(root=STORE_ROOT):
+    return SnapshotStore("fundamentalna", schemat_danych.FUNDAMENTAL_SCHEMA, root)
+
+
+def technical_store(root=STORE_ROOT):
+    return SnapshotStore("techniczna", schemat_danych.TECHNICAL_SCHEMA, root)
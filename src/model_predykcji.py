@@ -1,13 +1,16 @@
+import os
 import pandas as pd
-from sklearn.ensemble import RandomForestClassifier
-from sklearn.model_selection import train_test_split
-from sklearn.preprocessing import OneHotEncoder
-from sklearn.impute import SimpleImputer
-from sklearn.pipeline import Pipeline
-from sklearn.compose import ColumnTransformer
+import schemat_danych
+import rejestr_modeli
+import magazyn_cech
 
 def load_and_prepare_data(csv_path):
-    df = pd.read_excel(csv_path)
+    # Typowana kopia Parquet zapisana przez scalona_ocena, a gdy jej brak – arkusz Excel
+    parquet_path = schemat_danych.columnar_path(csv_path)
+    if os.path.isfile(parquet_path):
+        df = pd.read_parquet(parquet_path)
+    else:
+        df = schemat_danych.apply_schema(pd.read_excel(csv_path), schemat_danych.MERGED_SCHEMA)
 
     # Filtrujemy tylko przypadki z targetem
     df = df[df["Target (6m +10%)"].isin([0, 1])]
@@ -20,42 +23,21 @@ def load_and_prepare_data(csv_path):
         "EMA Crossover", "Strefa"
     ]
 
-    X = df[features]
+    # Cechy zakodowane do tablic float32 (±inf jako brak) zamiast kolumn obiektowych
+    X = magazyn_cech.encode(df, features).frame(index=df.index)
     y = df["Target (6m +10%)"]
 
-    # Podział na cechy numeryczne i kategoryczne
-    numeric_features = [col for col in features if col not in ["EMA Crossover", "Strefa"]]
-    categorical_features = ["EMA Crossover", "Strefa"]
+    return df, X, y
 
-    # Pipeline dla danych numerycznych i kategorii
-    numeric_pipeline = Pipeline([
-        ("imputer", SimpleImputer(strategy="mean"))
-    ])
-
-    categorical_pipeline = Pipeline([
-        ("encoder", OneHotEncoder(handle_unknown="ignore"))
-    ])
-
-    preprocessor = ColumnTransformer([
-        ("num", numeric_pipeline, numeric_features),
-        ("cat", categorical_pipeline, categorical_features)
-    ])
-
-    return df, preprocessor, X, y
-
-def train_model(X, y, preprocessor):
-    # Tworzenie końcowego pipeline
-    model = Pipeline([
-        ("preprocessor", preprocessor),
-        ("classifier", RandomForestClassifier(n_estimators=100, random_state=42))
-    ])
-
-    model.fit(X, y)
+def train_model(X, y):
+    # Preprocesor (imputacja + one-hot) i las losowy z rejestru modeli;
+    # przy niezmienionych danych model jest wczytywany, a nie uczony ponownie
+    model, _ = rejestr_modeli.load_or_train(X, y, list(X.columns))
     return model
 
 def run_prediction(csv_path, output_path):
-    df, preprocessor, X, y = load_and_prepare_data(csv_path)
-    model = train_model(X, y, preprocessor)
+    df, X, y = load_and_prepare_data(csv_path)
+    model = train_model(X, y)
 
     # Predykcja
     df["ML_Predicted"] = model.predict(X)
@@ -0,0 +1,266 @@
+# orkiestrator.py
+import argparse
+import hashlib
+import json
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import date
+
+import pandas as pd
+
+import instrumentacja
+
+SRC_DIR = os.path.dirname(os.path.abspath(__file__))
+DATA_DIR = os.path.join("..", "data")
+STATE_FILE = ".orkiestrator.json"
+
+
+def file_hash(path):
+    if not os.path.isfile(path):
+        return "brak"
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class Stage:
+    # Etap potoku. Skrót liczony jest z parametrów, plików wejściowych (w tym wyników
+    # etapów, od których zależy) i plików źródłowych modułów, których etap używa.
+    # Niezmieniony skrót i istniejące wyniki oznaczają, że etap można pominąć.
+
+    def __init__(self, name, func, outputs, deps=(), inputs=(), sources=(), params=None):
+        self.name = name
+        self.func = func
+        self.outputs = list(outputs)
+        self.deps = list(deps)
+        self.inputs = list(inputs)
+        self.sources = [os.path.join(SRC_DIR, s) for s in sources]
+        self.params = params or {}
+
+
+class Pipeline:
+    def __init__(self, stages, data_dir=DATA_DIR, workers=3):
+        self.stages = {stage.name: stage for stage in stages}
+        self.state_path = os.path.join(data_dir, STATE_FILE)
+        self.workers = workers
+        self._lock = threading.Lock()
+
+    def key(self, stage):
+        files = list(stage.inputs)
+        for dep in stage.deps:
+            files += self.stages[dep].outputs
+        digest = hashlib.sha256(json.dumps({"stage": stage.name, "params": stage.params},
+                                           sort_keys=True, default=str).encode())
+        for path in files + stage.sources:
+            digest.update(f"{os.path.basename(path)}:{file_hash(path)}".encode())
+        return digest.hexdigest()
+
+    def _load_state(self):
+        if not os.path.isfile(self.state_path):
+            return {}
+        with open(self.state_path, encoding="utf-8") as f:
+            return json.load(f)
+
+    def _save_state(self, state):
+        tmp_path = self.state_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(state, f, indent=2)
+        os.replace(tmp_path, self.state_path)
+
+    def _closure(self, targets):
+        # Wybrane etapy razem ze wszystkimi etapami, od których zależą
+        selected, todo = set(), list(targets or self.stages)
+        while todo:
+            name = todo.pop()
+            if name not in self.stages:
+                raise ValueError(f"Nieznany etap: {name}")
+            if name not in selected:
+                selected.add(name)
+                todo += self.stages[name].deps
+        return selected
+
+    def _run_stage(self, stage, state, force):
+        key = self.key(stage)
+        outputs_exist = all(os.path.exists(p) for p in stage.outputs)
+        if not force and outputs_exist and state.get(stage.name) == key:
+            print(f"⏭️  {stage.name}: bez zmian – pomijam")
+            return "pominięto"
+
+        print(f"▶️  {stage.name}")
+        start = time.perf_counter()
+        with instrumentacja.span(stage.name, "stage"):
+            stage.func()
+        missing = [p for p in stage.outputs if not os.path.exists(p)]
+        if missing:
+            raise RuntimeError(f"Etap {stage.name} nie utworzył: {', '.join(missing)}")
+        with self._lock:
+            state[stage.name] = key
+            self._save_state(state)
+        print(f"✅ {stage.name}: {time.perf_counter() - start:.1f} s")
+        return "wykonano"
+
+    def run(self, targets=None, force=()):
+        # Etapy gotowe do uruchomienia (wszystkie zależności zakończone) startują równolegle
+        selected = self._closure(targets)
+        force = set(self.stages) if "all" in force else set(force)
+        state = self._load_state()
+        status = {}
+        remaining = set(selected)
+        running = {}
+
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            while remaining or running:
+                for name in sorted(remaining):
+                    deps = self.stages[name].deps
+                    if any(status.get(d, "").startswith("błąd") for d in deps):
+                        status[name] = "błąd zależności"
+                        remaining.discard(name)
+                    elif all(status.get(d) in ("wykonano", "pominięto") for d in deps):
+                        remaining.discard(name)
+                        running[executor.submit(self._run_stage, self.stages[name], state,
+                                                name in force)] = name
+                if not running:
+                    continue
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    try:
+                        status[name] = future.result()
+                    except Exception as e:
+                        print(f"❌ {name}: {e}")
+                        status[name] = f"błąd: {e}"
+        return status
+
+
+def read_tickers(path):
+    with open(path, encoding="utf-8") as f:
+        return list(dict.fromkeys(line.strip() for line in f if line.strip()))
+
+
+def build_pipeline(data_dir=DATA_DIR, inference_only=False, workers=3):
+    import magazyn_migawek
+
+    paths = {
+        "tickers": os.path.join(data_dir, "tickers.txt"),
+        "fundamental": os.path.join(data_dir, "analiza_fundamentalna.csv"),
+        "technical": os.path.join(data_dir, "analiza_techniczna.csv"),
+        "labels": os.path.join(data_dir, "etykiety.csv"),
+        "merged": os.path.join(data_dir, "ocena_wstepna.parquet"),
+        "scored": os.path.join(data_dir, "scalona_ocena.csv"),
+        "alerts": os.path.join(data_dir, "alerty_walidacja.csv"),
+    }
+    scored_parquet = os.path.splitext(paths["scored"])[0] + ".parquet"
+    excel_path = os.path.splitext(paths["scored"])[0] + ".xlsx"
+    store_root = os.path.join(data_dir, "migawki")
+    features_root = os.path.join(data_dir, "cechy")
+    # Dane rynkowe zmieniają się z dnia na dzień – etapy pobierające mają datę w skrócie
+    today = {"day": date.today().isoformat()}
+
+    def fundamental():
+        import analiza_fundamentalna
+        analiza_fundamentalna.analyze_multiple_companies(
+            read_tickers(paths["tickers"]), paths["fundamental"],
+            store=magazyn_migawek.fundamental_store(store_root))
+
+    def technical():
+        import analiza_techniczna
+        analiza_techniczna.analyze_many(read_tickers(paths["tickers"]), paths["technical"],
+                                        store=magazyn_migawek.technical_store(store_root))
+
+    def labels():
+        import etykiety_wektorowe
+        import panel_cenowy
+        tickers = read_tickers(paths["tickers"])
+        panel = panel_cenowy.load_price_panel(tickers)
+        target = etykiety_wektorowe.trailing_labels(panel, tickers)
+        pd.DataFrame({"Ticker": tickers, "Target (6m +10%)": target.to_numpy()}).to_csv(
+            paths["labels"], index=False, encoding="utf-8-sig")
+
+    def merge():
+        import scalona_ocena
+        import schemat_danych
+        import walidacja_danych
+        df_fund = schemat_danych.read_dataset(paths["fundamental"], schemat_danych.FUNDAMENTAL_SCHEMA)
+        df_tech = schemat_danych.read_dataset(paths["technical"], schemat_danych.TECHNICAL_SCHEMA)
+        df = scalona_ocena.score(scalona_ocena.merge_inputs(df_fund, df_tech))
+        df = scalona_ocena.add_labels(df, pd.read_csv(paths["labels"]))
+        df = walidacja_danych.validate_data(df, alerts_path=paths["alerts"],
+                                           history=walidacja_danych.snapshot_history(store_root))
+        df.to_parquet(paths["merged"], index=False)
+        # Cechy ML kodowane raz na migawkę – etap ml i kolejne predykcje czytają gotowe tablice
+        import magazyn_cech
+        magazyn_cech.FeatureStore(features_root).write(scalona_ocena.snapshot_date(df), df)
+
+    def ml():
+        import magazyn_cech
+        import scalona_ocena
+        import schemat_danych
+        df = pd.read_parquet(paths["merged"])
+        df, _ = scalona_ocena.train_model(df, scalona_ocena.FEATURES, inference_only=inference_only,
+                                          model_dir=os.path.join(data_dir, "modele"),
+                                          importance_path=os.path.join(data_dir, "feature_importance.csv"),
+                                          feature_store=magazyn_cech.FeatureStore(features_root))
+        schemat_danych.write_columnar(df.sort_values(by="Score", ascending=False), paths["scored"])
+
+    def export():
+        import eksport_excel
+        eksport_excel.write_report(pd.read_parquet(scored_parquet), excel_path)
+        print(f"Zapisano do: {excel_path}")
+
+    stages = [
+        Stage("fundamental", fundamental, [paths["fundamental"]], inputs=[paths["tickers"]],
+              sources=["analiza_fundamentalna.py", "dostawca_danych.py", "schemat_danych.py"], params=today),
+        Stage("technical", technical, [paths["technical"]], inputs=[paths["tickers"]],
+              sources=["analiza_techniczna.py", "wskazniki_wektorowe.py", "panel_cenowy.py", "schemat_danych.py"],
+              params=today),
+        Stage("labels", labels, [paths["labels"]], inputs=[paths["tickers"]],
+              sources=["etykiety_wektorowe.py", "panel_cenowy.py"], params=today),
+        Stage("merge", merge, [paths["merged"]], deps=["fundamental", "technical", "labels"],
+              sources=["scalona_ocena.py", "reguly_oceny.py", "walidacja_danych.py", "schemat_danych.py",
+                       "magazyn_migawek.py", "magazyn_cech.py"]),
+        Stage("ml", ml, [scored_parquet], deps=["merge"],
+              sources=["scalona_ocena.py", "rejestr_modeli.py", "magazyn_cech.py", "schemat_danych.py"],
+              params={"inference_only": inference_only}),
+        Stage("export", export, [excel_path], deps=["ml"], sources=["eksport_excel.py"]),
+    ]
+    return Pipeline(stages, data_dir, workers)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Potok Portfel2025: etapy uruchamiane tylko przy zmianie wejść")
+    parser.add_argument("stages", nargs="*", help="etapy do wykonania (domyślnie wszystkie)")
+    parser.add_argument("--data-dir", default=DATA_DIR)
+    parser.add_argument("--force", nargs="*", default=[], help="etapy wykonywane mimo braku zmian ('all' – wszystkie)")
+    parser.add_argument("--inference-only", action="store_true", help="ocena ML bez uczenia modelu")
+    parser.add_argument("--workers", type=int, default=3)
+    parser.add_argument("--trace", nargs="?", const="", help="zapisz ślad przebiegu (Chrome trace JSON)")
+    parser.add_argument("--profile", action="store_true", help="ślad + cProfile i tracemalloc najcięższych etapów")
+    args = parser.parse_args(argv)
+
+    # Cache dostawcy danych w katalogu danych, jak modele i migawki – przed instrumentacją,
+    # która opakowuje dostawcę
+    import dostawca_danych
+    dostawca_danych.use_cache_dir(os.path.join(args.data_dir, "cache"))
+    tracing = args.trace is not None or args.profile
+    if tracing:
+        instrumentacja.enable(profile=args.profile)
+    pipeline = build_pipeline(args.data_dir, args.inference_only, args.workers)
+    status = pipeline.run(args.stages or None, force=args.force)
+    for name in pipeline.stages:
+        if name in status:
+            print(f"{name:12} {status[name]}")
+
+    if tracing:
+        instrumentacja.tracer.print_summary()
+        trace_path = args.trace or os.path.join(args.data_dir, "slady", time.strftime("%Y%m%d-%H%M%S") + ".json")
+        instrumentacja.tracer.write_trace(trace_path)
+        print(f"\nZapisano ślad przebiegu do: {trace_path} (chrome://tracing lub ui.perfetto.dev)")
+    return 0 if all(not s.startswith("błąd") for s in status.values()) else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,80 @@
+# panel_cenowy.py
+import pandas as pd
+import dostawca_danych
+import pobieranie_rownolegle
+import instrumentacja
+
+# Najdłuższe okno potrzebne w pipeline: etykiety 6m (+1 miesiąc zapasu)
+PANEL_PERIOD = "7mo"
+FIELDS = ["Open", "High", "Low", "Close", "Volume"]
+
+
+class PricePanel:
+    # Wyrównana struktura data × ticker dla każdego pola OHLCV. Wskaźniki
+    # i etykiety wycinają z niej historię zamiast pobierać ją ponownie.
+
+    def __init__(self, frames):
+        self.frames = frames
+
+    @classmethod
+    def from_frame(cls, data):
+        frames = {}
+        for field in FIELDS:
+            if field in data.columns.get_level_values(0):
+                frames[field] = data[field].sort_index()
+        return cls(frames)
+
+    @property
+    def tickers(self):
+        return list(self.frames["Close"].columns)
+
+    @property
+    def dates(self):
+        return self.frames["Close"].index
+
+    def field(self, name):
+        return self.frames[name]
+
+    def history(self, ticker, period=None):
+        # Historia jednego tickera w formacie Ticker.history(), przycięta do okresu
+        if ticker not in self.frames["Close"].columns:
+            return pd.DataFrame(columns=FIELDS)
+        hist = pd.DataFrame({field: frame[ticker] for field, frame in self.frames.items()})
+        hist = hist[hist["Close"].notna()]
+        return dostawca_danych.slice_period(hist, period) if period else hist
+
+    def until(self, date, period=None):
+        # Panel widziany w dniu `date` – bez późniejszych sesji (backtest bez wglądu w przyszłość)
+        date = pd.Timestamp(date)
+        start = None
+        offset = dostawca_danych.period_to_offset(period) if period else None
+        if offset is not None:
+            start = date - offset
+        return PricePanel({field: frame.loc[start:date] for field, frame in self.frames.items()})
+
+    def to_frame(self):
+        return pd.concat(self.frames, axis=1)
+
+
+@instrumentacja.traced("load_price_panel", "step")
+def load_price_panel(tickers, period=PANEL_PERIOD, chunk_size=500, engine=None):
+    # Jedno zbiorcze zapytanie na całe uniwersum; bardzo duże listy dzielimy na paczki
+    tickers = list(dict.fromkeys(tickers))
+    provider = dostawca_danych.get_provider()
+    chunks = [tickers[i:i + chunk_size] for i in range(0, len(tickers), chunk_size)]
+
+    if len(chunks) <= 1:
+        data = [provider.download(tickers, period)] if tickers else []
+    else:
+        engine = engine or pobieranie_rownolegle.FetchEngine(workers=4)
+        data = []
+        for i, result in enumerate(engine.run([str(i) for i in range(len(chunks))],
+                                              lambda i: provider.download(chunks[int(i)], period))):
+            if result.error is not None:
+                print(f"Błąd pobierania paczki notowań {i + 1}/{len(chunks)}: {result.error}")
+            else:
+                data.append(result.value)
+
+    if not data:
+        return PricePanel({field: pd.DataFrame() for field in FIELDS})
+    return PricePanel.from_frame(pd.concat(data, axis=1))
@@ -0,0 +1,161 @@
+# pobieranie_rownolegle.py
+import random
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+import instrumentacja
+
+FetchResult = namedtuple("FetchResult", ["ticker", "value", "error", "attempts", "elapsed"])
+
+
+def is_transient(error):
+    # Błędy, które warto ponowić: sieć, limit czasu, odrzucenie przez limit zapytań dostawcy.
+    # Wyjątki requests/urllib to podklasy OSError; yfinance zgłasza YFRateLimitError.
+    return isinstance(error, OSError) or "RateLimit" in type(error).__name__
+
+
+class TokenBucket:
+    # Limit zapytań: `rate` żetonów na sekundę, maksymalnie `capacity` naraz
+
+    def __init__(self, rate, capacity=None):
+        self.rate = rate
+        self.capacity = capacity or max(1.0, rate)
+        self.tokens = self.capacity
+        self.last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, stop_event=None):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.last) * self.rate)
+                self.last = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return True
+                delay = (1 - self.tokens) / self.rate
+            if stop_event is not None and stop_event.wait(delay):
+                return False
+            if stop_event is None:
+                time.sleep(delay)
+
+
+class FetchEngine:
+    # Ograniczona pula wątków do pobierania danych wielu tickerów naraz.
+    # Każdy ticker ma własny limit czasu i ponawianie z wykładniczym
+    # opóźnieniem; wyniki wracają w kolejności wejściowej, a błąd lub
+    # zawieszenie jednego tickera nie blokuje pozostałych.
+
+    def __init__(self, workers=8, rate=10.0, retries=3, backoff=1.0, timeout=60.0, budget=None):
+        self.workers = workers
+        self.bucket = TokenBucket(rate) if rate else None
+        self.retries = retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self.budget = budget
+
+    def _call(self, func, ticker, started, halt):
+        # `halt` – ustawiane po limicie czasu tickera, budżecie lub anulowaniu: bez kolejnych prób
+        started[ticker] = time.monotonic()
+        attempt = 0
+        while True:
+            attempt += 1
+            if halt.is_set():
+                raise TimeoutError(f"Przerwano pobieranie {ticker}")
+            if self.bucket is not None and not self.bucket.acquire(halt):
+                raise TimeoutError("Przekroczono budżet czasu")
+            try:
+                return func(ticker), attempt
+            except Exception:
+                if attempt > self.retries or halt.is_set():
+                    instrumentacja.count("fetch.failed")
+                    raise
+                instrumentacja.count("fetch.retries")
+                delay = self.backoff * 2 ** (attempt - 1) * random.uniform(0.5, 1.5)
+                if halt.wait(delay):
+                    raise
+
+    def run(self, tickers, func, progress=None, cancel_event=None):
+        # progress(gotowe, wszystkie, ticker) po każdym wyniku; ustawienie cancel_event przerywa pobieranie
+        results = [None] * len(tickers)
+        completed = 0
+        started = {}
+        halts = [threading.Event() for _ in tickers]
+        run_start = time.monotonic()
+        executor = ThreadPoolExecutor(max_workers=self.workers)
+        pending = {executor.submit(self._call, func, t, started, halts[i]): i for i, t in enumerate(tickers)}
+
+        try:
+            while pending:
+                done, _ = wait(pending, timeout=0.1, return_when=FIRST_COMPLETED)
+                now = time.monotonic()
+                for future in done:
+                    i = pending.pop(future)
+                    ticker = tickers[i]
+                    elapsed = now - started.get(ticker, now)
+                    try:
+                        value, attempts = future.result()
+                        results[i] = FetchResult(ticker, value, None, attempts, elapsed)
+                    except Exception as e:
+                        results[i] = FetchResult(ticker, None, e, self.retries + 1, elapsed)
+                    completed += 1
+                    if progress is not None:
+                        progress(completed, len(tickers), ticker)
+
+                # Tickery, które przekroczyły swój limit czasu, oznaczamy jako błąd i nie czekamy na nie.
+                # Trwającego wywołania w wątku nie da się przerwać – kończy się w tle (zajmując wątek
+                # puli do powrotu z func), ale nie jest już ponawiane.
+                for future, i in list(pending.items()):
+                    ticker = tickers[i]
+                    if ticker in started and self.timeout and now - started[ticker] > self.timeout:
+                        pending.pop(future)
+                        halts[i].set()
+                        future.cancel()
+                        instrumentacja.count("fetch.timeouts")
+                        results[i] = FetchResult(ticker, None, TimeoutError(f"Limit czasu dla {ticker}"), 0, now - started[ticker])
+
+                if self.budget is not None and now - run_start > self.budget:
+                    for halt in halts:
+                        halt.set()
+                    for future, i in pending.items():
+                        future.cancel()
+                        results[i] = FetchResult(tickers[i], None, TimeoutError("Przekroczono budżet czasu"), 0, 0.0)
+                    pending.clear()
+
+                if cancel_event is not None and cancel_event.is_set():
+                    for halt in halts:
+                        halt.set()
+                    for future, i in pending.items():
+                        future.cancel()
+                        results[i] = FetchResult(tickers[i], None, InterruptedError("Anulowano"), 0, 0.0)
+                    pending.clear()
+        finally:
+            for halt in halts:
+                halt.set()
+            executor.shutdown(wait=False, cancel_futures=True)
+
+        return results
+
+
+def measure_throughput(n_tickers=200, latency=0.05, workers=16, rate=None):
+    # Pomiar przepustowości na lokalnym dostawcy ze sztucznym opóźnieniem
+    import dostawca_danych
+
+    provider = dostawca_danych.FakeProvider(latency=latency)
+    tickers = [f"T{i:04d}.WA" for i in range(n_tickers)]
+    for ticker in tickers:
+        provider._history(ticker)  # dane syntetyczne generujemy przed pomiarem
+    engine = FetchEngine(workers=workers, rate=rate, retries=0)
+    start = time.perf_counter()
+    results = engine.run(tickers, provider.info)
+    elapsed = time.perf_counter() - start
+    ok = sum(1 for r in results if r.error is None)
+    return {"tickers": n_tickers, "workers": workers, "ok": ok, "seconds": round(elapsed, 3),
+            "tickers_per_s": round(n_tickers / elapsed, 1)}
+
+
+if __name__ == "__main__":
+    for workers in [1, 4, 16, 64]:
+        print(measure_throughput(workers=workers))
@@ -0,0 +1,197 @@
+# podobienstwo.py
+import os
+
+import numpy as np
+import pandas as pd
+
+import instrumentacja
+
+WINDOW = 60
+# Maksymalny udział brakujących sesji w oknie (brak = zerowa stopa zwrotu)
+MAX_MISSING = 0.1
+METRICS = ["correlation", "euclidean"]
+KINDS = ["returns", "prices"]
+CLUSTERS_PATH = os.path.join("..", "data", "grupy_korelacji.csv")
+
+
+def windows(panel, tickers=None, window=WINDOW, kind="returns", end=None):
+    # Okno `window` ostatnich sesji (do `end`) dla każdego tickera: log-stopy zwrotu albo
+    # log-ceny. Zwraca (tickery, surowe okna n × window); tickery z dużą liczbą braków pomijane
+    close = panel.field("Close")
+    if tickers is not None:
+        close = close.reindex(columns=list(dict.fromkeys(tickers)))
+    if end is not None:
+        close = close[close.index <= pd.Timestamp(end)]
+    prices = np.log(close.iloc[-(window + 1):].to_numpy(dtype=np.float64).T)
+    if kind == "returns":
+        values = np.diff(prices, axis=1)
+    elif kind == "prices":
+        values = prices[:, 1:]
+    else:
+        raise ValueError(f"Nieznany rodzaj okna: {kind} (dostępne: {', '.join(KINDS)})")
+    missing = ~np.isfinite(values)
+    keep = missing.mean(axis=1) <= MAX_MISSING if values.shape[1] else np.zeros(len(values), bool)
+    values = values[keep]
+    if kind == "returns":
+        values = np.where(np.isfinite(values), values, 0.0)
+    else:
+        # Brakująca cena = ostatnia znana (w przód, potem w tył)
+        values = pd.DataFrame(values.T).ffill().bfill().to_numpy().T
+    return np.asarray(close.columns[keep]), values.astype(np.float32)
+
+
+def znormalize(values):
+    # Wiersze o średniej 0 i normie 1 – iloczyn skalarny dwóch wierszy to korelacja Pearsona
+    centered = values - values.mean(axis=1, keepdims=True)
+    norm = np.linalg.norm(centered, axis=1, keepdims=True)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        z = np.where(norm > 0, centered / norm, 0.0)
+    return np.ascontiguousarray(z, dtype=np.float32)
+
+
+def _top_k(scores, k, largest=True):
+    # k najlepszych w każdym wierszu: argpartition + sortowanie tylko wybranych
+    k = min(k, scores.shape[1])
+    if k <= 0:
+        return np.empty((len(scores), 0), dtype=np.int64)
+    keyed = -scores if largest else scores
+    part = np.argpartition(keyed, k - 1, axis=1)[:, :k]
+    order = np.argsort(np.take_along_axis(keyed, part, axis=1), axis=1, kind="stable")
+    return np.take_along_axis(part, order, axis=1)
+
+
+class SimilarityIndex:
+    # Macierz z-normalizowanych okien całego uniwersum. Obie miary liczone na tych samych
+    # z-oknach: korelacja to iloczyn skalarny, odległość euklidesowa |a|² + |b|² - 2ab
+    # (= √(2 - 2·korelacja) dla okien niestałych), więc poziom ceny i skala wahań nie wpływają
+    # na ranking. Zapytania to jedno mnożenie macierzy dla całej paczki; opcjonalnie tablica
+    # k sąsiadów wszystkich tickerów liczona raz (precompute).
+
+    def __init__(self, tickers, values, window=WINDOW, kind="returns", end=None):
+        self.tickers = np.asarray(tickers, dtype=object)
+        self.position = {t: i for i, t in enumerate(self.tickers)}
+        self.window = window
+        self.kind = kind
+        self.end = end
+        self.z = znormalize(np.asarray(values, dtype=np.float32))
+        # Kwadraty norm z-okien: 1, a 0 dla okna stałego
+        self.squared = np.einsum("ij,ij->i", self.z, self.z)
+        self.table = None
+
+    @classmethod
+    def from_panel(cls, panel, tickers=None, window=WINDOW, kind="returns", end=None):
+        names, values = windows(panel, tickers, window, kind, end)
+        return cls(names, values, window, kind, end)
+
+    def __len__(self):
+        return len(self.tickers)
+
+    def _rows(self, queries):
+        rows = [self.position.get(q) for q in queries]
+        unknown = [q for q, r in zip(queries, rows) if r is None]
+        if unknown:
+            raise KeyError(f"Brak okna notowań dla: {', '.join(map(str, unknown))}")
+        return np.asarray(rows, dtype=np.int64)
+
+    def scores(self, rows, metric="correlation"):
+        # Wynik (m × n): korelacja albo odległość euklidesowa z-okien `rows` do całego uniwersum
+        if metric == "correlation":
+            return self.z[rows] @ self.z.T
+        if metric == "euclidean":
+            squared = self.squared[rows, None] + self.squared[None, :] - 2 * (self.z[rows] @ self.z.T)
+            return np.sqrt(np.maximum(squared, 0))
+        raise ValueError(f"Nieznana miara: {metric} (dostępne: {', '.join(METRICS)})")
+
+    @instrumentacja.traced("similar", "step")
+    def neighbours(self, queries, k=10, metric="correlation", batch=1024):
+        # k najbliższych sąsiadów dla każdego tickera z `queries` (bez niego samego)
+        if isinstance(queries, str):
+            queries = [queries]
+        rows = self._rows(list(queries))
+        if self.table is not None and metric == self.table[0] and k <= self.table[1].shape[1]:
+            instrumentacja.count("similar.table")
+            neighbours, values = self.table[1][rows, :k], self.table[2][rows, :k]
+        else:
+            parts = [self._neighbours(rows[i:i + batch], k, metric) for i in range(0, len(rows), batch)]
+            neighbours = np.vstack([p[0] for p in parts])
+            values = np.vstack([p[1] for p in parts])
+        column = "Correlation" if metric == "correlation" else "Distance"
+        return pd.DataFrame({
+            "Query": np.repeat(self.tickers[rows], neighbours.shape[1]),
+            "Rank": np.tile(np.arange(1, neighbours.shape[1] + 1), len(rows)),
+            "Ticker": self.tickers[neighbours.ravel()],
+            column: values.ravel(),
+        })
+
+    def _neighbours(self, rows, k, metric):
+        scores = self.scores(rows, metric)
+        largest = metric == "correlation"
+        # Sam ticker nie jest swoim sąsiadem
+        scores[np.arange(len(rows)), rows] = -np.inf if largest else np.inf
+        top = _top_k(scores, k, largest)
+        return top, np.take_along_axis(scores, top, axis=1)
+
+    @instrumentacja.traced("similar_precompute", "step")
+    def precompute(self, k=20, metric="correlation", batch=1024):
+        # Sąsiedzi wszystkich tickerów paczkami po `batch` wierszy – pamięć O(batch × n)
+        rows = np.arange(len(self))
+        parts = [self._neighbours(rows[i:i + batch], k, metric) for i in range(0, len(rows), batch)]
+        self.table = (metric, np.vstack([p[0] for p in parts]), np.vstack([p[1] for p in parts]))
+        return self
+
+    def similar_to_pattern(self, values, k=10, metric="correlation"):
+        # Sąsiedzi dowolnego wzorca (np. okna z innego okresu) o długości okna indeksu
+        values = np.asarray(values, dtype=np.float32).reshape(1, -1)
+        if values.shape[1] != self.z.shape[1]:
+            raise ValueError(f"Wzorzec ma {values.shape[1]} sesji, indeks {self.z.shape[1]}")
+        pattern = znormalize(values)
+        if metric == "correlation":
+            scores = pattern @ self.z.T
+        else:
+            squared = (pattern ** 2).sum() + self.squared - 2 * (pattern @ self.z.T)[0]
+            scores = np.sqrt(np.maximum(squared, 0))[None, :]
+        top = _top_k(scores, k, metric == "correlation")[0]
+        column = "Correlation" if metric == "correlation" else "Distance"
+        return pd.DataFrame({"Ticker": self.tickers[top], column: scores[0, top]})
+
+    def correlation_matrix(self):
+        return self.z @ self.z.T
+
+    @instrumentacja.traced("correlation_clusters", "step")
+    def clusters(self, threshold=0.5, n_clusters=None, method="average"):
+        # Grupy tickerów z hierarchicznego grupowania po odległości 1 - korelacja;
+        # threshold – minimalna korelacja wewnątrz grupy (wg metody łączenia)
+        from scipy.cluster.hierarchy import fcluster, linkage
+        from scipy.spatial.distance import squareform
+
+        n = len(self)
+        if n < 2:
+            return pd.DataFrame({"Ticker": self.tickers, "Cluster": np.ones(n, dtype=int)})
+        # Odległość liczona w miejscu macierzy korelacji – jedna macierz n × n w pamięci
+        distance = self.correlation_matrix().astype(np.float64)
+        np.subtract(1.0, distance, out=distance)
+        np.clip(distance, 0.0, 2.0, out=distance)
+        np.fill_diagonal(distance, 0.0)
+        tree = linkage(squareform(distance, checks=False), method=method)
+        if n_clusters is not None:
+            labels = fcluster(tree, n_clusters, criterion="maxclust")
+        else:
+            labels = fcluster(tree, 1.0 - threshold, criterion="distance")
+
+        # Numeracja grup od największej; średnia korelacja wewnątrz grupy
+        sizes = np.bincount(labels)
+        order = np.argsort(-sizes[1:], kind="stable") + 1
+        renumber = np.empty_like(sizes)
+        renumber[order] = np.arange(1, len(order) + 1)
+        labels = renumber[labels]
+        sizes = np.bincount(labels)
+        # Suma korelacji w grupie = |suma z-okien grupy|² (bez macierzy n × n)
+        sums = np.zeros((sizes.size, self.z.shape[1]), dtype=np.float64)
+        np.add.at(sums, labels, self.z)
+        within = (sums ** 2).sum(axis=1)
+        pairs = sizes * (sizes - 1)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            mean_corr = np.where(pairs > 0, (within - sizes) / pairs, np.nan)
+        return pd.DataFrame({"Ticker": self.tickers, "Cluster": labels, "Cluster Size": sizes[labels],
+                             "Mean Correlation": np.round(mean_corr[labels], 3)}) \
+            .sort_values(["Cluster", "Ticker"], ignore_index=True)
@@ -0,0 +1,398 @@
+# portfel.py
+import argparse
+import os
+import sys
+import time
+
+# Tylko biblioteka standardowa na poziomie modułu – pandas, scikit-learn, openpyxl
+# i yfinance importuje dopiero polecenie, które ich potrzebuje
+SRC_DIR = os.path.dirname(os.path.abspath(__file__))
+DATA_DIR = os.environ.get("PORTFEL_DATA_DIR", os.path.join(SRC_DIR, "..", "data"))
+
+
+class Paths:
+    def __init__(self, data_dir):
+        self.data_dir = data_dir
+        self.tickers = os.path.join(data_dir, "tickers.txt")
+        self.fundamental = os.path.join(data_dir, "analiza_fundamentalna.csv")
+        self.technical = os.path.join(data_dir, "analiza_techniczna.csv")
+        self.labels = os.path.join(data_dir, "etykiety.csv")
+        self.scored = os.path.join(data_dir, "scalona_ocena.csv")
+        self.alerts = os.path.join(data_dir, "alerty_walidacja.csv")
+        self.importance = os.path.join(data_dir, "feature_importance.csv")
+        self.models = os.path.join(data_dir, "modele")
+        self.snapshots = os.path.join(data_dir, "migawki")
+        self.cache = os.path.join(data_dir, "cache")
+        self.cv = os.path.join(data_dir, "walidacja")
+        self.features = os.path.join(data_dir, "cechy")
+        self.weights = os.path.join(data_dir, "portfel_wagi.csv")
+
+
+def _tickers(args, paths):
+    from orkiestrator import read_tickers
+    return read_tickers(args.tickers or paths.tickers)
+
+
+def _use_data_dir(paths):
+    # Cache notowań w wybranym katalogu danych
+    import dostawca_danych
+
+    dostawca_danych.use_cache_dir(paths.cache)
+
+
+def _read_scored(paths):
+    import schemat_danych
+
+    if not os.path.isfile(paths.scored) and not os.path.isfile(schemat_danych.columnar_path(paths.scored)):
+        raise SystemExit(f"❌ Brak pliku {paths.scored} – uruchom najpierw: portfel score")
+    return schemat_danych.read_dataset(paths.scored, schemat_danych.MERGED_SCHEMA)
+
+
+def _save_scored(df, paths):
+    import schemat_danych
+
+    df.to_csv(paths.scored, index=False, encoding="utf-8-sig")
+    schemat_danych.write_columnar(df, paths.scored)
+    print(f"Zapisano do: {paths.scored}")
+
+
+def cmd_fetch(args, paths):
+    import analiza_fundamentalna
+    import magazyn_migawek
+
+    _use_data_dir(paths)
+    analiza_fundamentalna.analyze_multiple_companies(
+        _tickers(args, paths), paths.fundamental, store=magazyn_migawek.fundamental_store(paths.snapshots))
+
+
+def cmd_technical(args, paths):
+    import analiza_techniczna
+    import magazyn_migawek
+
+    _use_data_dir(paths)
+    analiza_techniczna.analyze_many(_tickers(args, paths), paths.technical,
+                                    store=magazyn_migawek.technical_store(paths.snapshots))
+
+
+def cmd_labels(args, paths):
+    import pandas as pd
+    import etykiety_wektorowe
+    import panel_cenowy
+
+    _use_data_dir(paths)
+    tickers = _tickers(args, paths)
+    panel = panel_cenowy.load_price_panel(tickers)
+    target = etykiety_wektorowe.trailing_labels(panel, tickers)
+    pd.DataFrame({"Ticker": tickers, "Target (6m +10%)": target.to_numpy()}).to_csv(
+        paths.labels, index=False, encoding="utf-8-sig")
+    print(f"Zapisano do: {paths.labels}")
+
+
+def cmd_score(args, paths):
+    import pandas as pd
+    import magazyn_cech
+    import scalona_ocena
+    import schemat_danych
+
+    df_fund = schemat_danych.read_dataset(paths.fundamental, schemat_danych.FUNDAMENTAL_SCHEMA)
+    df_tech = schemat_danych.read_dataset(paths.technical, schemat_danych.TECHNICAL_SCHEMA)
+    df = scalona_ocena.score(scalona_ocena.merge_inputs(df_fund, df_tech))
+    if os.path.isfile(paths.labels):
+        df = scalona_ocena.add_labels(df, pd.read_csv(paths.labels))
+    else:
+        print(f"⚠️ Brak {paths.labels} – ocena bez etykiet (portfel labels)")
+    _save_scored(df.sort_values(by="Score", ascending=False), paths)
+    # Migawka zakodowanych cech ML – portfel train czyta ją zamiast kodować ramkę ponownie
+    magazyn_cech.FeatureStore(paths.features).write(scalona_ocena.snapshot_date(df), df)
+
+
+def cmd_validate(args, paths):
+    import walidacja_danych
+
+    df = walidacja_danych.validate_data(_read_scored(paths), alerts_path=paths.alerts,
+                                       history=walidacja_danych.snapshot_history(paths.snapshots))
+    _save_scored(df, paths)
+
+
+def cmd_train(args, paths):
+    import magazyn_cech
+    import scalona_ocena
+
+    df = _read_scored(paths)
+    if "Target (6m +10%)" not in df:
+        raise SystemExit("❌ Brak etykiet w ocenie – uruchom: portfel labels, portfel score")
+    df, _ = scalona_ocena.train_model(df, scalona_ocena.FEATURES, inference_only=args.inference_only,
+                                      model_dir=paths.models, importance_path=paths.importance,
+                                      feature_store=magazyn_cech.FeatureStore(paths.features))
+    _save_scored(df, paths)
+
+
+def cmd_export(args, paths):
+    import eksport_excel
+
+    excel_path = args.output or os.path.splitext(paths.scored)[0] + ".xlsx"
+    df = _read_scored(paths)
+    eksport_excel.write_report(df.sort_values(by="Score", ascending=False), excel_path)
+    print(f"Zapisano do: {excel_path}")
+
+
+def cmd_universes(args, paths):
+    import uniwersa
+
+    if args.list:
+        for name, path in uniwersa.available_universes(paths.data_dir).items():
+            print(f"{name:12} {len(uniwersa.read_tickers(path)):>5}  {path}")
+        return
+    _use_data_dir(paths)
+    uniwersa.run_universes(args.universes, paths.data_dir, args.output_dir,
+                           inference_only=args.inference_only, excel=not args.no_excel)
+
+
+def cmd_watch(args, paths):
+    import asyncio
+    import panel_cenowy
+    import schemat_danych
+    import tryb_obserwacji
+
+    _use_data_dir(paths)
+    tickers = _tickers(args, paths)
+    panel = panel_cenowy.load_price_panel(tickers)
+    if args.make_replay:
+        tryb_obserwacji.make_replay(args.make_replay, tickers, panel, sessions=args.sessions, steps=args.steps)
+        print(f"Zapisano plik notowań do: {args.make_replay}")
+        return
+
+    fundamentals = None
+    if os.path.isfile(paths.fundamental):
+        fundamentals = schemat_danych.read_dataset(paths.fundamental, schemat_danych.FUNDAMENTAL_SCHEMA)
+    else:
+        print(f"⚠️ Brak {paths.fundamental} – oceny tylko z sygnałów technicznych")
+    pipeline = None
+    if os.path.isfile(os.path.join(paths.models, "latest.json")):
+        import rejestr_modeli
+        pipeline, _ = rejestr_modeli.load_latest(paths.models)
+
+    session = tryb_obserwacji.WatchSession(fundamentals, panel, pipeline, on_alert=tryb_obserwacji.print_alert)
+    if args.replay:
+        source = tryb_obserwacji.ReplaySource(args.replay, speed=args.speed)
+    else:
+        source = tryb_obserwacji.PollingSource(tickers, interval=args.poll)
+    start = time.perf_counter()
+    try:
+        asyncio.run(tryb_obserwacji.watch(source, session, interval=args.interval, duration=args.duration))
+    except KeyboardInterrupt:
+        print("Zatrzymano obserwację")
+    except (OSError, KeyError, ValueError) as e:
+        raise SystemExit(f"❌ Błąd źródła notowań: {type(e).__name__}: {e}")
+    elapsed = time.perf_counter() - start
+    print(f"Notowania: {session.updates} ({session.updates / elapsed:.0f}/s), pominięte: {session.skipped}, "
+          f"tickery: {len(session.tickers)}, alerty: {len(session.alerts)}")
+    tryb_obserwacji.save_alerts(session.alerts, os.path.join(paths.data_dir, "alerty_obserwacji.csv"))
+
+
+def cmd_cv(args, paths):
+    import magazyn_migawek
+    import panel_cenowy
+    import walidacja_krzyzowa
+
+    _use_data_dir(paths)
+    tickers = _tickers(args, paths)
+    panel = panel_cenowy.load_price_panel(tickers, period=args.period)
+    store = magazyn_migawek.fundamental_store(paths.snapshots)
+    if not store.dates():
+        print("⚠️ Brak migawek fundamentalnych – walidacja tylko na cechach technicznych")
+        store = None
+    summary = walidacja_krzyzowa.run(panel, store, horizon=args.horizon, threshold=args.threshold,
+                                     cv_dir=paths.cv, n_splits=args.folds, workers=args.workers)
+    print(summary.head(10).to_string(index=False))
+    print(f"Zapisano wyniki do: {paths.cv}")
+
+
+def cmd_portfolio(args, paths):
+    import konstrukcja_portfela
+    import panel_cenowy
+
+    _use_data_dir(paths)
+    candidates = konstrukcja_portfela.select_candidates(_read_scored(paths), args.top, args.min_score)
+    if candidates.empty:
+        raise SystemExit("❌ Brak spółek spełniających kryteria wyboru")
+    panel = panel_cenowy.load_price_panel(candidates["Ticker"], period=args.period)
+    returns = konstrukcja_portfela.daily_returns(panel, candidates["Ticker"]).dropna(axis=1, how="all")
+    scores = candidates.set_index("Ticker")["Score"].reindex(returns.columns).to_numpy()
+    cap = max(args.cap, 1.0 / returns.shape[1])
+    if args.rebalance:
+        history, daily = konstrukcja_portfela.rolling_rebalance(returns, args.method, scores, cap, args.window,
+                                                                args.every, args.tilt)
+        history.rename_axis("Date").to_csv(os.path.splitext(paths.weights)[0] + "_rebalans.csv",
+                                           encoding="utf-8-sig")
+        for name, value in konstrukcja_portfela.summarize_returns(daily).items():
+            print(f"{name}: {value}")
+        print(f"Średni obrót na rebalansowanie: {history['Turnover'].mean():.1%}")
+    df = konstrukcja_portfela.build_portfolio(returns, args.method, scores, cap, args.window, args.tilt)
+    print(df[df["Weight"] > 1e-4].round(4).to_string(index=False))
+    konstrukcja_portfela.save_weights(df, paths.weights)
+
+
+def cmd_screen(args, paths):
+    import pandas as pd
+    import selekcja
+
+    index = selekcja.open_index(paths.data_dir, rebuild=args.rebuild)
+    history = args.all or args.start or args.end
+    start = time.perf_counter()
+    try:
+        df = index.query(args.query, start=args.start, end=args.end, latest=not history, top=args.top,
+                         by=args.by, ascending=args.ascending)
+    except ValueError as e:
+        raise SystemExit(f"❌ {e}")
+    elapsed = (time.perf_counter() - start) * 1000
+    with pd.option_context("display.width", 200, "display.max_columns", 20):
+        print(df.to_string(index=False) if len(df) else "Brak spółek spełniających warunki")
+    print(f"{len(df)} wierszy z {index.rows} ({len(index.dates)} migawek) w {elapsed:.1f} ms")
+    if args.output:
+        df.to_csv(args.output, index=False, encoding="utf-8-sig")
+        print(f"Zapisano do: {args.output}")
+
+
+def cmd_similar(args, paths):
+    import panel_cenowy
+    import podobienstwo
+
+    _use_data_dir(paths)
+    tickers = list(dict.fromkeys(_tickers(args, paths) + args.tickers_query))
+    panel = panel_cenowy.load_price_panel(tickers, period=args.period)
+    index = podobienstwo.SimilarityIndex.from_panel(panel, tickers, args.window, args.kind, args.end)
+    print(f"Okna {args.window} sesji ({args.kind}) dla {len(index)} z {len(tickers)} tickerów")
+    if args.clusters:
+        df = index.clusters(args.threshold, args.n_clusters)
+        groups = df.drop_duplicates("Cluster")
+        print(f"{len(groups)} grup, {int((groups['Cluster Size'] > 1).sum())} wieloelementowych")
+        print(groups[groups["Cluster Size"] > 1].head(20).to_string(index=False))
+        path = args.output or os.path.join(paths.data_dir, "grupy_korelacji.csv")
+    else:
+        if not args.tickers_query:
+            raise SystemExit("❌ Podaj ticker(y) do porównania albo --clusters")
+        start = time.perf_counter()
+        try:
+            df = index.neighbours(args.tickers_query, args.top, args.metric)
+        except KeyError as e:
+            raise SystemExit(f"❌ {e.args[0]}")
+        print(df.round(4).to_string(index=False))
+        print(f"Zapytanie: {(time.perf_counter() - start) * 1000:.1f} ms")
+        path = args.output
+    if path:
+        df.to_csv(path, index=False, encoding="utf-8-sig")
+        print(f"Zapisano do: {path}")
+
+
+COMMANDS = {
+    "fetch": (cmd_fetch, "analiza fundamentalna tickerów"),
+    "technical": (cmd_technical, "analiza techniczna tickerów"),
+    "labels": (cmd_labels, "etykiety Target (6m +10%%) z panelu notowań"),
+    "score": (cmd_score, "scalenie analiz i punktacja z tabeli reguł"),
+    "validate": (cmd_validate, "walidacja scalonej oceny i plik alertów"),
+    "train": (cmd_train, "model ML (rejestr modeli) i Ocena AI"),
+    "export": (cmd_export, "raport Excel z formatowaniem"),
+    "universes": (cmd_universes, "kilka uniwersów naraz – każdy ticker liczony raz"),
+    "watch": (cmd_watch, "obserwacja notowań na żywo z alertami zmian ocen"),
+    "portfolio": (cmd_portfolio, "wagi portfela z najwyżej ocenianych spółek"),
+    "screen": (cmd_screen, "selekcja spółek wyrażeniem, także po historii migawek"),
+    "similar": (cmd_similar, "spółki o podobnym przebiegu notowań i grupy korelacji"),
+    "cv": (cmd_cv, "walidacja krocząca i przegląd hiperparametrów modelu ML"),
+}
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="portfel", description="Portfel2025 – analiza spółek z wiersza poleceń")
+    parser.add_argument("--data-dir", default=DATA_DIR,
+                        help="katalog danych (domyślnie ../data względem src lub $PORTFEL_DATA_DIR)")
+    parser.add_argument("--trace", nargs="?", const="", help="zapisz ślad przebiegu (Chrome trace JSON)")
+    sub = parser.add_subparsers(dest="command", required=True)
+    for name, (func, help_text) in COMMANDS.items():
+        cmd = sub.add_parser(name, help=help_text)
+        cmd.set_defaults(func=func)
+        if name in ("fetch", "technical", "labels", "watch", "cv", "similar"):
+            cmd.add_argument("--tickers", help="plik z listą tickerów (domyślnie <data-dir>/tickers.txt)")
+        if name == "train":
+            cmd.add_argument("--inference-only", action="store_true", help="predykcja ostatnim modelem z rejestru")
+        if name == "export":
+            cmd.add_argument("--output", help="plik .xlsx (domyślnie <data-dir>/scalona_ocena.xlsx)")
+        if name == "universes":
+            cmd.add_argument("universes", nargs="*",
+                             help="nazwy uniwersów (wszystkie, wig20, ...) lub pliki z tickerami")
+            cmd.add_argument("--list", action="store_true", help="pokaż dostępne uniwersa")
+            cmd.add_argument("--output-dir", help="katalog wyników (domyślnie <data-dir>/diff_Tickers)")
+            cmd.add_argument("--inference-only", action="store_true", help="predykcja ostatnim modelem z rejestru")
+            cmd.add_argument("--no-excel", action="store_true", help="bez raportów Excel")
+        if name == "watch":
+            cmd.add_argument("--replay", help="plik CSV z notowaniami (Time, Ticker, Price, Volume)")
+            cmd.add_argument("--speed", type=float, default=0.0, help="tempo odtwarzania (0 – bez pauz)")
+            cmd.add_argument("--poll", type=float, default=1.0, help="co ile sekund odpytywać dostawcę")
+            cmd.add_argument("--interval", type=float, default=0.5, help="co ile sekund przeliczać oceny")
+            cmd.add_argument("--duration", type=float, help="czas obserwacji w sekundach")
+            cmd.add_argument("--make-replay", help="zapisz syntetyczny plik notowań i zakończ")
+            cmd.add_argument("--sessions", type=int, default=1)
+            cmd.add_argument("--steps", type=int, default=390, help="notowań na sesję dla --make-replay")
+        if name == "portfolio":
+            cmd.add_argument("--method", default="min_var", choices=["min_var", "risk_parity", "score"],
+                             help="minimalna wariancja, parytet ryzyka albo wariancja z premią za Score")
+            cmd.add_argument("--top", type=int, default=30, help="liczba najwyżej ocenianych spółek")
+            cmd.add_argument("--min-score", type=float, help="minimalny Score spółki")
+            cmd.add_argument("--cap", type=float, default=0.10, help="maksymalna waga jednej spółki")
+            cmd.add_argument("--tilt", type=float, default=1.0, help="siła premii za Score (metoda score)")
+            cmd.add_argument("--period", default="2y", help="historia notowań")
+            cmd.add_argument("--window", type=int, default=252, help="okno kowariancji w sesjach")
+            cmd.add_argument("--rebalance", action="store_true", help="test rebalansowania kroczącego")
+            cmd.add_argument("--every", type=int, default=21, help="co ile sesji rebalansować")
+        if name == "screen":
+            cmd.add_argument("query", nargs="?", default="",
+                             help='np. \'P/E < 15 and RSI < 30 and "Fundamental Strength" == "Strong"\'')
+            cmd.add_argument("--all", action="store_true", help="wszystkie migawki (domyślnie tylko ostatnia)")
+            cmd.add_argument("--start", help="pierwsza data migawek RRRR-MM-DD")
+            cmd.add_argument("--end", help="ostatnia data migawek RRRR-MM-DD")
+            cmd.add_argument("--top", type=int, help="tylko k najlepszych")
+            cmd.add_argument("--by", default="Score", help="kolumna rankingu (np. Score, ML_Points)")
+            cmd.add_argument("--ascending", action="store_true", help="ranking rosnąco")
+            cmd.add_argument("--output", help="zapisz wynik do CSV")
+            cmd.add_argument("--rebuild", action="store_true", help="zbuduj indeks od nowa")
+        if name == "similar":
+            cmd.add_argument("tickers_query", nargs="*", metavar="ticker", help="np. ACP.WA")
+            cmd.add_argument("--window", type=int, default=60, help="długość okna w sesjach")
+            cmd.add_argument("--top", type=int, default=10, help="liczba sąsiadów")
+            cmd.add_argument("--metric", default="correlation", choices=["correlation", "euclidean"])
+            cmd.add_argument("--kind", default="returns", choices=["returns", "prices"],
+                             help="okna stóp zwrotu albo log-cen")
+            cmd.add_argument("--period", default="1y", help="historia notowań")
+            cmd.add_argument("--end", help="ostatnia sesja okna RRRR-MM-DD (domyślnie najnowsza)")
+            cmd.add_argument("--clusters", action="store_true", help="grupy korelacji całego uniwersum")
+            cmd.add_argument("--threshold", type=float, default=0.5, help="minimalna korelacja w grupie")
+            cmd.add_argument("--n-clusters", type=int, help="zamiast progu: liczba grup")
+            cmd.add_argument("--output", help="zapisz wynik do CSV")
+        if name == "cv":
+            cmd.add_argument("--period", default="5y", help="historia notowań do odtworzenia dat oceny")
+            cmd.add_argument("--horizon", default="6m", help="horyzont etykiety (1m, 3m, 6m, 12m)")
+            cmd.add_argument("--threshold", type=int, default=10, help="próg stopy zwrotu etykiety (%%)")
+            cmd.add_argument("--folds", type=int, default=5, help="liczba bloków testowych")
+            cmd.add_argument("--workers", type=int, help="liczba procesów (domyślnie wszystkie rdzenie)")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    paths = Paths(os.path.abspath(args.data_dir))
+    os.makedirs(paths.data_dir, exist_ok=True)
+
+    if args.trace is not None:
+        import instrumentacja
+        instrumentacja.enable()
+    args.func(args, paths)
+    if args.trace is not None:
+        trace_path = args.trace or os.path.join(paths.data_dir, "slady", time.strftime("%Y%m%d-%H%M%S") + ".json")
+        instrumentacja.tracer.print_summary()
+        instrumentacja.tracer.write_trace(trace_path)
+        print(f"\nZapisano ślad przebiegu do: {trace_path}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,124 +1,352 @@
-# scalona_ocena.py
-import pandas as pd
+# prototyp_gui.py
 import os
-import subprocess
-
-def score_company(row):
-    score = 0
-
-    # Fundamentalne
-    if row["P/E"] != "N/A" and float(row["P/E"]) < 25:
-        score += 2
-    if row["ROE (%)"] != "N/A" and float(row["ROE (%)"]) > 15:
-        score += 2
-    if row["Debt/Assets"] != "N/A" and float(row["Debt/Assets"]) < 0.5:
-        score += 1
-    if row["PEG"] != "N/A" and 0.5 <= float(row["PEG"]) <= 1.5:
-        score += 2
-    if row["EV/FCF"] != "N/A" and float(row["EV/FCF"]) < 15:
-        score += 2
-
-    # Techniczne
-    if row["RSI"] != "N/A":
-        rsi = float(row["RSI"])
-        if rsi < 30:
-            score += 2
-        elif rsi > 70:
-            score -= 1
-    if row["Drop from ATH (%)"] != "N/A" and float(row["Drop from ATH (%)"]) > 10:
-        score += 1
-    if row["SMA50"] != "N/A" and row["SMA200"] != "N/A":
-        if float(row["SMA50"]) > float(row["SMA200"]):
-            score += 2
-
-    return score
-
-def classify_company(score):
-    if score >= 9:
-        return "Dobra i tania"
-    elif 6 <= score < 9:
-        return "Dobra w dobrej cenie"
-    elif 4 <= score < 6:
-        return "Spółka średnia"
-    else:
-        return "Spółka słaba"
-
-def validate_data(df):
-    alerts = []
-
-    def check_row(row):
-        na_count = sum([1 for value in row.values if value == "N/A"])
-
-        if na_count > 5:
-            status = "Do sprawdzenia"
-        else:
-            status = "OK"
-
-        for field in ["Price", "P/E", "ROE (%)", "Debt/Assets"]:
-            if field in row and row[field] == "N/A":
-                status = "Błędne dane"
-                alerts.append({"Ticker": row["Ticker"], "Problem": f"Brak danych: {field}"})
-                break
+import sys
+import threading
+
+import numpy as np
+import pandas as pd
+from PyQt6.QtCore import QAbstractTableModel, QModelIndex, QObject, Qt, QThread, QTimer, pyqtSignal
+from PyQt6.QtGui import QBrush, QColor
+from PyQt6.QtWidgets import (QApplication, QComboBox, QFileDialog, QHBoxLayout, QLabel, QLineEdit,
+                             QMainWindow, QMessageBox, QProgressBar, QPushButton, QTableView,
+                             QVBoxLayout, QWidget)
+
+import eksport_excel
+import reguly_oceny
+import schemat_danych
+
+DATA_DIR = os.path.join("..", "data")
+TICKERS_PATH = os.path.join(DATA_DIR, "tickers.txt")
+FUNDAMENTAL_PATH = os.path.join(DATA_DIR, "analiza_fundamentalna.csv")
+TECHNICAL_PATH = os.path.join(DATA_DIR, "analiza_techniczna.csv")
+RESULTS_PATH = os.path.join(DATA_DIR, "scalona_ocena.csv")
+
+# Kolumny przeszukiwane przez filtr tekstowy
+SEARCH_COLUMNS = ["Ticker", "Company"]
+ALL_LABELS = "Wszystkie oceny"
+
+
+def load_results(path=RESULTS_PATH):
+    # Kopia Parquet z scalona_ocena, a gdy jej brak – arkusz Excel
+    parquet_path = schemat_danych.columnar_path(path)
+    if os.path.isfile(parquet_path) or os.path.isfile(path):
+        return schemat_danych.read_dataset(path, schemat_danych.MERGED_SCHEMA)
+    excel_path = os.path.splitext(path)[0] + ".xlsx"
+    return schemat_danych.apply_schema(pd.read_excel(excel_path), schemat_danych.MERGED_SCHEMA)
+
+
+def _format(value):
+    if value is None or (isinstance(value, float) and np.isnan(value)) or value is pd.NaT:
+        return ""
+    if isinstance(value, (float, np.floating)):
+        return f"{value:,.2f}".replace(",", " ")
+    if isinstance(value, pd.Timestamp):
+        return value.strftime("%Y-%m-%d")
+    return str(value)
+
+
+class DataFrameModel(QAbstractTableModel):
+    # Model tabeli nad kolumnami DataFrame. Widok prosi tylko o widoczne komórki,
+    # a sortowanie i filtrowanie zmieniają jedynie tablicę indeksów wierszy.
+
+    def __init__(self, df=None, parent=None):
+        super().__init__(parent)
+        self._sort = None
+        self._text = ""
+        self._label = None
+        self.set_frame(df if df is not None else pd.DataFrame())
+
+    def set_frame(self, df):
+        self.beginResetModel()
+        self._df = df.reset_index(drop=True)
+        self._columns = list(self._df.columns)
+        self._values = [self._df[c].to_numpy() for c in self._columns]
+        self._sort_keys = {}
+        self._search = None
+        self._order = self._visible_rows()
+        self.endResetModel()
 
+    def frame(self):
+        # Aktualnie widoczne wiersze w kolejności widoku (np. do eksportu)
+        return self._df.iloc[self._order].reset_index(drop=True)
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._order)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._columns)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        value = self._values[index.column()][self._order[index.row()]]
+        if role == Qt.ItemDataRole.DisplayRole:
+            return _format(value)
+        if role == Qt.ItemDataRole.BackgroundRole:
+            column = self._columns[index.column()]
+            if column in eksport_excel.COLORED_COLUMNS or column == "Ocena AI":
+                color = eksport_excel.COLORS.get(value)
+                if color:
+                    return QBrush(QColor(f"#{color}"))
+        if role == Qt.ItemDataRole.TextAlignmentRole and isinstance(value, (int, float, np.number)):
+            return Qt.AlignmentFlag.AlignRight | Qt.AlignmentFlag.AlignVCenter
+        return None
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if role != Qt.ItemDataRole.DisplayRole:
+            return None
+        if orientation == Qt.Orientation.Horizontal:
+            return self._columns[section]
+        return str(section + 1)
+
+    def _sort_key(self, column):
+        # Klucz sortowania liczony raz na kolumnę: liczby wprost, tekst jako rangi;
+        # braki zawsze na końcu
+        if column not in self._sort_keys:
+            series = self._df[self._columns[column]]
+            if pd.api.types.is_numeric_dtype(series) and not pd.api.types.is_bool_dtype(series):
+                key = series.to_numpy(dtype=float)
+            else:
+                codes, _ = pd.factorize(series.astype("string"), sort=True)
+                key = np.where(codes < 0, np.nan, codes).astype(float)
+            self._sort_keys[column] = key
+        return self._sort_keys[column]
+
+    def _apply_sort(self, rows):
+        if self._sort is None or not len(rows):
+            return rows
+        column, order = self._sort
+        key = self._sort_key(column)[rows]
+        if order == Qt.SortOrder.DescendingOrder:
+            key = -key
+        return rows[np.argsort(key, kind="stable")]
+
+    def _visible_rows(self):
+        mask = np.ones(len(self._df), dtype=bool)
+        if self._text:
+            if self._search is None:
+                # Jedna kolumna tekstu do przeszukiwania, budowana raz dla całej ramki
+                search = pd.Series("", index=self._df.index, dtype="string")
+                for column in [c for c in SEARCH_COLUMNS if c in self._df]:
+                    search = search + " " + self._df[column].astype("string").fillna("")
+                self._search = search.str.lower()
+            mask &= self._search.str.contains(self._text, regex=False).to_numpy()
+        if self._label and "Ocena końcowa" in self._df:
+            mask &= (self._df["Ocena końcowa"] == self._label).to_numpy()
+        return self._apply_sort(np.flatnonzero(mask))
+
+    def sort(self, column, order=Qt.SortOrder.AscendingOrder):
+        self.layoutAboutToBeChanged.emit()
+        self._sort = (column, order)
+        self._order = self._apply_sort(self._order)
+        self.layoutChanged.emit()
+
+    def set_filter(self, text=None, label=None):
+        self.beginResetModel()
+        if text is not None:
+            self._text = text.strip().lower()
+        self._label = label
+        self._order = self._visible_rows()
+        self.endResetModel()
+
+
+class Worker(QObject):
+    # Zadanie w tle: fn(progress, cancel_event) -> wynik. Sygnały trafiają do wątku GUI.
+    progress = pyqtSignal(int, int, str)
+    finished = pyqtSignal(object)
+    failed = pyqtSignal(str)
+
+    def __init__(self, fn):
+        super().__init__()
+        self.fn = fn
+        self.cancel_event = threading.Event()
+
+    def run(self):
         try:
-            if status == "OK":
-                pe = float(row["P/E"])
-                da = float(row["Debt/Assets"])
-                roe = float(row["ROE (%)"])
-                if pe < 0 or pe > 100:
-                    status = "Do sprawdzenia"
-                    alerts.append({"Ticker": row["Ticker"], "Problem": f"Podejrzane P/E = {pe}"})
-                if da > 1.5:
-                    status = "Do sprawdzenia"
-                    alerts.append({"Ticker": row["Ticker"], "Problem": f"Bardzo wysokie Debt/Assets = {da}"})
-                if roe < -100 or roe > 100:
-                    status = "Do sprawdzenia"
-                    alerts.append({"Ticker": row["Ticker"], "Problem": f"Podejrzane ROE (%) = {roe}"})
-        except:
-            pass
-
-        return status
-
-    df["Status"] = df.apply(check_row, axis=1)
-
-    return df, alerts
-
-def merge_and_classify(fundamental_file, technical_file, output_file):
-    df_fund = pd.read_csv(fundamental_file)
-    df_tech = pd.read_csv(technical_file)
-
-    df = pd.merge(df_fund, df_tech, on="Ticker", how="outer")
-    df["Score"] = df.apply(score_company, axis=1)
-    df["Ocena końcowa"] = df["Score"].apply(classify_company)
-
-    df, alerts = validate_data(df)
-
-    df.sort_values(by="Score", ascending=False, inplace=True)
-
-    cols = list(df.columns)
-    for col in ["Score", "Ocena końcowa", "Status"]:
-        cols.insert(2, cols.pop(cols.index(col)))
-    df = df[cols]
-
-    with pd.ExcelWriter(output_file.replace(".csv", ".xlsx"), engine="xlsxwriter") as writer:
-        df.to_excel(writer, sheet_name="Ocena", index=False)
-        if alerts:
-            pd.DataFrame(alerts).to_excel(writer, sheet_name="Alerty", index=False)
-
-        worksheet = writer.sheets["Ocena"]
-        for i, col in enumerate(df.columns):
-            max_len = max(df[col].astype(str).map(len).max(), len(col)) + 2
-            worksheet.set_column(i, i, max_len)
-
-    print(f"Zapisano do: {output_file.replace('.csv', '.xlsx')}.")
-
-    try:
-        subprocess.run(["start", "excel", output_file.replace(".csv", ".xlsx")], shell=True)
-    except:
-        print("Nie udało się otworzyć pliku w Excelu.")
+            result = self.fn(self.progress.emit, self.cancel_event)
+        except Exception as e:
+            self.failed.emit(str(e))
+            return
+        self.finished.emit(result)
+
+    def cancel(self):
+        self.cancel_event.set()
+
+
+def run_pipeline(progress, cancel_event, tickers_path=TICKERS_PATH):
+    # Pobieranie -> analiza techniczna -> ocena i ML; przerwanie między etapami lub w trakcie pobierania
+    import analiza_fundamentalna
+    import analiza_techniczna
+    import scalona_ocena
+
+    with open(tickers_path, encoding="utf-8") as f:
+        tickers = [line.strip() for line in f if line.strip()]
+
+    progress(0, len(tickers), "Pobieranie danych fundamentalnych")
+    analiza_fundamentalna.analyze_multiple_companies(
+        tickers, FUNDAMENTAL_PATH, cancel_event=cancel_event,
+        progress=lambda done, total, ticker: progress(done, total, f"Pobrano: {ticker}"))
+    if cancel_event.is_set():
+        return None
+
+    progress(0, 0, "Analiza techniczna")
+    analiza_techniczna.analyze_many_from_csv(FUNDAMENTAL_PATH, TECHNICAL_PATH)
+    if cancel_event.is_set():
+        return None
+
+    progress(0, 0, "Ocena i model ML")
+    scalona_ocena.merge_and_classify(FUNDAMENTAL_PATH, TECHNICAL_PATH, RESULTS_PATH)
+    return load_results(RESULTS_PATH)
+
+
+class MainWindow(QMainWindow):
+    def __init__(self, results_path=RESULTS_PATH):
+        super().__init__()
+        self.setWindowTitle("Portfel2025 – ocena spółek")
+        self.resize(1400, 800)
+        self.results_path = results_path
+        self._thread = None
+        self._worker = None
+
+        self.model = DataFrameModel()
+        self.table = QTableView()
+        self.table.setModel(self.model)
+        self.table.setSortingEnabled(True)
+        self.table.setAlternatingRowColors(True)
+        self.table.verticalHeader().setDefaultSectionSize(22)
+
+        self.search = QLineEdit()
+        self.search.setPlaceholderText("Szukaj tickera lub spółki…")
+        self.label_filter = QComboBox()
+        self.label_filter.addItems([ALL_LABELS] + [label for _, label in reguly_oceny.SCORE_LABELS]
+                                   + [reguly_oceny.SCORE_DEFAULT])
+        self.load_button = QPushButton("Wczytaj wyniki")
+        self.run_button = QPushButton("Uruchom analizę")
+        self.cancel_button = QPushButton("Anuluj")
+        self.cancel_button.setEnabled(False)
+        self.export_button = QPushButton("Eksport do Excela")
+        self.progress = QProgressBar()
+        self.status = QLabel("Gotowy")
+
+        # Filtr tekstowy z opóźnieniem, żeby nie przeliczać przy każdym znaku
+        self._filter_timer = QTimer(self)
+        self._filter_timer.setSingleShot(True)
+        self._filter_timer.setInterval(200)
+        self._filter_timer.timeout.connect(self.apply_filter)
+        self.search.textChanged.connect(self._filter_timer.start)
+        self.label_filter.currentTextChanged.connect(self.apply_filter)
+        self.load_button.clicked.connect(self.load)
+        self.run_button.clicked.connect(self.run_analysis)
+        self.cancel_button.clicked.connect(self.cancel)
+        self.export_button.clicked.connect(self.export)
+
+        controls = QHBoxLayout()
+        for widget in [self.search, self.label_filter, self.load_button, self.run_button,
+                       self.cancel_button, self.export_button]:
+            controls.addWidget(widget)
+        footer = QHBoxLayout()
+        footer.addWidget(self.progress)
+        footer.addWidget(self.status, 1)
+        layout = QVBoxLayout()
+        layout.addLayout(controls)
+        layout.addWidget(self.table)
+        layout.addLayout(footer)
+        central = QWidget()
+        central.setLayout(layout)
+        self.setCentralWidget(central)
+
+    def apply_filter(self):
+        label = self.label_filter.currentText()
+        self.model.set_filter(self.search.text(), None if label == ALL_LABELS else label)
+        self.status.setText(f"Wierszy: {self.model.rowCount()}")
+
+    def set_frame(self, df):
+        if df is None:
+            self.status.setText("Anulowano")
+            return
+        self.model.set_frame(df)
+        self.apply_filter()
+
+    def start_worker(self, fn, on_finished):
+        if self._thread is not None:
+            return None
+        self._thread = QThread(self)
+        self._worker = Worker(fn)
+        self._worker.moveToThread(self._thread)
+        self._thread.started.connect(self._worker.run)
+        self._worker.progress.connect(self.on_progress)
+        self._worker.finished.connect(on_finished)
+        self._worker.failed.connect(self.on_failed)
+        self._worker.finished.connect(self._thread.quit)
+        self._worker.failed.connect(self._thread.quit)
+        self._thread.finished.connect(self.on_thread_finished)
+        self._set_busy(True)
+        self._thread.start()
+        return self._worker
+
+    def _set_busy(self, busy):
+        for button in [self.load_button, self.run_button, self.export_button]:
+            button.setEnabled(not busy)
+        self.cancel_button.setEnabled(busy)
+        if busy:
+            self.progress.setRange(0, 0)
+
+    def on_progress(self, done, total, message):
+        self.progress.setRange(0, total)
+        self.progress.setValue(done)
+        self.status.setText(message)
+
+    def on_failed(self, message):
+        self.status.setText(f"Błąd: {message}")
+        if QApplication.platformName() != "offscreen":
+            QMessageBox.warning(self, "Błąd", message)
+
+    def on_thread_finished(self):
+        self._thread.deleteLater()
+        self._thread = None
+        self._worker = None
+        self._set_busy(False)
+        self.progress.setRange(0, 1)
+        self.progress.setValue(1)
+
+    def load(self):
+        path = self.results_path
+        return self.start_worker(lambda progress, cancel_event: load_results(path), self.set_frame)
+
+    def run_analysis(self):
+        return self.start_worker(run_pipeline, self.set_frame)
+
+    def cancel(self):
+        if self._worker is not None:
+            self._worker.cancel()
+            self.status.setText("Anulowanie…")
+
+    def export(self, path=None):
+        if not path:
+            path, _ = QFileDialog.getSaveFileName(self, "Eksport", os.path.join(DATA_DIR, "wybrane_spolki.xlsx"),
+                                                  "Excel (*.xlsx)")
+        if not path:
+            return None
+        df = self.model.frame()
+        return self.start_worker(lambda progress, cancel_event: eksport_excel.write_report(df, path),
+                                 lambda result: self.status.setText(f"Zapisano do: {result}"))
+
+    def closeEvent(self, event):
+        if self._thread is not None:
+            self._worker.cancel()
+            self._thread.quit()
+            self._thread.wait()
+        super().closeEvent(event)
+
+
+def main(argv=None):
+    # QT_QPA_PLATFORM=offscreen pozwala uruchomić okno bez ekranu (np. w testach)
+    app = QApplication(argv if argv is not None else sys.argv)
+    window = MainWindow()
+    window.show()
+    window.load()
+    return app.exec()
+
 
 if __name__ == "__main__":
-    fund_path = r"../data/analiza_fundamentalna.csv"
-    tech_path = r"../data/analiza_techniczna.csv"
-    out_path = r"C:\Portfel2025\scalona_ocena.csv"
-    merge_and_classify(fund_path, tech_path, out_path)
+    sys.exit(main())
@@ -0,0 +1,143 @@
+# reguly_oceny.py
+import numpy as np
+import pandas as pd
+
+# Punktacja spółki: (pole, warunek, próg, punkty). Warunek ">col" porównuje z inną kolumną.
+SCORE_RULES = [
+    # Fundamentalne
+    ("P/E", "<", 25, 2),
+    ("ROE (%)", ">", 15, 2),
+    ("Debt/Assets", "<", 0.5, 1),
+    ("PEG", "between", (0.5, 1.5), 2),
+    ("EV/FCF", "<", 15, 2),
+    # Techniczne
+    ("RSI", "<", 30, 2),
+    ("RSI", ">", 70, -1),
+    ("Drop from ATH (%)", ">", 10, 1),
+    ("SMA50", ">col", "SMA200", 2),
+]
+
+# Ocena końcowa: pierwszy próg, który Score osiąga
+SCORE_LABELS = [
+    (9, "Dobra i tania"),
+    (6, "Dobra w dobrej cenie"),
+    (4, "Spółka średnia"),
+]
+SCORE_DEFAULT = "Spółka słaba"
+
+# Fundamental Strength: "Strong", gdy spełnione wszystkie warunki;
+# "Medium", gdy którekolwiek pole jest wypełnione; w przeciwnym razie "Weak"
+FUNDAMENTAL_RULES = [
+    ("P/E", "<", 25),
+    ("ROE (%)", ">", 15),
+    ("Debt/Assets", "<", 0.5),
+]
+
+# Valuation Status: etykieta, gdy spełniony którykolwiek z warunków (kolejność ma znaczenie)
+VALUATION_RULES = [
+    ("Undervalued", [("RSI", "<", 30), ("Drop from ATH (%)", ">", 20)]),
+    ("Overvalued", [("RSI", ">", 70)]),
+]
+VALUATION_DEFAULT = "Fairly Valued"
+
+# Ocena AI: (etykieta, minimalne ML_Points, minimalny Score)
+AI_RULES = [
+    ("Kupuj", 80, 6),
+    ("Obserwuj", 60, 5),
+]
+AI_DEFAULT = "Unikaj"
+
+
+def _numeric(df, field):
+    # Kolumna jako float64; "N/A", brak kolumny i tekst nieliczbowy -> NaN
+    if field not in df:
+        return np.full(len(df), np.nan)
+    column = df[field]
+    if pd.api.types.is_numeric_dtype(column) and not pd.api.types.is_bool_dtype(column):
+        return column.to_numpy(dtype=float)
+    return pd.to_numeric(column, errors="coerce").to_numpy(dtype=float)
+
+
+def _missing(df, field):
+    # Brak wartości: NaN/None (zapis po schemacie) albo "N/A" (stare pliki CSV)
+    column = df[field]
+    return (column.isna() | (column.astype(object) == "N/A")).to_numpy(dtype=bool)
+
+
+def _invalid(df, field):
+    # Wartości, których nie da się zamienić na liczbę (ale nie braki – NaN ani "N/A")
+    if field not in df or pd.api.types.is_numeric_dtype(df[field]):
+        return np.zeros(len(df), dtype=bool)
+    return ~_missing(df, field) & np.isnan(_numeric(df, field))
+
+
+def _present(df, field):
+    # Odpowiednik `row[field] != "N/A"` sprzed zapisu po schemacie – NaN to też brak
+    if field not in df:
+        return np.zeros(len(df), dtype=bool)
+    return ~_missing(df, field)
+
+
+def condition_mask(df, field, op, arg):
+    x = _numeric(df, field)
+    with np.errstate(invalid="ignore"):
+        if op == "<":
+            return x < arg
+        if op == ">":
+            return x > arg
+        if op == "between":
+            low, high = arg
+            return (x >= low) & (x <= high)
+        if op == ">col":
+            return x > _numeric(df, arg)
+    raise ValueError(f"Nieznany warunek: {op}")
+
+
+def score_frame(df, rules=SCORE_RULES):
+    score = np.zeros(len(df), dtype=np.int64)
+    for field, op, arg, points in rules:
+        score += np.where(condition_mask(df, field, op, arg), points, 0)
+    return pd.Series(score, index=df.index, name="Score")
+
+
+def classify_scores(score, labels=SCORE_LABELS, default=SCORE_DEFAULT):
+    values = np.asarray(score)
+    conditions = [values >= threshold for threshold, _ in labels]
+    choices = [label for _, label in labels]
+    return pd.Series(np.select(conditions, choices, default=default),
+                     index=getattr(score, "index", None), name="Ocena końcowa")
+
+
+def classify_fundamental_frame(df, rules=FUNDAMENTAL_RULES):
+    strong = np.logical_and.reduce([condition_mask(df, field, op, arg) for field, op, arg in rules])
+    medium = np.logical_or.reduce([_present(df, field) for field, _, _ in rules])
+    labels = np.select([strong, medium], ["Strong", "Medium"], default="Weak")
+    return pd.Series(labels, index=df.index, name="Fundamental Strength")
+
+
+def classify_valuation_frame(df, rules=VALUATION_RULES, default=VALUATION_DEFAULT):
+    conditions, choices = [], []
+    for label, checks in rules:
+        mask = np.zeros(len(df), dtype=bool)
+        for field, op, arg in checks:
+            hit = condition_mask(df, field, op, arg)
+            # RSI równe 0 było traktowane jak brak wartości
+            if field == "RSI":
+                hit &= _numeric(df, field) != 0
+            mask |= hit
+        conditions.append(mask)
+        choices.append(label)
+
+    # Tekst nieliczbowy w polach wyceny daje "Unknown"
+    fields = {field for _, checks in rules for field, _, _ in checks}
+    unknown = np.logical_or.reduce([_invalid(df, field) for field in sorted(fields)])
+    labels = np.select([unknown] + conditions, ["Unknown"] + choices, default=default)
+    return pd.Series(labels, index=df.index, name="Valuation Status")
+
+
+def classify_ai(df, rules=AI_RULES, default=AI_DEFAULT):
+    ml_points = _numeric(df, "ML_Points")
+    score = _numeric(df, "Score")
+    conditions = [(ml_points >= points) & (score >= min_score) for _, points, min_score in rules]
+    choices = [label for label, _, _ in rules]
+    return pd.Series(np.select(conditions, choices, default=default), index=df.index, name="Ocena AI")
@@ -0,0 +1,97 @@
+# rejestr_modeli.py
+import hashlib
+import json
+import os
+from datetime import datetime
+
+import joblib
+import pandas as pd
+from sklearn.compose import ColumnTransformer
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.impute import SimpleImputer
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import OneHotEncoder
+
+import instrumentacja
+
+MODEL_DIR = os.path.join("..", "data", "modele")
+CATEGORICAL = ["EMA Crossover", "Strefa"]
+
+DEFAULT_PARAMS = {"n_estimators": 100, "random_state": 42}
+
+
+def build_preprocessor(features):
+    numeric = [f for f in features if f not in CATEGORICAL]
+    categorical = [f for f in features if f in CATEGORICAL]
+    return ColumnTransformer([
+        ("num", SimpleImputer(strategy="mean"), numeric),
+        ("cat", OneHotEncoder(handle_unknown="ignore"), categorical)
+    ])
+
+
+def build_pipeline(features, params=None, n_jobs=-1):
+    # n_jobs=-1 – drzewa lasu uczone i oceniane na wszystkich rdzeniach
+    params = dict(DEFAULT_PARAMS, **(params or {}))
+    return Pipeline([
+        ("preprocessor", build_preprocessor(features)),
+        ("model", RandomForestClassifier(n_jobs=n_jobs, **params))
+    ])
+
+
+def training_key(X, y, features, params=None):
+    # Skrót danych uczących, listy cech i parametrów – identyczny klucz oznacza identyczny model
+    digest = hashlib.sha256()
+    digest.update(json.dumps({"features": list(features), "params": dict(DEFAULT_PARAMS, **(params or {}))},
+                             sort_keys=True).encode())
+    digest.update(pd.util.hash_pandas_object(X[list(features)], index=False).to_numpy().tobytes())
+    digest.update(pd.util.hash_pandas_object(pd.Series(y), index=False).to_numpy().tobytes())
+    return digest.hexdigest()[:16]
+
+
+def _model_path(key, model_dir):
+    return os.path.join(model_dir, f"model_{key}.joblib")
+
+
+def mark_latest(key, features, rows, trained, model_dir=MODEL_DIR):
+    # latest.json wskazuje model użyty w ostatniej ocenie – z niego korzysta sama predykcja
+    meta = {"key": key, "features": list(features), "rows": int(rows),
+            "trained": trained.isoformat(timespec="seconds")}
+    with open(os.path.join(model_dir, "latest.json"), "w", encoding="utf-8") as f:
+        json.dump(meta, f, ensure_ascii=False, indent=2)
+
+
+def save_model(pipeline, key, features, rows, model_dir=MODEL_DIR):
+    os.makedirs(model_dir, exist_ok=True)
+    joblib.dump(pipeline, _model_path(key, model_dir))
+    mark_latest(key, features, rows, datetime.now(), model_dir)
+
+
+def load_latest(model_dir=MODEL_DIR):
+    # Ostatnio wytrenowany model (do samej predykcji) albo (None, None)
+    meta_path = os.path.join(model_dir, "latest.json")
+    if not os.path.isfile(meta_path):
+        return None, None
+    with open(meta_path, encoding="utf-8") as f:
+        meta = json.load(f)
+    path = _model_path(meta["key"], model_dir)
+    if not os.path.isfile(path):
+        return None, None
+    return joblib.load(path), meta
+
+
+@instrumentacja.traced("model.load_or_train", "step")
+def load_or_train(X, y, features, params=None, model_dir=MODEL_DIR):
+    # Gdy dane uczące się nie zmieniły, model wczytujemy z dysku zamiast uczyć od nowa
+    key = training_key(X, y, features, params)
+    path = _model_path(key, model_dir)
+    if os.path.isfile(path):
+        print(f"🔁 Model z rejestru: {key}")
+        # Także starszy model z rejestru staje się najnowszym – predykcja bez uczenia użyje tego samego
+        mark_latest(key, features, len(X), datetime.fromtimestamp(os.path.getmtime(path)), model_dir)
+        return joblib.load(path), key
+
+    pipeline = build_pipeline(features, params)
+    pipeline.fit(X[list(features)], y)
+    save_model(pipeline, key, features, len(X), model_dir)
+    print(f"💾 Zapisano nowy model: {key}")
+    return pipeline, key
@@ -1,28 +1,62 @@
 # scalona_ocena.py
+import os
 import pandas as pd
 import subprocess
 import walidacja_danych
-from openpyxl import load_workbook
-from openpyxl.styles import PatternFill
-from sklearn.ensemble import RandomForestClassifier
-from sklearn.pipeline import Pipeline
-from sklearn.preprocessing import OneHotEncoder
-from sklearn.impute import SimpleImputer
-from sklearn.compose import ColumnTransformer
+import reguly_oceny
+import schemat_danych
 import numpy as np
+import instrumentacja
 
-def train_model(df, features, target_column="Target (6m +10%)"):
-    df_model = df[df[target_column].isin([0, 1])]
-    X = df_model[features]
-    y = df_model[target_column]
+# scikit-learn, openpyxl i panel notowań importujemy dopiero w funkcjach, które ich
+# potrzebują – samo przeliczenie ocen czy walidacja startuje wtedy bez tych bibliotek
+IMPORTANCE_PATH = os.path.join("..", "data", "feature_importance.csv")
 
-    numeric = [f for f in features if f not in ["EMA Crossover", "Strefa"]]
-    categorical = ["EMA Crossover", "Strefa"]
+def _predict(df, X, pipeline):
+    df["ML_Predicted"] = pipeline.predict(X)
+    df["ML_Points"] = pipeline.predict_proba(X)[:, 1] * 100
+    df["Ocena AI"] = reguly_oceny.classify_ai(df)
+    return df
 
-    # Usuń wiersze zawierające inf, -inf
-    X = X.replace([np.inf, -np.inf], np.nan)
-    X = X.dropna()
-    y = y.loc[X.index]  # dopasuj y do X po odrzuceniu wierszy
+
+def snapshot_date(df):
+    # Data migawki ocenianej ramki: data pobrania fundamentów, a bez niej dzisiejsza
+    if "Date" in df and pd.to_datetime(df["Date"], errors="coerce").notna().any():
+        return pd.to_datetime(df["Date"], errors="coerce").max().normalize()
+    return pd.Timestamp.today().normalize()
+
+
+def feature_frame(df, features, feature_store=None):
+    # Cechy (float32, ±inf jako brak, kategorie o stałym słowniku) i maska kompletnych wierszy –
+    # z magazynu cech, gdy migawka jest już zakodowana, w przeciwnym razie kodowane z ramki
+    import magazyn_cech
+
+    if feature_store is not None and feature_store.spec["features"] == list(features):
+        block = feature_store.snapshot(df, snapshot_date(df))
+    else:
+        block = magazyn_cech.encode(df, features)
+    return block.frame(index=df.index), block.complete()
+
+
+@instrumentacja.traced("train_model", "step")
+def train_model(df, features, target_column="Target (6m +10%)", inference_only=False,
+                model_dir=None, importance_path=IMPORTANCE_PATH, feature_store=None):
+    import rejestr_modeli
+
+    model_dir = model_dir or rejestr_modeli.MODEL_DIR
+    X_all, complete = feature_frame(df, features, feature_store)
+    if inference_only:
+        # Codzienna ocena bez uczenia – ostatni model z rejestru
+        pipeline, meta = rejestr_modeli.load_latest(model_dir)
+        if pipeline is not None and meta["features"] == list(features):
+            print(f"🔁 Predykcja modelem z rejestru: {meta['key']} ({meta['trained']})")
+            return _predict(df, X_all, pipeline), pipeline
+        print("⚠️ Brak zapisanego modelu dla tych cech – uczę nowy.")
+
+    # Tylko wiersze z etykietą i kompletem cech (inf liczony jako brak)
+    rows = df[target_column].isin([0, 1]).to_numpy() & complete
+    X = X_all[rows]
+    y = df.loc[rows, target_column]
 
     if len(X) == 0:
         print("❌ Brak danych do trenowania modelu – zbyt wiele braków.")
@@ -31,26 +65,15 @@ def train_model(df, features, target_column="Target (6m +10%)"):
         df["Ocena AI"] = "Unikaj"
         return df, None
 
-    preprocessor = ColumnTransformer([
-        ("num", SimpleImputer(strategy="mean"), numeric),
-        ("cat", OneHotEncoder(handle_unknown="ignore"), categorical)
-    ])
+    pipeline, _ = rejestr_modeli.load_or_train(X, y, features, model_dir=model_dir)
 
-    pipeline = Pipeline([
-        ("preprocessor", preprocessor),
-        ("model", RandomForestClassifier(n_estimators=100, random_state=42))
-    ])
-
-    pipeline.fit(X, y)
-    df["ML_Predicted"] = pipeline.predict(df[features])
-
-    # Feature importance
-    classifier = pipeline.named_steps["model"]
-    importances = classifier.feature_importances_
-    transformed = pipeline.named_steps["preprocessor"].fit_transform(X)
-    feature_names_num = numeric
-    feature_names_cat = pipeline.named_steps["preprocessor"].transformers_[1][1].get_feature_names_out(categorical)
-    feature_names = np.concatenate([feature_names_num, feature_names_cat])
+    # Feature importance – nazwy cech z dopasowanego preprocesora, bez ponownego fit
+    preprocessor = pipeline.named_steps["preprocessor"]
+    importances = pipeline.named_steps["model"].feature_importances_
+    numeric = preprocessor.transformers_[0][2]
+    categorical = preprocessor.transformers_[1][2]
+    feature_names_cat = preprocessor.named_transformers_["cat"].get_feature_names_out(categorical)
+    feature_names = np.concatenate([numeric, feature_names_cat])
 
     # Dopasuj długość tablic, by uniknąć błędu
     if len(importances) != len(feature_names):
@@ -60,185 +83,63 @@ def train_model(df, features, target_column="Target (6m +10%)"):
 
     fi = pd.DataFrame({"Feature": feature_names, "Importance": importances})
     fi = fi.sort_values(by="Importance", ascending=False)
-    fi.to_csv("../data/feature_importance.csv", index=False, encoding="utf-8-sig")
+    fi.to_csv(importance_path, index=False, encoding="utf-8-sig")
     print("\n📊 Top 10 cech wg ważności:")
     print(fi.head(10))
 
-    df["ML_Points"] = pipeline.predict_proba(df[features])[:, 1] * 100
-
-    def classify_ml_points(row):
-        if row["ML_Points"] >= 80 and row["Score"] >= 6:
-            return "Kupuj"
-        elif row["ML_Points"] >= 60 and row["Score"] >= 5:
-            return "Obserwuj"
-        else:
-            return "Unikaj"
-
-    df["Ocena AI"] = df.apply(classify_ml_points, axis=1)
-
-    return df, pipeline
-
-def score_company(row):
-    score = 0
-    if row["P/E"] != "N/A" and float(row["P/E"]) < 25:
-        score += 2
-    if row["ROE (%)"] != "N/A" and float(row["ROE (%)"]) > 15:
-        score += 2
-    if row["Debt/Assets"] != "N/A" and float(row["Debt/Assets"]) < 0.5:
-        score += 1
-    if row["PEG"] != "N/A" and 0.5 <= float(row["PEG"]) <= 1.5:
-        score += 2
-    if row["EV/FCF"] != "N/A" and float(row["EV/FCF"]) < 15:
-        score += 2
-    if row.get("RSI", "N/A") != "N/A":
-        rsi = float(row["RSI"])
-        if rsi < 30:
-            score += 2
-        elif rsi > 70:
-            score -= 1
-    if row.get("Drop from ATH (%)", "N/A") != "N/A" and float(row["Drop from ATH (%)"]) > 10:
-        score += 1
-    if row.get("SMA50", "N/A") != "N/A" and row.get("SMA200", "N/A") != "N/A":
-        if float(row["SMA50"]) > float(row["SMA200"]):
-            score += 2
-    return score
-
-def classify_company(score):
-    if score >= 9:
-        return "Dobra i tania"
-    elif 6 <= score < 9:
-        return "Dobra w dobrej cenie"
-    elif 4 <= score < 6:
-        return "Spółka średnia"
-    else:
-        return "Spółka słaba"
-
-def classify_fundamental(row):
-    if row["P/E"] != "N/A" and float(row["P/E"]) < 25 and \
-       row["ROE (%)"] != "N/A" and float(row["ROE (%)"]) > 15 and \
-       row["Debt/Assets"] != "N/A" and float(row["Debt/Assets"]) < 0.5:
-        return "Strong"
-    elif row["P/E"] != "N/A" or row["ROE (%)"] != "N/A" or row["Debt/Assets"] != "N/A":
-        return "Medium"
-    else:
-        return "Weak"
-
-def classify_valuation(row):
-    try:
-        rsi = float(row["RSI"]) if row.get("RSI", "N/A") != "N/A" else None
-        drop = float(row["Drop from ATH (%)"]) if row.get("Drop from ATH (%)", "N/A") != "N/A" else None
-        if rsi and rsi < 30 or (drop and drop > 20):
-            return "Undervalued"
-        elif rsi and rsi > 70:
-            return "Overvalued"
-        else:
-            return "Fairly Valued"
-    except:
-        return "Unknown"
+    return _predict(df, X_all, pipeline), pipeline
+
+FEATURES = [
+    "P/E", "PEG", "ROE (%)", "Debt/Assets", "EV/FCF",
+    "EPS Growth (%)", "Revenue Growth (%)", "RSI", "Drop from ATH (%)",
+    "SMA50", "SMA200", "Beta", "Dividend Yield (%)",
+    "EMA Crossover", "Strefa"
+]
+
+def merge_inputs(df_fund, df_tech):
+    return pd.merge(df_fund, df_tech, on="Ticker", how="outer").drop_duplicates("Ticker")
+
+@instrumentacja.traced("score", "step")
+def score(df):
+    df["Score"] = reguly_oceny.score_frame(df)
+    df["Ocena końcowa"] = reguly_oceny.classify_scores(df["Score"])
+    df["Fundamental Strength"] = reguly_oceny.classify_fundamental_frame(df)
+    df["Valuation Status"] = reguly_oceny.classify_valuation_frame(df)
+    return df
+
+@instrumentacja.traced("add_labels", "step")
+def add_labels(df, labels=None):
+    # labels: ramka Ticker / Target (6m +10%); bez niej etykiety liczone z panelu notowań
+    if labels is None:
+        import etykiety_wektorowe
+        import panel_cenowy
+        panel = panel_cenowy.load_price_panel(df["Ticker"])
+        df["Target (6m +10%)"] = etykiety_wektorowe.trailing_labels(panel, df["Ticker"]).to_numpy()
+        return df
+    target = labels.drop_duplicates("Ticker").set_index("Ticker")["Target (6m +10%)"]
+    df["Target (6m +10%)"] = df["Ticker"].map(target).astype(float)
+    return df
+
+@instrumentacja.traced("export", "step")
+def export(df, output_file):
+    import eksport_excel
+
+    df = df.sort_values(by="Score", ascending=False)
+    excel_path = output_file.replace(".csv", ".xlsx")
+    schemat_danych.write_columnar(df, output_file)
+    eksport_excel.write_report(df, excel_path)
+    print(f"Zapisano do: {excel_path}")
+    return excel_path
 
-def get_return(ticker, months=6):
-    import yfinance as yf
-    try:
-        hist = yf.Ticker(ticker).history(period=f"{months+1}mo")
-        if hist.empty or len(hist) < 2:
-            return "N/A"
-        p_now = hist["Close"].iloc[-1]
-        p_then = hist["Close"].iloc[0]
-        return 1 if ((p_now - p_then) / p_then) * 100 >= 10 else 0
-    except:
-        return "N/A"
-
-def format_excel_file(file_path):
-    wb = load_workbook(file_path)
-    ws = wb.active
-
-    for col in ws.columns:
-        max_length = 0
-        col_letter = col[0].column_letter
-        for cell in col:
-            if cell.value:
-                max_length = max(max_length, len(str(cell.value)))
-        ws.column_dimensions[col_letter].width = max_length + 2
-
-    colors = {
-        "Undervalued": "00FF00", "Fairly Valued": "FFFF00", "Overvalued": "FF0000", "Unknown": "FFFFFF",
-        "Strong": "00FF00", "Medium": "FFFF00", "Weak": "FF0000",
-        "Dobra i tania": "008000", "Dobra w dobrej cenie": "00FF00", "Spółka średnia": "C0C0C0", "Spółka słaba": "FF0000",  "Kupuj": "00FF00", "Obserwuj": "FFFF00", "Unikaj": "FF0000"
-    }
-
-    for row in ws.iter_rows(min_row=2):
-        for cell in row:
-            header = ws.cell(row=1, column=cell.col_idx).value
-            if header in ["Valuation Status", "Fundamental Strength", "Ocena końcowa"]:
-                color = colors.get(cell.value)
-                if color:
-                    cell.fill = PatternFill(start_color=color, end_color=color, fill_type="solid")
-            if header == "ML_Predicted":
-                cell.fill = PatternFill(start_color="00CCFF" if cell.value == 1 else "CCCCCC", fill_type="solid")
-
-    wb.save(file_path)
-
-def add_legend_sheet(file_path):
-    wb = load_workbook(file_path)
-    if 'Legenda' in wb.sheetnames:
-        del wb['Legenda']
-    ws = wb.create_sheet("Legenda")
-
-    content = [
-        ["Legenda"], [],
-        ["ML_Predicted: 1 = Kupuj, 0 = Nie kupuj"], [],
-        ["Valuation Status:"],
-        ["Undervalued: RSI < 30 lub Drop from ATH > 20%"],
-        ["Overvalued: RSI > 70"],
-        ["Fairly Valued: Pomiędzy"],
-        ["Unknown: Brak danych"], [],
-        ["Fundamental Strength:"],
-        ["Strong: P/E < 25 AND ROE > 15% AND Debt/Assets < 0.5"],
-        ["Medium: Częściowo spełnione"],
-        ["Weak: Brak danych lub słabe"], [],
-        ["Ocena końcowa:"],
-        ["Dobra i tania: Score >= 9"],
-        ["Dobra w dobrej cenie: 6–8"],
-        ["Średnia: 4–5"],
-        ["Słaba: < 4"],
-        ["Ocena AI:"],
-        ["Kupuj: ML_Points >= 80 i Score >= 6"],
-        ["Obserwuj: ML_Points >= 60 i Score >= 5"],
-        ["Unikaj: pozostałe przypadki"],
-    ]
-
-    for row in content:
-        ws.append(row)
-
-    wb.save(file_path)
-
-def merge_and_classify(fundamental_file, technical_file, output_file):
-    df_fund = pd.read_csv(fundamental_file)
-    df_tech = pd.read_csv(technical_file)
-    df = pd.merge(df_fund, df_tech, on="Ticker", how="outer").drop_duplicates("Ticker")
-
-    df["Score"] = df.apply(score_company, axis=1)
-    df["Ocena końcowa"] = df["Score"].apply(classify_company)
-    df["Fundamental Strength"] = df.apply(classify_fundamental, axis=1)
-    df["Valuation Status"] = df.apply(classify_valuation, axis=1)
-    df["Target (6m +10%)"] = df["Ticker"].apply(get_return)
+def merge_and_classify(fundamental_file, technical_file, output_file, inference_only=False):
+    df_fund = schemat_danych.read_dataset(fundamental_file, schemat_danych.FUNDAMENTAL_SCHEMA)
+    df_tech = schemat_danych.read_dataset(technical_file, schemat_danych.TECHNICAL_SCHEMA)
+    df = score(merge_inputs(df_fund, df_tech))
+    df = add_labels(df)
     df = walidacja_danych.validate_data(df)
+    df, _ = train_model(df, FEATURES, inference_only=inference_only)
 
-    features = [
-        "P/E", "PEG", "ROE (%)", "Debt/Assets", "EV/FCF",
-        "EPS Growth (%)", "Revenue Growth (%)", "RSI", "Drop from ATH (%)",
-        "SMA50", "SMA200", "Beta", "Dividend Yield (%)",
-        "EMA Crossover", "Strefa"
-    ]
-    df, _ = train_model(df, features)
-
-    df.sort_values(by="Score", ascending=False, inplace=True)
-    excel_path = output_file.replace(".csv", ".xlsx")
-    df.to_excel(excel_path, index=False)
-    format_excel_file(excel_path)
-    add_legend_sheet(excel_path)
-
-    print(f"Zapisano do: {excel_path}")
+    excel_path = export(df, output_file)
     try:
         subprocess.run(["start", "excel", excel_path], shell=True)
     except:
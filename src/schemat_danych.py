@@ -0,0 +1,106 @@
+# schemat_danych.py
+import os
+import pandas as pd
+
+# Stałe kategorie – dzięki nim kody kategorii są takie same we wszystkich migawkach
+CATEGORIES = {
+    "Strefa": ["Blisko Swing High", "Blisko Swing Low", "Neutral"],
+    "EMA Crossover": ["Bearish", "Bullish"],
+}
+
+FUNDAMENTAL_SCHEMA = {
+    "Date": "date",
+    "Company": "str",
+    "Ticker": "str",
+    "Price": "float",
+    "P/E": "float",
+    "PEG": "float",
+    "Price/Sales": "float",
+    "Price/Book": "float",
+    "ROE (%)": "float",
+    "ROA (%)": "float",
+    "Operating Margin (%)": "float",
+    "Gross Margin (%)": "float",
+    "Current Ratio": "float",
+    "Quick Ratio": "float",
+    "Beta": "float",
+    "Free Cash Flow": "float",
+    "EV/FCF": "float",
+    "Dividend Yield (%)": "float",
+    "Dividend Rate": "float",
+    "EPS Growth (%)": "float",
+    "Revenue Growth (%)": "float",
+    "EBIT": "float",
+    "Interest Expense": "float",
+    "Total Assets": "float",
+    "Total Debt": "float",
+    "Interest Coverage": "float",
+    "Debt/Assets": "float",
+}
+
+TECHNICAL_SCHEMA = {
+    "Date": "date",
+    "Ticker": "str",
+    "Last Price": "float",
+    "30d MA": "float",
+    "Max (60d)": "float",
+    "Drop from ATH (%)": "float",
+    "SMA50": "float",
+    "SMA100": "float",
+    "SMA200": "float",
+    "EMA20": "float",
+    "EMA50": "float",
+    "EMA12": "float",
+    "EMA26": "float",
+    "VWAP": "float",
+    "VWAP Diff (%)": "float",
+    "Swing High (%)": "float",
+    "Swing Low (%)": "float",
+    "RSI": "float",
+    "Strefa": "category",
+    "EMA Crossover": "category",
+    "Error": "str",
+}
+
+MERGED_SCHEMA = {**FUNDAMENTAL_SCHEMA, **TECHNICAL_SCHEMA}
+
+
+def apply_schema(df, schema):
+    # float64 z NaN zamiast "N/A", kategorie o stałym słowniku, daty jako datetime64
+    df = df.copy()
+    for column, kind in schema.items():
+        if column not in df:
+            continue
+        if kind == "float":
+            df[column] = pd.to_numeric(df[column], errors="coerce").astype("float64")
+        elif kind == "category":
+            df[column] = pd.Categorical(df[column], categories=CATEGORIES[column])
+        elif kind == "date":
+            df[column] = pd.to_datetime(df[column], errors="coerce")
+    return df
+
+
+def columnar_path(csv_path):
+    return os.path.splitext(csv_path)[0] + ".parquet"
+
+
+def write_columnar(df, csv_path):
+    # Kopia kolumnowa obok CSV; bez pyarrow zostaje tylko CSV
+    path = columnar_path(csv_path)
+    try:
+        df.to_parquet(path, index=False)
+    except ImportError:
+        print("Brak pyarrow – pomijam zapis Parquet")
+        return None
+    return path
+
+
+def read_dataset(csv_path, schema):
+    # Parquet, jeśli jest aktualny względem CSV; w przeciwnym razie CSV + schemat
+    path = columnar_path(csv_path)
+    if os.path.isfile(path) and (not os.path.isfile(csv_path) or os.path.getmtime(path) >= os.path.getmtime(csv_path)):
+        try:
+            return pd.read_parquet(path)
+        except ImportError:
+            pass
+    return apply_schema(pd.read_csv(csv_path), schema)
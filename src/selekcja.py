@@ -0,0 +1,468 @@
+# selekcja.py
+import json
+import os
+import re
+
+import numpy as np
+import pandas as pd
+
+import instrumentacja
+
+INDEX_DIR = os.path.join("..", "data", "indeks_selekcji")
+
+# Kolumny tekstowe o co najwyżej tylu wartościach dostają mapy bitowe kategorii;
+# pozostałe (Ticker, Company) – indeks posortowany jak kolumny liczbowe
+MAX_BITMAP_CATEGORIES = 64
+DISPLAY_COLUMNS = ["Date", "Ticker", "Company", "Score", "Ocena końcowa", "ML_Points", "Ocena AI"]
+FORMAT = 1
+
+TOKEN = re.compile(r"""
+    \s*(?:
+      (?P<number>-?\d+(?:\.\d+)?(?:[eE][-+]?\d+)?)(?![^\s()<>=!,])
+    | "(?P<dq>[^"]*)" | '(?P<sq>[^']*)' | `(?P<bq>[^`]*)`
+    | (?P<op><=|>=|==|!=|<|>|=)
+    | (?P<punct>[(),])
+    | (?P<word>[^\s()<>=!,"'`]+)
+    )""", re.VERBOSE)
+EXPECTED = {"op": "operatora porównania", "(": "nawiasu otwierającego", ")": "nawiasu zamykającego", "in": "in"}
+FLIP = {"<": ">", "<=": ">=", ">": "<", ">=": "<=", "==": "==", "!=": "!="}
+
+
+def tokenize(text):
+    tokens, pos = [], 0
+    text = text.rstrip()
+    while pos < len(text):
+        match = TOKEN.match(text, pos)
+        if not match or match.end() == pos:
+            raise ValueError(f"Niezrozumiały fragment zapytania: {text[pos:]!r}")
+        pos = match.end()
+        kind = match.lastgroup
+        value = match.group(kind)
+        if kind == "number":
+            tokens.append(("literal", float(value)))
+        elif kind in ("dq", "sq"):
+            tokens.append(("string", value))
+        elif kind == "bq":
+            tokens.append(("column", value))
+        elif kind == "op":
+            tokens.append(("op", "==" if value == "=" else value))
+        elif kind == "punct":
+            tokens.append((value, value))
+        elif value.lower() in ("and", "or", "not", "in"):
+            tokens.append((value.lower(), value.lower()))
+        else:
+            tokens.append(("column", value))
+    return tokens
+
+
+class Parser:
+    # Gramatyka: or -> and ("or" and)* ; and -> not ("and" not)* ; not -> "not" not | atom ;
+    # atom -> "(" or ")" | operand op operand | operand ["not"] "in" "(" literał, ... ")".
+    # Napis w cudzysłowie jest kolumną, jeśli tak nazywa się kolumna, a druga strona nią nie jest.
+    # Braki (NaN, pusta kategoria) jak w pandas: nie spełniają <, <=, >, >=, == ani in, spełniają
+    # != i "not in"; "not" to zawsze dopełnienie, więc `not P/E == 15` to to samo co `P/E != 15`.
+
+    def __init__(self, text, columns):
+        self.tokens = tokenize(text)
+        self.pos = 0
+        self.columns = set(columns)
+
+    def peek(self):
+        return self.tokens[self.pos] if self.pos < len(self.tokens) else (None, None)
+
+    def take(self, kind=None):
+        token = self.peek()
+        if token[0] is None or (kind is not None and token[0] != kind):
+            raise ValueError(f"Oczekiwano {EXPECTED.get(kind, 'wyrażenia')}, jest: {token[1]!r} "
+                             "(nazwy kolumn ze spacjami w cudzysłowie lub `...`)")
+        self.pos += 1
+        return token
+
+    def parse(self):
+        node = self.parse_or()
+        if self.pos != len(self.tokens):
+            raise ValueError(f"Nieoczekiwany element zapytania: {self.peek()[1]!r}")
+        return node
+
+    def parse_or(self):
+        node = self.parse_and()
+        while self.peek()[0] == "or":
+            self.take()
+            node = ("or", node, self.parse_and())
+        return node
+
+    def parse_and(self):
+        node = self.parse_not()
+        while self.peek()[0] == "and":
+            self.take()
+            node = ("and", node, self.parse_not())
+        return node
+
+    def parse_not(self):
+        if self.peek()[0] == "not":
+            self.take()
+            return ("not", self.parse_not())
+        return self.parse_atom()
+
+    def _column(self, token):
+        kind, value = token
+        if kind == "column" and value not in self.columns:
+            raise ValueError(f"Nieznana kolumna: {value!r}")
+        return value
+
+    def parse_atom(self):
+        if self.peek()[0] == "(":
+            self.take()
+            node = self.parse_or()
+            self.take(")")
+            return node
+        left = self.take()
+        if self.peek()[0] in ("in", "not"):
+            negate = self.take()[0] == "not"
+            if negate:
+                self.take("in")
+            self.take("(")
+            values = [self.take()[1]]
+            while self.peek()[0] == ",":
+                self.take()
+                values.append(self.take()[1])
+            self.take(")")
+            node = ("in", self._operand_column(left), values)
+            return ("not", node) if negate else node
+        op = self.take("op")[1]
+        right = self.take()
+        if self._is_column(left):
+            return ("cmp", self._operand_column(left), op, right[1])
+        if self._is_column(right):
+            return ("cmp", self._operand_column(right), FLIP[op], left[1])
+        raise ValueError(f"Porównanie bez kolumny: {left[1]!r} {op} {right[1]!r}")
+
+    def _is_column(self, token):
+        return token[0] == "column" or (token[0] == "string" and token[1] in self.columns)
+
+    def _operand_column(self, token):
+        if not self._is_column(token):
+            raise ValueError(f"Oczekiwano kolumny, jest: {token[1]!r}")
+        return self._column(("column", token[1]))
+
+
+def parse(text, columns):
+    return Parser(text, columns).parse()
+
+
+class ScreenIndex:
+    # Migawki (Date, Ticker) posortowane po dacie, więc zakres dat to ciągły zakres wierszy.
+    # Kolumny liczbowe i tekstowe o wielu wartościach: indeks posortowany po kluczu
+    # (numer daty, ranga wartości) – warunek w zakresie dat to dwa wyszukiwania binarne na datę
+    # i tylko trafione wiersze. Kolumny kategorii: spakowane mapy bitowe wierszy dla każdej wartości.
+    # Indeksy budowane przy pierwszym użyciu i zapisywane obok danych (mmap przy odczycie).
+
+    def __init__(self, data, meta, path=None):
+        self.data = data
+        self.meta = meta
+        self.path = path
+        self.dates = np.asarray(meta["dates"], dtype="datetime64[D]")
+        self.offsets = np.asarray(meta["offsets"], dtype=np.int64)
+        self.rows = int(self.offsets[-1])
+        self._indexes = {}
+
+    @classmethod
+    def build(cls, df, path=None):
+        df = df.dropna(subset=["Date", "Ticker"])
+        df = df.assign(Date=pd.to_datetime(df["Date"]).dt.normalize()).sort_values(["Date", "Ticker"],
+                                                                                   ignore_index=True)
+        days = df["Date"].to_numpy(dtype="datetime64[D]")
+        dates, starts = np.unique(days, return_index=True)
+        meta = {"format": FORMAT, "dates": [str(d) for d in dates],
+                "offsets": starts.tolist() + [len(df)], "columns": {}}
+        data = {"Date": days.astype(np.int64)}
+        for column in df.columns:
+            if column == "Date":
+                continue
+            series = df[column]
+            numeric = pd.api.types.is_numeric_dtype(series) and not pd.api.types.is_bool_dtype(series)
+            if numeric:
+                data[column] = pd.to_numeric(series, errors="coerce").to_numpy(dtype=np.float64, na_value=np.nan)
+                meta["columns"][column] = {"kind": "numeric"}
+                continue
+            values = series.astype(object).where(series.notna(), None)
+            text = values[values.notna()].astype(str)
+            categories = np.unique(text.to_numpy(dtype=str)) if len(text) else np.array([], dtype=str)
+            codes = np.full(len(df), -1, dtype=np.int32)
+            codes[values.notna().to_numpy()] = np.searchsorted(categories, text.to_numpy(dtype=str))
+            kind = "category" if len(categories) <= MAX_BITMAP_CATEGORIES else "text"
+            data[column] = codes
+            meta["columns"][column] = {"kind": kind, "categories": categories.tolist()}
+        index = cls(data, meta, path)
+        if path is not None:
+            index.save()
+        return index
+
+    def save(self):
+        os.makedirs(self.path, exist_ok=True)
+        for i, (column, values) in enumerate(self.data.items()):
+            np.save(os.path.join(self.path, f"c{i}.npy"), values)
+        meta = dict(self.meta, files=list(self.data))
+        with open(os.path.join(self.path, "meta.json.tmp"), "w", encoding="utf-8") as f:
+            json.dump(meta, f, ensure_ascii=False)
+        os.replace(os.path.join(self.path, "meta.json.tmp"), os.path.join(self.path, "meta.json"))
+
+    @classmethod
+    def load(cls, path):
+        with open(os.path.join(path, "meta.json"), encoding="utf-8") as f:
+            meta = json.load(f)
+        if meta.get("format") != FORMAT:
+            raise ValueError("Nieaktualny format indeksu")
+        data = {column: np.load(os.path.join(path, f"c{i}.npy"), mmap_mode="r")
+                for i, column in enumerate(meta["files"])}
+        return cls(data, meta, path)
+
+    def columns(self):
+        return list(self.data)
+
+    def kind(self, column):
+        return "date" if column == "Date" else self.meta["columns"][column]["kind"]
+
+    # --- indeksy ---
+
+    def _index_file(self, column, part):
+        i = list(self.data).index(column)
+        return os.path.join(self.path, f"i{i}_{part}.npy") if self.path else None
+
+    def _cached(self, column, parts, build):
+        if column in self._indexes:
+            return self._indexes[column]
+        files = [self._index_file(column, part) for part in parts]
+        if files[0] and all(os.path.isfile(f) for f in files):
+            arrays = [np.load(f, mmap_mode="r") for f in files]
+        else:
+            arrays = build()
+            if files[0]:
+                for f, array in zip(files, arrays):
+                    np.save(f, array)
+        self._indexes[column] = arrays
+        return arrays
+
+    def sorted_index(self, column):
+        # (klucze posortowane, permutacja wierszy, wartości unikalne dla kolumn liczbowych)
+        def build():
+            values = self.data[column]
+            if self.kind(column) == "numeric":
+                unique = np.unique(values[~np.isnan(values)])
+                ranks = np.searchsorted(unique, values)
+                ranks[np.isnan(values)] = len(unique)
+            else:
+                unique = np.arange(len(self.meta["columns"][column]["categories"]), dtype=np.float64)
+                ranks = np.where(values < 0, len(unique), values)
+            day = np.repeat(np.arange(len(self.dates), dtype=np.int64), np.diff(self.offsets))
+            keys = day * (len(unique) + 1) + ranks
+            order = np.argsort(keys, kind="stable")
+            return [keys[order], order.astype(np.int64), unique]
+        return self._cached(column, ["keys", "order", "unique"], build)
+
+    def bitmaps(self, column):
+        # Jedna spakowana mapa bitowa wierszy na kategorię
+        def build():
+            codes = np.asarray(self.data[column])
+            n = len(self.meta["columns"][column]["categories"])
+            return [np.packbits(codes[None, :] == np.arange(n)[:, None], axis=1)]
+        return self._cached(column, ["bits"], build)[0]
+
+    # --- wykonanie ---
+
+    def date_range(self, start=None, end=None):
+        first = 0 if start is None else int(np.searchsorted(self.dates, np.datetime64(pd.Timestamp(start).date())))
+        last = len(self.dates) if end is None else \
+            int(np.searchsorted(self.dates, np.datetime64(pd.Timestamp(end).date()), side="right"))
+        return first, max(first, last)
+
+    def _rank_range(self, column, op, value):
+        # Zakresy rang [lo, hi) spełniające warunek (bez rangi braków; != liczone w _mask)
+        if self.kind(column) == "numeric":
+            unique = self.sorted_index(column)[2]
+            try:
+                x = float(value)
+            except (TypeError, ValueError):
+                raise ValueError(f"Kolumna {column!r} jest liczbowa, a wartość nie: {value!r}")
+            left, right = np.searchsorted(unique, x, "left"), np.searchsorted(unique, x, "right")
+        else:
+            categories = np.asarray(self.meta["columns"][column]["categories"], dtype=str)
+            x = str(value) if not isinstance(value, float) or not value.is_integer() else str(int(value))
+            left, right = np.searchsorted(categories, x, "left"), np.searchsorted(categories, x, "right")
+            unique = categories
+        u = len(unique)
+        return {"<": [(0, left)], "<=": [(0, right)], ">": [(right, u)], ">=": [(left, u)],
+                "==": [(left, right)]}[op]
+
+    def _sorted_rows(self, column, op, value, first, last):
+        keys, order, unique = self.sorted_index(column)
+        width = len(unique) + 1
+        days = np.arange(first, last, dtype=np.int64) * width
+        parts = []
+        for lo, hi in self._rank_range(column, op, value):
+            if hi <= lo:
+                continue
+            starts = np.searchsorted(keys, days + lo)
+            ends = np.searchsorted(keys, days + hi)
+            nonempty = ends > starts
+            starts, counts = starts[nonempty], (ends - starts)[nonempty]
+            if len(counts):
+                # Sklejenie przedziałów order[start:end] wszystkich dat bez pętli
+                shift = np.repeat(starts - np.concatenate([[0], np.cumsum(counts)[:-1]]), counts)
+                parts.append(np.asarray(order[np.arange(int(counts.sum())) + shift]))
+        return np.concatenate(parts) if parts else np.empty(0, dtype=np.int64)
+
+    def _mask(self, node, first, last):
+        lo, hi = self.offsets[first], self.offsets[last]
+        kind = node[0]
+        if kind == "and":
+            return self._mask(node[1], first, last) & self._mask(node[2], first, last)
+        if kind == "or":
+            return self._mask(node[1], first, last) | self._mask(node[2], first, last)
+        if kind == "not":
+            return ~self._mask(node[1], first, last)
+        if kind == "in":
+            mask = np.zeros(hi - lo, dtype=bool)
+            for value in node[2]:
+                mask |= self._mask(("cmp", node[1], "==", value), first, last)
+            return mask
+        _, column, op, value = node
+        if op == "!=":
+            # Dopełnienie == – braki spełniają != (jak "not ... ==")
+            return ~self._mask(("cmp", column, "==", value), first, last)
+        instrumentacja.count(f"screen.{self.kind(column)}")
+        if column == "Date":
+            day = np.datetime64(pd.Timestamp(value).date())
+            days = np.asarray(self.data["Date"][lo:hi]).astype("datetime64[D]")
+            return {"<": days < day, "<=": days <= day, ">": days > day, ">=": days >= day,
+                    "==": days == day}[op]
+        if self.kind(column) == "category":
+            # Kategorie są posortowane, więc <, > działają leksykograficznie jak w indeksie posortowanym
+            bits = self.bitmaps(column)
+            mask = np.zeros(hi - lo, dtype=bool)
+            byte_lo, shift = lo // 8, lo % 8
+            for a, b in self._rank_range(column, op, value):
+                for code in range(a, b):
+                    mask |= np.unpackbits(bits[code, byte_lo:(hi + 7) // 8 + 1])[shift:shift + hi - lo].astype(bool)
+            return mask
+        mask = np.zeros(hi - lo, dtype=bool)
+        mask[self._sorted_rows(column, op, value, first, last) - lo] = True
+        return mask
+
+    @instrumentacja.traced("screen", "step")
+    def query(self, expression=None, start=None, end=None, latest=False, top=None, by="Score",
+              ascending=False, columns=None):
+        # Wiersze spełniające warunek w zakresie dat (latest – tylko ostatnia migawka);
+        # top – k najlepszych wg `by` spośród trafionych wierszy
+        if not len(self.dates):
+            return pd.DataFrame(columns=DISPLAY_COLUMNS)
+        first, last = (len(self.dates) - 1, len(self.dates)) if latest else self.date_range(start, end)
+        lo = self.offsets[first]
+        node = parse(expression, self.columns()) if expression and expression.strip() else None
+        if node is None:
+            rows = np.arange(lo, self.offsets[last])
+        else:
+            rows = np.flatnonzero(self._mask(node, first, last)) + lo
+        if top is not None and len(rows):
+            if by not in self.data or self.kind(by) != "numeric":
+                raise ValueError(f"Ranking tylko po kolumnie liczbowej, nie: {by!r}")
+            values = np.asarray(self.data[by])[rows]
+            values = np.where(np.isnan(values), np.inf if ascending else -np.inf, values)
+            values = values if ascending else -values
+            if top < len(rows):
+                keep = np.argpartition(values, top - 1)[:top]
+                rows, values = rows[keep], values[keep]
+            rows = rows[np.argsort(values, kind="stable")]
+        return self.frame(rows, columns or self._display(node, by))
+
+    def _display(self, node, by):
+        referenced = []
+
+        def walk(n):
+            if n[0] in ("and", "or"):
+                walk(n[1]), walk(n[2])
+            elif n[0] == "not":
+                walk(n[1])
+            else:
+                referenced.append(n[1])
+        if node is not None:
+            walk(node)
+        wanted = DISPLAY_COLUMNS + [by] + referenced
+        return [c for c in dict.fromkeys(wanted) if c in self.data]
+
+    def frame(self, rows, columns):
+        out = {}
+        for column in columns:
+            values = np.asarray(self.data[column])[rows]
+            if column == "Date":
+                out[column] = values.astype("datetime64[D]").astype("datetime64[ns]")
+            elif self.kind(column) == "numeric":
+                out[column] = values
+            else:
+                categories = np.asarray(self.meta["columns"][column]["categories"], dtype=object)
+                out[column] = np.where(values >= 0, categories[np.maximum(values, 0)] if len(categories)
+                                       else None, None)
+        return pd.DataFrame(out, columns=columns)
+
+
+def load_history(data_dir, start=None, end=None, scored_path=None):
+    # Historia ocen z migawek fundamentalnych i technicznych (punktacja z tabeli reguł);
+    # ostatnia migawka uzupełniona o kolumny modelu i walidacji z bieżącej scalonej oceny
+    import magazyn_migawek
+    import scalona_ocena
+    import schemat_danych
+
+    root = os.path.join(data_dir, "migawki")
+    fund = magazyn_migawek.fundamental_store(root).load_all(start, end)
+    tech = magazyn_migawek.technical_store(root).load_all(start, end)
+    if fund.empty and tech.empty:
+        df = pd.DataFrame(columns=["Date", "Ticker"])
+    else:
+        df = scalona_ocena.score(pd.merge(fund, tech, on=["Date", "Ticker"], how="outer"))
+    scored_path = scored_path or os.path.join(data_dir, "scalona_ocena.csv")
+    if os.path.isfile(scored_path) or os.path.isfile(schemat_danych.columnar_path(scored_path)):
+        scored = schemat_danych.read_dataset(scored_path, schemat_danych.MERGED_SCHEMA)
+        day = scalona_ocena.snapshot_date(scored)
+        scored = scored.assign(Date=day)
+        # Bieżąca ocena zastępuje wiersze tej daty odtworzone z migawek
+        df = pd.concat([df[pd.to_datetime(df["Date"]) != day], scored], ignore_index=True)
+    return df
+
+
+def _fingerprint(data_dir, scored_path):
+    # Indeks jest aktualny, dopóki nie zmienią się partycje migawek ani bieżąca ocena
+    parts = []
+    for name in ("fundamentalna", "techniczna"):
+        path = os.path.join(data_dir, "migawki", name)
+        if os.path.isdir(path):
+            for d in sorted(os.listdir(path)):
+                part = os.path.join(path, d, "part.parquet")
+                if os.path.isfile(part):
+                    parts.append(f"{name}/{d}:{os.path.getmtime(part)}")
+    for path in (scored_path, os.path.splitext(scored_path)[0] + ".parquet"):
+        if os.path.isfile(path):
+            parts.append(f"{os.path.basename(path)}:{os.path.getmtime(path)}")
+    return parts
+
+
+def open_index(data_dir, index_dir=None, rebuild=False):
+    # Indeks z dysku, jeśli aktualny; w przeciwnym razie zbudowany od nowa z historii
+    index_dir = index_dir or os.path.join(data_dir, "indeks_selekcji")
+    scored_path = os.path.join(data_dir, "scalona_ocena.csv")
+    fingerprint = _fingerprint(data_dir, scored_path)
+    if not rebuild and os.path.isfile(os.path.join(index_dir, "meta.json")):
+        try:
+            index = ScreenIndex.load(index_dir)
+            if index.meta.get("fingerprint") == fingerprint:
+                return index
+        except ValueError:
+            pass
+    if os.path.isdir(index_dir):
+        for name in os.listdir(index_dir):
+            os.remove(os.path.join(index_dir, name))
+    print("🔧 Budowanie indeksu selekcji z migawek...")
+    index = ScreenIndex.build(load_history(data_dir, scored_path=scored_path))
+    index.meta["fingerprint"] = fingerprint
+    index.path = index_dir
+    index.save()
+    return index
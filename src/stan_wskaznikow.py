@@ -0,0 +1,341 @@
+# stan_wskaznikow.py
+import copy
+import json
+import math
+import os
+from collections import deque
+from functools import lru_cache
+
+import pandas as pd
+import dostawca_danych
+import panel_cenowy
+
+STATE_PATH = os.path.join("..", "data", "stan_wskaznikow.json")
+
+SMA_WINDOWS = (30, 50, 100, 200)
+EMA_SPANS = (12, 20, 26, 50)
+RSI_WINDOW = 14
+EXTREMA_WINDOW = 60
+
+# Pozycje w rekordzie sesji przechowywanym w oknie
+SEQ, DATE, HIGH, LOW, CLOSE, VOLUME, GAIN, LOSS = range(8)
+
+
+@lru_cache(maxsize=4096)
+def _cutoff(date, period):
+    # Najstarsza data, która już nie mieści się w oknie – wspólna dla wszystkich tickerów
+    return (pd.Timestamp(date) - dostawca_danych.period_to_offset(period)).strftime("%Y-%m-%d")
+
+
+class WindowState:
+    # Stan wskaźników dla kroczącego okna kalendarzowego (np. "6mo"), takiego
+    # samego jak Ticker.history(period=...). Każda nowa sesja i każde wypadnięcie
+    # najstarszej sesji z okna aktualizuje sumy w O(1), więc wynik odpowiada
+    # pełnemu przeliczeniu na tym samym oknie.
+
+    def __init__(self, period):
+        self.period = period
+        self.offset = dostawca_danych.period_to_offset(period)
+        self.seq = 0
+        self.bars = deque()
+        self.sma = {w: 0.0 for w in SMA_WINDOWS}
+        self.ema_num = {s: 0.0 for s in EMA_SPANS}
+        self.ema_den = {s: 0.0 for s in EMA_SPANS}
+        self.ema_rec = {s: None for s in EMA_SPANS}
+        self.max_close = deque()
+        self.min_close = deque()
+        self.max_high = deque()
+        self.min_low = deque()
+        self.pv = 0.0
+        self.hlc_pv = 0.0
+        self.volume = 0.0
+        self.gain = 0.0
+        self.loss = 0.0
+
+    @staticmethod
+    def _beta(span):
+        return 1 - 2.0 / (span + 1)
+
+    @staticmethod
+    def _push_extreme(dq, seq, value, keep):
+        # Kolejka monotoniczna: na początku zawsze maksimum (lub minimum) okna
+        while dq and keep(dq[-1][1], value):
+            dq.pop()
+        dq.append([seq, value])
+
+    def update(self, date, high, low, close, volume):
+        prev = self.bars[-1][CLOSE] if self.bars else None
+        delta = close - prev if prev is not None else 0.0
+        bar = [self.seq, date, high, low, close, volume, max(delta, 0.0), max(-delta, 0.0)]
+        self.bars.append(bar)
+        n = len(self.bars)
+
+        for w in SMA_WINDOWS:
+            self.sma[w] += close
+            if n > w:
+                self.sma[w] -= self.bars[-w - 1][CLOSE]
+
+        for s in EMA_SPANS:
+            beta = self._beta(s)
+            self.ema_num[s] = beta * self.ema_num[s] + close
+            self.ema_den[s] = beta * self.ema_den[s] + 1.0
+            rec = self.ema_rec[s]
+            self.ema_rec[s] = close if rec is None else beta * rec + (1 - beta) * close
+
+        self.pv += close * volume
+        self.hlc_pv += (high + low + close) / 3 * volume
+        self.volume += volume
+
+        self.gain += bar[GAIN]
+        self.loss += bar[LOSS]
+        if n > RSI_WINDOW:
+            self.gain -= self.bars[-RSI_WINDOW - 1][GAIN]
+            self.loss -= self.bars[-RSI_WINDOW - 1][LOSS]
+
+        self._push_extreme(self.max_close, self.seq, close, lambda old, new: old <= new)
+        self._push_extreme(self.min_close, self.seq, close, lambda old, new: old >= new)
+        self._push_extreme(self.max_high, self.seq, high, lambda old, new: old <= new)
+        self._push_extreme(self.min_low, self.seq, low, lambda old, new: old >= new)
+        for dq in (self.max_close, self.min_close, self.max_high, self.min_low):
+            while dq[0][0] <= self.seq - EXTREMA_WINDOW:
+                dq.popleft()
+        self.seq += 1
+
+        if self.offset is not None:
+            cutoff = _cutoff(date, self.period)
+            while self.bars[0][DATE] <= cutoff:
+                self._evict_front()
+
+    def _evict_front(self):
+        n = len(self.bars)
+        front = self.bars[0]
+        age = n - 1
+
+        for w in SMA_WINDOWS:
+            if n <= w:
+                self.sma[w] -= front[CLOSE]
+
+        for s in EMA_SPANS:
+            weight = self._beta(s) ** age
+            self.ema_num[s] -= weight * front[CLOSE]
+            self.ema_den[s] -= weight
+            # ewm(adjust=False) zaczyna od pierwszej wartości okna – korekta o zmianę punktu startu
+            if n > 1:
+                self.ema_rec[s] -= weight * (front[CLOSE] - self.bars[1][CLOSE])
+            else:
+                self.ema_rec[s] = None
+
+        self.pv -= front[CLOSE] * front[VOLUME]
+        self.hlc_pv -= (front[HIGH] + front[LOW] + front[CLOSE]) / 3 * front[VOLUME]
+        self.volume -= front[VOLUME]
+
+        if n <= RSI_WINDOW:
+            self.gain -= front[GAIN]
+            self.loss -= front[LOSS]
+
+        for dq in (self.max_close, self.min_close, self.max_high, self.min_low):
+            if dq and dq[0][0] == front[SEQ]:
+                dq.popleft()
+
+        self.bars.popleft()
+        # Pierwsza sesja okna nie ma poprzednika – jej zmiana liczy się jako 0 (jak diff() w pandas).
+        # Rekord podmieniamy na kopię, żeby kopie stanu (copy) współdzieliły sesje bez ryzyka
+        if self.bars:
+            new_front = self.bars[0] = list(self.bars[0])
+            if len(self.bars) <= RSI_WINDOW:
+                self.gain -= new_front[GAIN]
+                self.loss -= new_front[LOSS]
+            new_front[GAIN] = 0.0
+            new_front[LOSS] = 0.0
+
+    def copy(self):
+        # Płytka kopia: rekordy sesji są współdzielone, bo update ich nie modyfikuje
+        state = copy.copy(self)
+        for key, value in self.__dict__.items():
+            if isinstance(value, (deque, dict)):
+                setattr(state, key, type(value)(value))
+        return state
+
+    def ema(self, span):
+        return self.ema_num[span] / self.ema_den[span]
+
+    def rsi(self):
+        if len(self.bars) < RSI_WINDOW:
+            return math.nan
+        gain, loss = max(self.gain, 0.0), max(self.loss, 0.0)
+        if loss == 0:
+            return 100.0 if gain > 0 else math.nan
+        return 100 - 100 / (1 + gain / loss)
+
+    def to_dict(self):
+        return {key: (list(value) if isinstance(value, deque) else value)
+                for key, value in self.__dict__.items() if key != "offset"}
+
+    @classmethod
+    def from_dict(cls, data):
+        state = cls(data["period"])
+        for key, value in data.items():
+            if isinstance(getattr(state, key), deque):
+                value = deque(value)
+            elif isinstance(getattr(state, key), dict):
+                value = {int(k): v for k, v in value.items()}
+            setattr(state, key, value)
+        return state
+
+
+class IndicatorState:
+    # Stan jednego tickera: okno 6 miesięcy dla analiza_techniczna
+    # i okno 3 miesięcy dla advanced_tech_analysis
+
+    def __init__(self, ticker):
+        self.ticker = ticker
+        self.last_date = None
+        self.technical = WindowState("6mo")
+        self.advanced = WindowState("3mo")
+
+    @classmethod
+    def from_history(cls, ticker, hist):
+        state = cls(ticker)
+        state.update_many(hist)
+        return state
+
+    def update(self, date, high, low, close, volume):
+        # Sesje starsze lub równe ostatniej już przetworzonej są pomijane
+        if self.last_date is not None and date <= self.last_date:
+            return False
+        self.technical.update(date, high, low, close, volume)
+        self.advanced.update(date, high, low, close, volume)
+        self.last_date = date
+        return True
+
+    def preview(self, date, high, low, close, volume):
+        # Sygnały z niezamkniętą bieżącą sesją dopisaną do kopii okna – stan tickera bez zmian
+        trial = copy.copy(self)
+        trial.technical = self.technical.copy()
+        if self.last_date is None or date > self.last_date:
+            trial.technical.update(date, high, low, close, volume)
+        return trial.signals()
+
+    def update_many(self, hist):
+        dates = pd.DatetimeIndex(hist.index).strftime("%Y-%m-%d")
+        for date, high, low, close, volume in zip(dates, hist["High"], hist["Low"], hist["Close"], hist["Volume"]):
+            self.update(date, float(high), float(low), float(close), float(volume))
+
+    def signals(self):
+        # Ten sam słownik co analiza_techniczna.fetch_technical_signals
+        win = self.technical
+        n = len(win.bars)
+        if n == 0:
+            return {"Ticker": self.ticker, "Error": "Brak danych historycznych"}
+        last = win.bars[-1][CLOSE]
+        max60 = win.max_close[0][1]
+        min60 = win.min_close[0][1]
+        ma30 = win.sma[30] / 30 if n >= 30 else math.nan
+        sma50 = win.sma[50] / 50 if n >= 50 else math.nan
+        ema12, ema26 = win.ema(12), win.ema(26)
+        vwap = win.pv / win.volume if win.volume else math.nan
+        swing_high = round((max60 - last) / last * 100, 2)
+        swing_low = round((last - min60) / last * 100, 2)
+
+        if swing_high < 5:
+            zone = "Blisko Swing High"
+        elif swing_low < 5:
+            zone = "Blisko Swing Low"
+        else:
+            zone = "Neutral"
+
+        return {
+            "Ticker": self.ticker,
+            "Last Price": round(last, 2),
+            "30d MA": round(ma30, 2),
+            "Max (60d)": round(max60, 2),
+            "Drop from ATH (%)": round((max60 - last) / max60 * 100, 2),
+            "SMA50": round(sma50, 2),
+            "SMA100": round(win.sma[100] / 100, 2) if n >= 100 else math.nan,
+            "SMA200": round(win.sma[200] / 200, 2) if n >= 200 else math.nan,
+            "EMA20": round(win.ema(20), 2),
+            "EMA50": round(win.ema(50), 2),
+            "EMA12": round(ema12, 2),
+            "EMA26": round(ema26, 2),
+            "VWAP": round(vwap, 2),
+            "VWAP Diff (%)": round((last - vwap) / last * 100, 2),
+            "Swing High (%)": swing_high,
+            "Swing Low (%)": swing_low,
+            "RSI": round(win.rsi(), 2),
+            "Strefa": zone,
+            "EMA Crossover": "Bullish" if ema12 > ema26 else "Bearish"
+        }
+
+    def advanced_signals(self):
+        # Ten sam słownik co advanced_tech_analysis.analyze_advanced_signals
+        win = self.advanced
+        if not win.bars:
+            return {"Swing High (%)": "N/A", "Swing Low (%)": "N/A", "EMA12/26": "N/A", "VWAP Diff (%)": "N/A"}
+        price = win.bars[-1][CLOSE]
+        swing_high = win.max_high[0][1]
+        swing_low = win.min_low[0][1]
+        ema12, ema26 = win.ema_rec[12], win.ema_rec[26]
+        vwap = win.hlc_pv / win.volume if win.volume else math.nan
+        return {
+            "Swing High (%)": round((price - swing_high) / swing_high * 100, 2),
+            "Swing Low (%)": round((price - swing_low) / swing_low * 100, 2),
+            "EMA12/26": "Wzrost (EMA12 > EMA26)" if ema12 > ema26 else "Spadek (EMA12 < EMA26)",
+            "VWAP Diff (%)": round((price - vwap) / vwap * 100, 2)
+        }
+
+    def to_dict(self):
+        return {"ticker": self.ticker, "last_date": self.last_date,
+                "technical": self.technical.to_dict(), "advanced": self.advanced.to_dict()}
+
+    @classmethod
+    def from_dict(cls, data):
+        state = cls(data["ticker"])
+        state.last_date = data["last_date"]
+        state.technical = WindowState.from_dict(data["technical"])
+        state.advanced = WindowState.from_dict(data["advanced"])
+        return state
+
+
+def load_states(path=STATE_PATH):
+    if not os.path.isfile(path):
+        return {}
+    with open(path, encoding="utf-8") as f:
+        return {ticker: IndicatorState.from_dict(data) for ticker, data in json.load(f).items()}
+
+
+def save_states(states, path=STATE_PATH):
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({ticker: state.to_dict() for ticker, state in states.items()}, f)
+    os.replace(tmp_path, path)
+
+
+def refresh_states(tickers, path=STATE_PATH, recent_period="5d"):
+    # Dzienne odświeżenie: tickery ze stanem pobierają tylko ostatnie sesje,
+    # nowe (lub z dziurą dłuższą niż `recent_period`) – pełne 6 miesięcy
+    states = load_states(path)
+    known = [t for t in tickers if t in states]
+    recent = panel_cenowy.load_price_panel(known, period=recent_period) if known else None
+
+    stale = [t for t in tickers if t not in states]
+    for ticker in known:
+        hist = recent.history(ticker)
+        if hist.empty:
+            continue
+        first_new = pd.Timestamp(hist.index[0]).strftime("%Y-%m-%d")
+        if first_new > states[ticker].last_date:
+            # Brakuje sesji między stanem a pobranym wycinkiem – trzeba odbudować stan
+            stale.append(ticker)
+            continue
+        states[ticker].update_many(hist)
+
+    if stale:
+        full = panel_cenowy.load_price_panel(stale, period="6mo")
+        for ticker in stale:
+            states[ticker] = IndicatorState.from_history(ticker, full.history(ticker))
+
+    save_states(states, path)
+    return states
@@ -0,0 +1,286 @@
+# tryb_obserwacji.py
+import asyncio
+import os
+import time
+from collections import deque, namedtuple
+
+import numpy as np
+import pandas as pd
+
+import dostawca_danych
+import reguly_oceny
+import scalona_ocena
+import stan_wskaznikow
+
+ALERTS_PATH = os.path.join("..", "data", "alerty_obserwacji.csv")
+
+# Notowanie ze strumienia: Time "RRRR-MM-DD GG:MM:SS", Volume – skumulowany wolumen sesji;
+# High/Low opcjonalne (świeca), w przeciwnym razie liczone z kolejnych cen
+Quote = namedtuple("Quote", ["time", "ticker", "price", "volume", "high", "low"], defaults=[None, None])
+Alert = namedtuple("Alert", ["time", "ticker", "field", "old", "new", "score"])
+
+# Klasyfikacje, których zmiana wywołuje alert
+WATCHED = ["Ocena końcowa", "Ocena AI", "EMA Crossover"]
+
+
+class ReplaySource:
+    # Odtwarzanie notowań z pliku CSV (Time, Ticker, Price, Volume[, High, Low]) czytanego
+    # paczkami. speed=0 – najszybciej jak się da; speed=60 – minuta notowań na sekundę.
+
+    def __init__(self, path, speed=0.0, chunk_size=10_000):
+        self.path = path
+        self.speed = speed
+        self.chunk_size = chunk_size
+
+    async def updates(self):
+        first = started = None
+        for chunk in pd.read_csv(self.path, chunksize=self.chunk_size, dtype={"Ticker": str, "Time": str}):
+            high = chunk["High"] if "High" in chunk else pd.Series(None, index=chunk.index)
+            low = chunk["Low"] if "Low" in chunk else pd.Series(None, index=chunk.index)
+            if self.speed:
+                stamps = pd.to_datetime(chunk["Time"]).to_numpy()
+            for i, row in enumerate(zip(chunk["Time"], chunk["Ticker"], chunk["Price"], chunk["Volume"],
+                                        high, low)):
+                if self.speed:
+                    # Harmonogram względem początku odtwarzania – opóźnienia przetwarzania się nie sumują
+                    if first is None:
+                        first, started = stamps[i], time.monotonic()
+                    delay = started + (stamps[i] - first) / np.timedelta64(1, "s") / self.speed - time.monotonic()
+                    if delay > 0:
+                        await asyncio.sleep(delay)
+                yield Quote(*row)
+            # Oddaj pętlę zdarzeń (przeliczanie ocen) między paczkami
+            await asyncio.sleep(0)
+
+
+class PollingSource:
+    # Notowania z dostawcy danych odpytywanego co `interval` sekund (np. yfinance fast_info)
+
+    def __init__(self, tickers, interval=1.0, provider=None, concurrency=16):
+        self.tickers = list(tickers)
+        self.interval = interval
+        self.provider = provider or dostawca_danych.get_provider()
+        self.concurrency = concurrency
+
+    async def updates(self):
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def quote(ticker):
+            async with semaphore:
+                try:
+                    return await asyncio.to_thread(self.provider.quote, ticker)
+                except Exception as e:
+                    print(f"Błąd notowania {ticker}: {e}")
+                    return None
+
+        while True:
+            started = time.monotonic()
+            now = pd.Timestamp.now().strftime("%Y-%m-%d %H:%M:%S")
+            for result in await asyncio.gather(*(quote(t) for t in self.tickers)):
+                if result is not None:
+                    yield Quote(now, result["Ticker"], result["Price"], result["Volume"])
+            await asyncio.sleep(max(0.0, self.interval - (time.monotonic() - started)))
+
+
+class LiveTicker:
+    # Stan jednego tickera: wskaźniki do zamkniętej sesji i bieżąca, niezamknięta sesja
+
+    def __init__(self, ticker, state):
+        self.ticker = ticker
+        self.state = state
+        self.date = self.time = None
+        self.high = self.low = self.close = self.volume = None
+        self.labels = {}
+
+    def apply(self, quote):
+        date = quote.time[:10]
+        if self.state.last_date is not None and date <= self.state.last_date:
+            return False
+        if self.date is not None and date > self.date:
+            # Nowa sesja – poprzednia trafia do stanu wskaźników
+            self.state.update(self.date, self.high, self.low, self.close, self.volume)
+            self.date = None
+        price = float(quote.price)
+        high = float(quote.high) if quote.high is not None and quote.high == quote.high else price
+        low = float(quote.low) if quote.low is not None and quote.low == quote.low else price
+        if self.date is None:
+            self.date, self.high, self.low = date, high, low
+        else:
+            self.high, self.low = max(self.high, high), min(self.low, low)
+        self.close = price
+        self.volume = float(quote.volume)
+        self.time = quote.time
+        return True
+
+    def signals(self):
+        if self.date is None:
+            return self.state.signals()
+        return self.state.preview(self.date, self.high, self.low, self.close, self.volume)
+
+
+class WatchSession:
+    # Przyrostowe przeliczanie: każde notowanie aktualizuje tylko swój ticker (O(1)),
+    # a oceny liczone są paczkami dla tickerów zmienionych od ostatniego przeliczenia
+
+    def __init__(self, fundamentals=None, panel=None, pipeline=None, features=scalona_ocena.FEATURES,
+                 on_alert=None, max_alerts=10_000):
+        fundamentals = fundamentals if fundamentals is not None else pd.DataFrame(columns=["Ticker"])
+        self.fundamentals = fundamentals.drop(columns=["Date"], errors="ignore").drop_duplicates("Ticker") \
+            .set_index("Ticker")
+        self.panel = panel
+        self.pipeline = pipeline
+        self.features = list(features)
+        self.on_alert = on_alert
+        self.tickers = {}
+        self.dirty = set()
+        self.alerts = deque(maxlen=max_alerts)
+        self.updates = 0
+        self.skipped = 0
+
+    def _ticker(self, ticker, date):
+        live = self.tickers.get(ticker)
+        if live is None:
+            # Stan z historii dziennej sprzed pierwszej obserwowanej sesji
+            hist = self.panel.history(ticker) if self.panel is not None else pd.DataFrame()
+            if len(hist):
+                hist = hist[hist.index < pd.Timestamp(date)]
+            state = stan_wskaznikow.IndicatorState.from_history(ticker, hist) if len(hist) \
+                else stan_wskaznikow.IndicatorState(ticker)
+            live = self.tickers[ticker] = LiveTicker(ticker, state)
+        return live
+
+    def apply(self, quote):
+        if self._ticker(quote.ticker, quote.time[:10]).apply(quote):
+            self.dirty.add(quote.ticker)
+            self.updates += 1
+        else:
+            self.skipped += 1
+
+    def rescore(self):
+        if not self.dirty:
+            return []
+        tickers, self.dirty = list(self.dirty), set()
+        df = pd.DataFrame([self.tickers[t].signals() for t in tickers])
+        df = df.join(self.fundamentals, on="Ticker")
+        df = score_live(df, self.pipeline, self.features)
+
+        alerts = []
+        records = df[["Ticker", "Score"] + [c for c in WATCHED if c in df]].to_dict("records")
+        for record in records:
+            live = self.tickers[record["Ticker"]]
+            for field in WATCHED:
+                new = record.get(field)
+                old = live.labels.get(field)
+                if old is not None and new != old:
+                    alerts.append(Alert(live.time, live.ticker, field, old, new, record["Score"]))
+                live.labels[field] = new
+        for alert in alerts:
+            self.alerts.append(alert)
+            if self.on_alert is not None:
+                self.on_alert(alert)
+        return alerts
+
+    def frame(self):
+        # Bieżące sygnały i oceny wszystkich obserwowanych tickerów
+        df = pd.DataFrame([self.tickers[t].signals() for t in self.tickers])
+        return score_live(df.join(self.fundamentals, on="Ticker"), self.pipeline, self.features)
+
+
+def score_live(df, pipeline=None, features=scalona_ocena.FEATURES):
+    # Score i klasyfikacje z tabeli reguł; Ocena AI z modelu z rejestru, jeśli jest dostępny
+    df = scalona_ocena.score(df)
+    if pipeline is not None and len(df):
+        for column in features:
+            if column not in df:
+                df[column] = np.nan
+        df["ML_Points"] = pipeline.predict_proba(df[features])[:, 1] * 100
+    else:
+        df["ML_Points"] = np.nan
+    df["Ocena AI"] = reguly_oceny.classify_ai(df)
+    return df
+
+
+def print_alert(alert):
+    print(f"🔔 {alert.time} {alert.ticker} {alert.field}: {alert.old} → {alert.new} (Score {alert.score})")
+
+
+def save_alerts(alerts, path=ALERTS_PATH):
+    if not alerts:
+        return
+    df = pd.DataFrame(list(alerts), columns=Alert._fields)
+    df.to_csv(path, mode="a", header=not os.path.isfile(path), index=False, encoding="utf-8-sig")
+    print(f"Zapisano {len(df)} alertów do: {path}")
+
+
+async def watch(source, session, interval=0.5, queue_size=10_000, duration=None):
+    # Źródło -> ograniczona kolejka -> aktualizacja stanu; osobne zadanie przelicza oceny co `interval`
+    queue = asyncio.Queue(maxsize=queue_size)
+    done = asyncio.Event()
+
+    async def produce():
+        try:
+            async for quote in source.updates():
+                await queue.put(quote)
+        finally:
+            await queue.put(None)
+
+    async def consume():
+        while True:
+            quote = await queue.get()
+            if quote is None:
+                break
+            session.apply(quote)
+            # Dobierz wszystko, co już czeka – bez przełączania zadań dla każdego notowania
+            while not queue.empty():
+                quote = queue.get_nowait()
+                if quote is None:
+                    done.set()
+                    return
+                session.apply(quote)
+        done.set()
+
+    async def rescore():
+        while not done.is_set():
+            try:
+                await asyncio.wait_for(done.wait(), interval)
+            except asyncio.TimeoutError:
+                pass
+            session.rescore()
+
+    producer = asyncio.create_task(produce())
+    tasks = [asyncio.create_task(consume()), asyncio.create_task(rescore())]
+    try:
+        if duration is None:
+            await asyncio.gather(*tasks)
+        else:
+            await asyncio.wait_for(asyncio.gather(*tasks), duration)
+    except asyncio.TimeoutError:
+        pass
+    finally:
+        producer.cancel()
+        for task in tasks:
+            task.cancel()
+        results = await asyncio.gather(producer, *tasks, return_exceptions=True)
+    # Błąd źródła (brak pliku, brak kolumny, błąd dostawcy) przerywa obserwację, a nie kończy ją jak pusty strumień
+    if isinstance(results[0], Exception):
+        raise results[0]
+    session.rescore()
+    return session
+
+
+def make_replay(path, tickers, panel, sessions=1, steps=390, seed=0):
+    # Syntetyczny plik notowań: błądzenie losowe od ostatniego zamknięcia, `steps` notowań na sesję
+    rng = np.random.default_rng(seed)
+    last = panel.field("Close").ffill().iloc[-1].reindex(tickers).fillna(100.0).to_numpy()
+    days = pd.bdate_range(panel.dates[-1] + pd.Timedelta(days=1), periods=sessions)
+    frames = []
+    for day in days:
+        times = (day + pd.Timedelta(hours=9) + pd.to_timedelta(np.arange(steps), unit="s") *
+                 (8 * 3600 // steps)).strftime("%Y-%m-%d %H:%M:%S")
+        paths = last * np.exp(np.cumsum(rng.normal(0, 0.002, (steps, len(tickers))), axis=0))
+        volume = np.cumsum(rng.integers(100, 5_000, (steps, len(tickers))), axis=0)
+        frames.append(pd.DataFrame({"Time": np.repeat(times, len(tickers)), "Ticker": np.tile(tickers, steps),
+                                    "Price": paths.ravel().round(4), "Volume": volume.ravel()}))
+        last = paths[-1]
+    pd.concat(frames, ignore_index=True).to_csv(path, index=False)
+    return path
@@ -0,0 +1,151 @@
+# uniwersa.py
+import os
+from datetime import datetime
+
+import pandas as pd
+
+import analiza_fundamentalna
+import analiza_techniczna
+import magazyn_cech
+import magazyn_migawek
+import schemat_danych
+import scalona_ocena
+import walidacja_danych
+from orkiestrator import read_tickers
+
+DATA_DIR = os.path.join("..", "data")
+UNIVERSE_DIR = "diff_Tickers"
+DEFAULT_UNIVERSE = "wszystkie"
+LABEL_SCHEMA = {"Date": "date", "Ticker": "str", "Target (6m +10%)": "float"}
+
+
+def available_universes(data_dir=DATA_DIR):
+    # "wszystkie" to data/tickers.txt, pozostałe to diff_Tickers/tickers_<nazwa>.txt
+    universes = {}
+    if os.path.isfile(os.path.join(data_dir, "tickers.txt")):
+        universes[DEFAULT_UNIVERSE] = os.path.join(data_dir, "tickers.txt")
+    universe_dir = os.path.join(data_dir, UNIVERSE_DIR)
+    if os.path.isdir(universe_dir):
+        for name in sorted(os.listdir(universe_dir)):
+            if name.startswith("tickers_") and name.endswith(".txt"):
+                universes[name[len("tickers_"):-len(".txt")]] = os.path.join(universe_dir, name)
+    return universes
+
+
+def load_universes(specs, data_dir=DATA_DIR):
+    # Nazwa znanego uniwersum albo ścieżka do pliku z tickerami (np. własna lista obserwowanych)
+    known = available_universes(data_dir)
+    universes = {}
+    for spec in specs or [DEFAULT_UNIVERSE]:
+        if spec in known:
+            universes[spec] = read_tickers(known[spec])
+        elif os.path.isfile(spec):
+            name = os.path.splitext(os.path.basename(spec))[0]
+            universes[name[len("tickers_"):] if name.startswith("tickers_") else name] = read_tickers(spec)
+        else:
+            raise ValueError(f"Nieznane uniwersum: {spec} (dostępne: {', '.join(known) or 'brak'})")
+    return universes
+
+
+def union(universes):
+    # Każdy ticker raz, w kolejności pierwszego wystąpienia
+    return list(dict.fromkeys(t for tickers in universes.values() for t in tickers))
+
+
+def label_store(root):
+    return magazyn_migawek.SnapshotStore("etykiety", LABEL_SCHEMA, root)
+
+
+def _missing(store, tickers, day):
+    done = set(store.read(day)["Ticker"])
+    return [t for t in tickers if t not in done]
+
+
+def shared_results(tickers, data_dir=DATA_DIR):
+    # Analizy dla sumy uniwersów. Migawki dnia są wspólną pamięcią: ticker policzony
+    # dziś w dowolnym uniwersum nie jest pobierany ani liczony ponownie
+    import etykiety_wektorowe
+    import panel_cenowy
+
+    root = os.path.join(data_dir, "migawki")
+    fund_store = magazyn_migawek.fundamental_store(root)
+    tech_store = magazyn_migawek.technical_store(root)
+    labels = label_store(root)
+    day = pd.Timestamp.today().normalize()
+
+    missing = _missing(fund_store, tickers, day)
+    print(f"Analiza fundamentalna: {len(missing)} nowych z {len(tickers)} tickerów")
+    if missing:
+        analiza_fundamentalna.analyze_multiple_companies(
+            missing, os.path.join(data_dir, "analiza_fundamentalna.csv"), store=fund_store)
+
+    missing = _missing(tech_store, tickers, day)
+    print(f"Analiza techniczna: {len(missing)} nowych z {len(tickers)} tickerów")
+    if missing:
+        technical_path = os.path.join(data_dir, "analiza_techniczna.csv")
+        analiza_techniczna.analyze_many(missing, technical_path, store=tech_store)
+        # analyze_many zapisuje tylko nowe tickery – plik zbiorczy odtwarzamy z migawek dnia
+        df_tech = tech_store.read(day).drop(columns="Date")
+        df_tech.to_csv(technical_path, index=False, encoding="utf-8-sig")
+        schemat_danych.write_columnar(df_tech, technical_path)
+
+    missing = _missing(labels, tickers, day)
+    print(f"Etykiety: {len(missing)} nowych z {len(tickers)} tickerów")
+    if missing:
+        panel = panel_cenowy.load_price_panel(missing)
+        target = etykiety_wektorowe.trailing_labels(panel, missing)
+        labels.upsert(pd.DataFrame({"Date": day, "Ticker": missing, "Target (6m +10%)": target.to_numpy()}))
+
+    def today(store):
+        df = store.read(day)
+        return df[df["Ticker"].isin(tickers)]
+
+    return today(fund_store), today(tech_store).drop(columns="Date"), today(labels).drop(columns="Date")
+
+
+def score_shared(df_fund, df_tech, df_labels, data_dir=DATA_DIR, inference_only=False):
+    # Punktacja, walidacja i model raz dla wszystkich tickerów – wyniki są per ticker,
+    # więc podzbiór dla uniwersum jest identyczny z osobnym przebiegiem
+    df = scalona_ocena.score(scalona_ocena.merge_inputs(df_fund, df_tech))
+    df = scalona_ocena.add_labels(df, df_labels)
+    df = walidacja_danych.validate_data(df, alerts_path=os.path.join(data_dir, "alerty_walidacja.csv"),
+                                       history=walidacja_danych.snapshot_history(os.path.join(data_dir, "migawki")))
+    feature_store = magazyn_cech.FeatureStore(os.path.join(data_dir, "cechy"))
+    feature_store.write(scalona_ocena.snapshot_date(df), df)
+    df, _ = scalona_ocena.train_model(df, scalona_ocena.FEATURES, inference_only=inference_only,
+                                      model_dir=os.path.join(data_dir, "modele"),
+                                      importance_path=os.path.join(data_dir, "feature_importance.csv"),
+                                      feature_store=feature_store)
+    return df
+
+
+def fan_out(df, universes, output_dir, stamp=None, excel=True):
+    import eksport_excel
+
+    stamp = stamp or datetime.today().strftime("%Y%m%d")
+    os.makedirs(output_dir, exist_ok=True)
+    paths = {}
+    for name, tickers in universes.items():
+        part = df[df["Ticker"].isin(tickers)].sort_values(by="Score", ascending=False)
+        path = os.path.join(output_dir, f"scalona_ocena_{stamp}_{name}.csv")
+        part.to_csv(path, index=False, encoding="utf-8-sig")
+        schemat_danych.write_columnar(part, path)
+        if excel:
+            eksport_excel.write_report(part, os.path.splitext(path)[0] + ".xlsx")
+        print(f"📁 {name}: {len(part)} spółek -> {path}")
+        paths[name] = path
+    return paths
+
+
+def run_universes(specs, data_dir=DATA_DIR, output_dir=None, inference_only=False, excel=True):
+    universes = load_universes(specs, data_dir)
+    tickers = union(universes)
+    total = sum(len(t) for t in universes.values())
+    print(f"Uniwersa: {', '.join(universes)} – {len(tickers)} unikalnych tickerów (łącznie {total})")
+
+    df = score_shared(*shared_results(tickers, data_dir), data_dir=data_dir, inference_only=inference_only)
+    return fan_out(df, universes, output_dir or os.path.join(data_dir, UNIVERSE_DIR), excel=excel)
+
+
+if __name__ == "__main__":
+    run_universes([DEFAULT_UNIVERSE, "wig20"])
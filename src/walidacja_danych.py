@@ -1,45 +1,168 @@
 # walidacja_danych.py
+import os
+from datetime import datetime
+
+import numpy as np
 import pandas as pd
+import instrumentacja
+import schemat_danych
+
+ALERTS_PATH = os.path.join("..", "data", "alerty_walidacja.csv")
+
+STATUSES = ["OK", "Do sprawdzenia", "Błędne dane"]
+KEY_FIELDS = ["Price", "P/E", "ROE (%)", "Debt/Assets"]
+MAX_MISSING = 5
+
+# (pole, problem, warunek) – wartości skrajne sprawdzane tylko dla wierszy ze statusem OK;
+# NaN nie spełnia żadnego warunku
+RANGE_RULES = [
+    ("P/E", "Podejrzane P/E", lambda x: (x < 0) | (x > 100)),
+    ("Debt/Assets", "Bardzo wysokie Debt/Assets", lambda x: x > 1.5),
+    ("ROE (%)", "Podejrzane ROE (%)", lambda x: (x < -100) | (x > 100)),
+]
+
+# Skoki między migawkami: pole -> minimalna względna zmiana względem średniej z poprzednich migawek
+JUMP_FIELDS = {"P/E": 1.0, "Debt/Assets": 0.5, "ROE (%)": 1.0, "Price": 0.3}
+JUMP_WINDOW = 10
+JUMP_MIN_PERIODS = 3
+JUMP_Z = 4.0
+HISTORY_DAYS = 120
+
+ALERT_COLUMNS = {
+    "Ticker": "string",
+    "Problem": "string",
+    "Rule": "category",
+    "Field": "category",
+    "Value": "float64",
+    "Expected": "float64",
+    "Z": "float64",
+    "Date": "datetime64[ns]",
+}
+
+
+def empty_alerts():
+    return alerts_frame([])
+
+
+def alerts_frame(parts):
+    # Ramka alertów o stałych typach kolumn, niezależnie od liczby alertów
+    parts = [p for p in parts if len(p)]
+    df = pd.concat(parts, ignore_index=True) if parts else pd.DataFrame(columns=list(ALERT_COLUMNS))
+    for column in ALERT_COLUMNS:
+        if column not in df:
+            df[column] = np.nan
+    return df[list(ALERT_COLUMNS)].astype(ALERT_COLUMNS)
+
+
+def _numeric(df, columns):
+    # Kolumny liczbowe jako float64; "N/A" i inne teksty stają się NaN
+    return pd.DataFrame({c: pd.to_numeric(df[c], errors="coerce") if c in df else np.nan for c in columns},
+                        index=df.index, dtype="float64")
+
+
+def _alerts(df, mask, problem, rule, field=None, values=None):
+    if not mask.any():
+        return pd.DataFrame()
+    out = pd.DataFrame({"Ticker": df.loc[mask, "Ticker"].to_numpy(), "Problem": problem, "Rule": rule,
+                        "Field": field})
+    if values is not None:
+        out["Value"] = values[mask].to_numpy()
+    if "Date" in df:
+        out["Date"] = pd.to_datetime(df.loc[mask, "Date"], errors="coerce").to_numpy()
+    return out
+
+
+def check_rules(df):
+    # Wszystkie reguły jako maski kolumn: (status wiersza, ramka alertów)
+    numeric_columns = [c for c, kind in schemat_danych.MERGED_SCHEMA.items() if kind == "float" and c in df]
+    values = _numeric(df, numeric_columns + [f for f in KEY_FIELDS if f not in numeric_columns])
+    missing_count = values[numeric_columns].isna().sum(axis=1)
+
+    status = np.where(missing_count > MAX_MISSING, "Do sprawdzenia", "OK").astype(object)
+    parts = []
+
+    # Brak kluczowego pola – alert tylko dla pierwszego brakującego. Pola spoza ramki (np. ramka
+    # samej analizy technicznej albo trybu obserwacji) nie są sprawdzane, jak w walidacji wierszowej
+    key_fields = [f for f in KEY_FIELDS if f in df]
+    if key_fields:
+        key_missing = values[key_fields].isna()
+        first_missing = key_missing.idxmax(axis=1)
+        any_missing = key_missing.any(axis=1)
+        status[any_missing.to_numpy()] = "Błędne dane"
+        for field in key_fields:
+            parts.append(_alerts(df, any_missing & (first_missing == field), f"Brak danych: {field}",
+                                 "Brak danych", field))
+
+    ok = pd.Series(status == "OK", index=df.index)
+    flagged = pd.Series(False, index=df.index)
+    for field, problem, condition in RANGE_RULES:
+        mask = ok & condition(values[field])
+        flagged |= mask
+        parts.append(_alerts(df, mask, problem, "Wartość skrajna", field, values[field]))
+    status[flagged.to_numpy()] = "Do sprawdzenia"
+
+    return pd.Series(pd.Categorical(status, categories=STATUSES), index=df.index), alerts_frame(parts)
+
+
+def detect_jumps(history, fields=JUMP_FIELDS, window=JUMP_WINDOW, min_periods=JUMP_MIN_PERIODS, z=JUMP_Z):
+    # Jeden przebieg po historii migawek całego uniwersum (Date, Ticker, pola): wartość porównujemy
+    # ze średnią i odchyleniem z `window` poprzednich migawek tego samego tickera
+    fields = {f: m for f, m in fields.items() if f in history}
+    if history.empty or not fields:
+        return empty_alerts()
+    df = history.sort_values(["Ticker", "Date"], ignore_index=True)
+    values = _numeric(df, list(fields))
+    tickers = df["Ticker"].astype(str)
+    previous = values.groupby(tickers).shift(1)
+    rolling = previous.groupby(tickers).rolling(window, min_periods=min_periods)
+    mean = rolling.mean().reset_index(level=0, drop=True).sort_index()
+    std = rolling.std().reset_index(level=0, drop=True).sort_index()
+
+    deviation = (values - mean).abs()
+    with np.errstate(divide="ignore", invalid="ignore"):
+        score = deviation / std
+        relative = deviation / mean.abs()
+    parts = []
+    for field, min_change in fields.items():
+        mask = (score[field] > z) & (relative[field] > min_change)
+        part = _alerts(df, mask, f"Nietypowa zmiana: {field}", "Skok wartości", field, values[field])
+        if len(part):
+            part["Expected"] = mean.loc[mask, field].to_numpy()
+            part["Z"] = score.loc[mask, field].replace(np.inf, np.nan).to_numpy()
+        parts.append(part)
+    return alerts_frame(parts)
+
+
+def snapshot_history(root=None, days=HISTORY_DAYS):
+    # Ostatnie migawki fundamentalne do wykrywania skoków; bez pyarrow lub historii – None
+    import magazyn_migawek
+
+    store = magazyn_migawek.fundamental_store(root or magazyn_migawek.STORE_ROOT)
+    start = pd.Timestamp(datetime.today()) - pd.Timedelta(days=days)
+    try:
+        history = store.load_all(start=start, columns=["Ticker"] + list(JUMP_FIELDS))
+    except ImportError:
+        return None
+    return history if len(history) else None
+
+
+@instrumentacja.traced("validate_data", "step")
+def validate_data(df, alerts_path=ALERTS_PATH, history=None):
+    status, alerts = check_rules(df)
+
+    if history is not None:
+        # Skoki tylko z ostatniej migawki każdego tickera z bieżącej ramki
+        jumps = detect_jumps(history)
+        latest = history.groupby("Ticker", observed=True)["Date"].max()
+        jumps = jumps[jumps["Date"].to_numpy() == jumps["Ticker"].map(latest).to_numpy()]
+        jumps = jumps[jumps["Ticker"].isin(df["Ticker"])]
+        status[(status == "OK") & df["Ticker"].isin(jumps["Ticker"])] = "Do sprawdzenia"
+        alerts = alerts_frame([alerts, jumps])
+
+    df["Status"] = status
 
-def validate_data(df):
-    alerts = []
-
-    def check_row(row):
-        na_count = sum([1 for value in row.values if value == "N/A"])
-
-        if na_count > 5:
-            status = "Do sprawdzenia"
-        else:
-            status = "OK"
-
-        # Błędne dane jeśli kluczowe pola są N/A
-        for field in ["Price", "P/E", "ROE (%)", "Debt/Assets"]:
-            if field in row and row[field] == "N/A":
-                status = "Błędne dane"
-                alerts.append({"Ticker": row["Ticker"], "Problem": f"Brak danych: {field}"})
-                break
-
-        # Skrajne wartości
-        try:
-            if status == "OK":
-                if float(row["P/E"]) < 0 or float(row["P/E"]) > 100:
-                    status = "Do sprawdzenia"
-                    alerts.append({"Ticker": row["Ticker"], "Problem": "Podejrzane P/E"})
-                if float(row["Debt/Assets"]) > 1.5:
-                    status = "Do sprawdzenia"
-                    alerts.append({"Ticker": row["Ticker"], "Problem": "Bardzo wysokie Debt/Assets"})
-                if float(row["ROE (%)"]) < -100 or float(row["ROE (%)"]) > 100:
-                    status = "Do sprawdzenia"
-                    alerts.append({"Ticker": row["Ticker"], "Problem": "Podejrzane ROE (%)"})
-        except:
-            pass
-
-        return status
-
-    df["Status"] = df.apply(check_row, axis=1)
-
-    if alerts:
-        pd.DataFrame(alerts).to_csv(r"C:\Portfel2025\alerty_walidacja.csv", index=False, encoding="utf-8-sig")
-        print("Zapisano plik alerty_walidacja.csv")
+    if len(alerts):
+        alerts.to_csv(alerts_path, index=False, encoding="utf-8-sig")
+        print(f"Zapisano plik {os.path.basename(alerts_path)} ({len(alerts)} alertów)")
 
     return df
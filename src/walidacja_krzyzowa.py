@@ -0,0 +1,184 @@
+# walidacja_krzyzowa.py
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from itertools import product
+
+import numpy as np
+import pandas as pd
+
+import etykiety_wektorowe
+import instrumentacja
+import magazyn_cech
+
+CV_DIR = os.path.join("..", "data", "walidacja")
+
+# Siatka hiperparametrów lasu losowego – każda kombinacja to jedna konfiguracja
+PARAM_GRID = {
+    "n_estimators": [100, 300],
+    "max_depth": [None, 6, 12],
+    "min_samples_leaf": [1, 5, 20],
+}
+
+TOP_SHARE = 0.2
+
+# Macierze otwarte w procesie roboczym (tylko odczyt, wspólne strony pamięci z innymi procesami)
+_arrays = {}
+
+
+def parameter_grid(grid=PARAM_GRID):
+    keys = sorted(grid)
+    return [dict(zip(keys, values)) for values in product(*(grid[k] for k in keys))]
+
+
+def encode(df, features=etykiety_wektorowe.FEATURES):
+    # Cechy jako float32: liczby bez zmian (NaN zostaje), kategorie jako kolumny 0/1
+    return magazyn_cech.encode(df, features).matrix()
+
+
+def write_dataset(df, target, cv_dir=CV_DIR, features=etykiety_wektorowe.FEATURES, return_column=None):
+    # Jedna macierz cech na dysku (.npy, float32) + wektory etykiet, dat i końca horyzontu etykiety.
+    # Procesy robocze mapują ją w pamięć zamiast dostawać ramkę przez pickle.
+    df = df[df[target].isin([0, 1])].sort_values("Date", kind="stable").reset_index(drop=True)
+    os.makedirs(cv_dir, exist_ok=True)
+    X, names = encode(df, features)
+    matrix = np.lib.format.open_memmap(os.path.join(cv_dir, "X.npy"), mode="w+", dtype=np.float32, shape=X.shape)
+    matrix[:] = X
+    matrix.flush()
+    del matrix
+    # Brak końca horyzontu (etykieta jeszcze nieznana) – nigdy nie trafia do zbioru uczącego
+    label_end = pd.to_datetime(df["Label End"]).fillna(pd.Timestamp.max) if "Label End" in df \
+        else pd.to_datetime(df["Date"])
+    arrays = {
+        "y": df[target].to_numpy(dtype=np.int8),
+        "date": pd.to_datetime(df["Date"]).to_numpy(dtype="datetime64[D]").astype(np.int64),
+        "label_end": label_end.to_numpy(dtype="datetime64[D]").astype(np.int64),
+        "ret": (pd.to_numeric(df[return_column], errors="coerce").to_numpy(dtype=np.float32)
+                if return_column in df else np.full(len(df), np.nan, np.float32)),
+    }
+    for name, values in arrays.items():
+        np.save(os.path.join(cv_dir, f"{name}.npy"), values)
+    with open(os.path.join(cv_dir, "cechy.json"), "w", encoding="utf-8") as f:
+        json.dump({"columns": names, "target": target, "rows": len(df)}, f, ensure_ascii=False, indent=2)
+    return len(df), names
+
+
+def walk_forward_folds(dates, n_splits=5, min_train_dates=3):
+    # Daty (dni od epoki) dzielone na kolejne bloki testowe; uczenie zawsze na wcześniejszych datach
+    unique = np.unique(dates)
+    if len(unique) <= min_train_dates:
+        return []
+    blocks = np.array_split(unique[min_train_dates:], min(n_splits, len(unique) - min_train_dates))
+    return [(int(block[0]), int(block[-1])) for block in blocks if len(block)]
+
+
+def _open(cv_dir):
+    if cv_dir not in _arrays:
+        _arrays[cv_dir] = {name: np.load(os.path.join(cv_dir, f"{name}.npy"), mmap_mode="r")
+                           for name in ("X", "y", "date", "label_end", "ret")}
+    return _arrays[cv_dir]
+
+
+def _run_fold(task):
+    # Proces roboczy: maski wierszy z mapowanych wektorów dat, uczenie tylko na etykietach
+    # znanych przed początkiem bloku testowego (bez wglądu w przyszłość)
+    from sklearn.ensemble import RandomForestClassifier
+    from sklearn.impute import SimpleImputer
+    from sklearn.metrics import accuracy_score, brier_score_loss, log_loss, roc_auc_score
+    from sklearn.pipeline import make_pipeline
+
+    cv_dir, config, params, fold, (test_start, test_end) = task
+    data = _open(cv_dir)
+    train = np.flatnonzero(data["label_end"] <= test_start)
+    test = np.flatnonzero((data["date"] >= test_start) & (data["date"] <= test_end))
+    result = {"config": config, "fold": fold, "test_start": str(np.datetime64(test_start, "D")),
+              "test_end": str(np.datetime64(test_end, "D")), "train_rows": len(train), "test_rows": len(test)}
+    y_train, y_test = data["y"][train], data["y"][test]
+    if len(test) == 0 or len(np.unique(y_train)) < 2:
+        return result
+
+    X = data["X"]
+    # Kolumny bez żadnej wartości w zbiorze uczącym zostają zerami (imputer by je odrzucił)
+    X_train, X_test = np.array(X[train]), np.array(X[test])
+    empty = np.isnan(X_train).all(axis=0)
+    X_train[:, empty] = 0
+    X_test[:, empty] = 0
+    model = make_pipeline(SimpleImputer(strategy="mean"),
+                          RandomForestClassifier(n_jobs=1, random_state=42, **params))
+    model.fit(X_train, y_train)
+    proba = model.predict_proba(X_test)[:, 1]
+
+    result.update({
+        "accuracy": accuracy_score(y_test, proba >= 0.5),
+        "brier": brier_score_loss(y_test, proba),
+        "log_loss": log_loss(y_test, proba, labels=[0, 1]),
+        "auc": roc_auc_score(y_test, proba) if len(np.unique(y_test)) == 2 else np.nan,
+        "base_rate": float(y_test.mean()),
+    })
+    # Najwyżej oceniane TOP_SHARE spółek w każdej dacie testowej: trafność i średni zwrot
+    dates, returns = data["date"][test], data["ret"][test]
+    top = np.zeros(len(test), dtype=bool)
+    for day in np.unique(dates):
+        rows = np.flatnonzero(dates == day)
+        k = max(1, int(np.ceil(len(rows) * TOP_SHARE)))
+        top[rows[np.argsort(-proba[rows], kind="stable")[:k]]] = True
+    result["top_hit_rate"] = float(y_test[top].mean())
+    result["top_return"] = float(np.nanmean(returns[top])) if np.isfinite(returns[top]).any() else np.nan
+    return result
+
+
+@instrumentacja.traced("cross_validate", "step")
+def cross_validate(cv_dir=CV_DIR, grid=PARAM_GRID, n_splits=5, workers=None, min_train_dates=3):
+    # Wszystkie (konfiguracja × fold) w puli procesów; wynik: metryki poza próbą dla każdego foldu
+    dates = np.load(os.path.join(cv_dir, "date.npy"))
+    folds = walk_forward_folds(dates, n_splits, min_train_dates)
+    if not folds:
+        raise ValueError("Za mało dat do walidacji kroczącej")
+    configs = parameter_grid(grid)
+    tasks = [(cv_dir, i, params, k, fold) for i, params in enumerate(configs) for k, fold in enumerate(folds)]
+    print(f"Walidacja: {len(configs)} konfiguracji × {len(folds)} foldów = {len(tasks)} zadań")
+
+    workers = workers or os.cpu_count()
+    if workers == 1:
+        results = [_run_fold(task) for task in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(_run_fold, tasks, chunksize=max(1, len(tasks) // (workers * 4))))
+    folds_df = pd.DataFrame(results)
+    folds_df.insert(1, "params", folds_df["config"].map(lambda i: json.dumps(configs[i])))
+    return folds_df
+
+
+def summarize(folds_df):
+    # Średnia i odchylenie metryk po foldach; najlepsza konfiguracja (AUC) na górze
+    metrics = [c for c in ["auc", "log_loss", "brier", "accuracy", "top_hit_rate", "top_return", "base_rate"]
+               if c in folds_df]
+    summary = folds_df.groupby(["config", "params"])[metrics].agg(["mean", "std"])
+    summary.columns = [f"{metric} {stat}" for metric, stat in summary.columns]
+    summary["folds"] = folds_df.groupby(["config", "params"])["auc"].count() if "auc" in folds_df else 0
+    sort = "auc mean" if "auc mean" in summary else summary.columns[0]
+    return summary.sort_values(sort, ascending=False).reset_index().round(4)
+
+
+def build_dataset(panel, store=None, horizon="6m", threshold=10, dates=None):
+    # Cechy z dnia oceny (bez wglądu w przyszłość) i etykiety dla każdej daty rebalansowania
+    return etykiety_wektorowe.backtest(panel, dates=dates, store=store, horizon=horizon,
+                                       threshold=threshold, train=False)
+
+
+def run(panel, store=None, horizon="6m", threshold=10, cv_dir=CV_DIR, grid=PARAM_GRID, n_splits=5, workers=None):
+    df = build_dataset(panel, store, horizon, threshold)
+    target = etykiety_wektorowe.target_column(horizon, threshold)
+    if df.empty or target not in df:
+        raise ValueError("Brak dat oceny z etykietami – za krótka historia notowań dla tego horyzontu")
+    rows, names = write_dataset(df, target, cv_dir, return_column=etykiety_wektorowe.return_column(horizon))
+    print(f"Macierz cech: {rows} wierszy × {len(names)} kolumn (float32, {cv_dir})")
+
+    folds_df = cross_validate(cv_dir, grid, n_splits, workers)
+    summary = summarize(folds_df)
+    folds_df.to_csv(os.path.join(cv_dir, "foldy.csv"), index=False, encoding="utf-8-sig")
+    summary.to_csv(os.path.join(cv_dir, "konfiguracje.csv"), index=False, encoding="utf-8-sig")
+    if len(summary) and summary["params"].iloc[0]:
+        with open(os.path.join(cv_dir, "najlepsze_parametry.json"), "w", encoding="utf-8") as f:
+            json.dump(json.loads(summary["params"].iloc[0]), f, indent=2)
+    return summary
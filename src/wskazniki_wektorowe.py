@@ -0,0 +1,166 @@
+# wskazniki_wektorowe.py
+import numpy as np
+import pandas as pd
+import instrumentacja
+
+# Wagi EMA starsze niż ten próg (względem najnowszej) nie zmieniają wyniku w float64
+EMA_EPS = 1e-17
+
+
+def align_right(values, mask):
+    # Przesuwa poprawne wartości każdej kolumny na koniec tablicy, tak aby
+    # historie o różnej długości kończyły się w tym samym wierszu (NaN na początku)
+    rows = mask.shape[0]
+    counts = mask.sum(axis=0)
+    last_idx = rows - 1 - np.argmax(mask[::-1], axis=0)
+    first_idx = np.argmax(mask, axis=0)
+    if ((last_idx - first_idx + 1 == counts) | (counts == 0)).all():
+        # Bez luk w środku wystarczy przesunąć każdą kolumnę o stałą liczbę wierszy
+        source = np.arange(rows)[:, None] - (rows - 1 - last_idx)[None, :]
+        aligned = np.take_along_axis(values, np.clip(source, 0, rows - 1), axis=0).astype(float)
+        aligned[source < first_idx[None, :]] = np.nan
+        aligned[:, counts == 0] = np.nan
+        return aligned
+    order = np.argsort(mask, axis=0, kind="stable")
+    aligned = np.take_along_axis(values, order, axis=0).astype(float)
+    aligned[~np.take_along_axis(mask, order, axis=0)] = np.nan
+    return aligned
+
+
+def rolling_last(aligned, counts, window):
+    # Średnia z ostatnich `window` sesji – NaN, gdy historia jest krótsza (jak rolling().mean())
+    if aligned.shape[0] < window:
+        return np.full(aligned.shape[1], np.nan)
+    out = aligned[-window:].mean(axis=0)
+    out[counts < window] = np.nan
+    return out
+
+
+def ema_last(aligned, span):
+    # Ostatnia wartość ewm(span, adjust=True): średnia ważona (1 - alpha)^k od końca
+    alpha = 2.0 / (span + 1)
+    depth = min(aligned.shape[0], int(np.ceil(np.log(EMA_EPS) / np.log(1 - alpha))))
+    tail = aligned[-depth:]
+    weights = (1 - alpha) ** np.arange(depth - 1, -1, -1, dtype=float)[:, None]
+    valid = ~np.isnan(tail)
+    return (np.where(valid, tail, 0.0) * weights).sum(axis=0) / (valid * weights).sum(axis=0)
+
+
+def rsi_last(aligned, counts, window=14):
+    # RSI liczone jak w analiza_techniczna: prosta średnia zysków/strat z `window` sesji
+    if aligned.shape[0] < window:
+        return np.full(aligned.shape[1], np.nan)
+    tail = aligned[-window - 1:] if aligned.shape[0] > window else np.vstack(
+        [np.full((1, aligned.shape[1]), np.nan), aligned])
+    delta = np.diff(tail, axis=0)
+    gain = np.where(delta > 0, delta, 0.0).mean(axis=0)
+    loss = np.where(delta < 0, -delta, 0.0).mean(axis=0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rsi = 100 - 100 / (1 + gain / loss)
+    rsi[counts < window] = np.nan
+    return rsi
+
+
+def indicators_last(close, volume, counts):
+    # Wszystkie wskaźniki z fetch_technical_signals dla wszystkich tickerów naraz.
+    # `close` i `volume` to tablice sesja × ticker wyrównane przez align_right.
+    last = close[-1]
+    with np.errstate(divide="ignore", invalid="ignore", all="ignore"):
+        max60 = np.nanmax(close[-60:], axis=0)
+        min60 = np.nanmin(close[-60:], axis=0)
+        vwap = np.nansum(volume * close, axis=0) / np.nansum(volume, axis=0)
+        vwap[np.isnan(volume[-1])] = np.nan
+        return {
+            "last": last,
+            "ma30": rolling_last(close, counts, 30),
+            "max60": max60,
+            "min60": min60,
+            "sma50": rolling_last(close, counts, 50),
+            "sma100": rolling_last(close, counts, 100),
+            "sma200": rolling_last(close, counts, 200),
+            "ema20": ema_last(close, 20),
+            "ema50": ema_last(close, 50),
+            "ema12": ema_last(close, 12),
+            "ema26": ema_last(close, 26),
+            "vwap": vwap,
+            "drop_high": (max60 - last) / max60 * 100,
+            "swing_high": (max60 - last) / last * 100,
+            "swing_low": (last - min60) / last * 100,
+            "vwap_diff": (last - vwap) / last * 100,
+            "rsi": rsi_last(close, counts),
+        }
+
+
+def _where_available(values, available):
+    return np.where(available, np.round(values, 2), np.nan)
+
+
+def period_mask(close_df, period):
+    # Sesje w oknie `period` liczonym od ostatniej sesji każdego tickera (jak Ticker.history)
+    import dostawca_danych
+
+    mask = ~np.isnan(close_df.to_numpy(dtype=float))
+    offset = dostawca_danych.period_to_offset(period)
+    if offset is not None and len(close_df.index):
+        dates = close_df.index.to_numpy()
+        last_idx = np.where(mask.any(axis=0), mask.shape[0] - 1 - np.argmax(mask[::-1], axis=0), 0)
+        cutoff = (pd.DatetimeIndex(dates[last_idx]) - offset).to_numpy()
+        mask &= dates[:, None] > cutoff[None, :]
+    return mask
+
+
+@instrumentacja.traced("technical_signals", "step")
+def technical_signals(panel, tickers=None, period="6mo"):
+    # Odpowiednik analyze_many_from_csv: te same kolumny co analiza_techniczna.csv,
+    # ale liczone jedną serią operacji na tablicach dla całego uniwersum
+    tickers = list(tickers) if tickers is not None else panel.tickers
+    close_df = panel.field("Close").reindex(columns=tickers)
+    volume_df = panel.field("Volume").reindex(columns=tickers)
+    close_raw = close_df.to_numpy(dtype=float)
+    volume_raw = volume_df.to_numpy(dtype=float)
+    mask = period_mask(close_df, period)
+
+    counts = mask.sum(axis=0)
+    has_data = counts > 0
+    if not has_data.any():
+        return pd.DataFrame({"Ticker": tickers, "Error": "Brak danych historycznych"})
+    close = align_right(close_raw[:, has_data], mask[:, has_data])
+    volume = align_right(volume_raw[:, has_data], mask[:, has_data])
+    ind = indicators_last(close, volume, counts[has_data])
+    n = counts[has_data]
+
+    zone = np.where(ind["swing_high"] < 5, "Blisko Swing High",
+                    np.where(ind["swing_low"] < 5, "Blisko Swing Low", "Neutral"))
+    out = pd.DataFrame({
+        "Ticker": np.array(tickers, dtype=object)[has_data],
+        "Last Price": np.round(ind["last"], 2),
+        "30d MA": np.round(ind["ma30"], 2),
+        "Max (60d)": np.round(ind["max60"], 2),
+        "Drop from ATH (%)": np.round(ind["drop_high"], 2),
+        "SMA50": np.round(ind["sma50"], 2),
+        "SMA100": _where_available(ind["sma100"], n >= 100),
+        "SMA200": _where_available(ind["sma200"], n >= 200),
+        "EMA20": np.round(ind["ema20"], 2),
+        "EMA50": np.round(ind["ema50"], 2),
+        "EMA12": np.round(ind["ema12"], 2),
+        "EMA26": np.round(ind["ema26"], 2),
+        "VWAP": np.round(ind["vwap"], 2),
+        "VWAP Diff (%)": np.round(ind["vwap_diff"], 2),
+        "Swing High (%)": np.round(ind["swing_high"], 2),
+        "Swing Low (%)": np.round(ind["swing_low"], 2),
+        "RSI": np.round(ind["rsi"], 2),
+        "Strefa": zone,
+        "EMA Crossover": np.where(ind["ema12"] > ind["ema26"], "Bullish", "Bearish"),
+    }, index=np.flatnonzero(has_data))
+
+    if has_data.all():
+        return out.reset_index(drop=True)
+
+    # Tickery bez notowań dostają wiersz z błędem, jak w fetch_technical_signals
+    missing = np.flatnonzero(~has_data)
+    errors = pd.DataFrame({"Ticker": [tickers[i] for i in missing], "Error": "Brak danych historycznych"},
+                          index=missing)
+    columns = list(out.columns) + ["Error"]
+    if not has_data[0]:
+        columns = ["Ticker", "Error"] + list(out.columns[1:])
+    return pd.concat([out, errors]).sort_index()[columns].reset_index(drop=True)
@@ -0,0 +1,87 @@
+# test_eksport_excel.py
+import os
+import sys
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import pytest
+from openpyxl import load_workbook
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+import eksport_excel  # noqa: E402
+
+
+def report():
+    return pd.DataFrame({
+        "Date": pd.to_datetime(["2025-06-30 00:00:00", "2025-07-01 15:30:00", None]),
+        "Company": ['Kęty <&> "S.A."', "  spacja  ", "zły\x0bznak"],
+        "Ticker": ["KTY.WA", "ABC.WA", "XYZ.WA"],
+        "Price": [612.5, np.nan, 0.1 + 0.2],
+        "Score": pd.array([9, 4, pd.NA], dtype="Int64"),
+        "Volume": np.array([10, 20, 30], dtype=np.int64),
+        "Valuation Status": pd.Categorical(["Undervalued", None, "Overvalued"]),
+        "Fundamental Strength": ["Strong", "Weak", None],
+        "Ocena końcowa": ["Dobra i tania", "Spółka słaba", "Spółka średnia"],
+        "ML_Predicted": [1.0, 0.0, np.nan],
+        "Flag": pd.array([True, False, None], dtype="boolean"),
+        "Mixed": ["N/A", 1.5, None],
+    })
+
+
+def round_trip(tmp_path, df, **kwargs):
+    path = eksport_excel.write_report(df, str(tmp_path / "raport.xlsx"), **kwargs)
+    return load_workbook(path)
+
+
+def values(ws):
+    return [list(row) for row in ws.iter_rows(values_only=True)]
+
+
+def test_values_and_types(tmp_path):
+    df = report()
+    ws = round_trip(tmp_path, df)["Sheet1"]
+    rows = values(ws)
+    assert rows[0] == list(df.columns)
+    assert rows[1] == [datetime(2025, 6, 30), 'Kęty <&> "S.A."', "KTY.WA", 612.5, 9, 10, "Undervalued", "Strong",
+                       "Dobra i tania", 1, True, "N/A"]
+    assert rows[2] == [datetime(2025, 7, 1, 15, 30), "  spacja  ", "ABC.WA", None, 4, 20, None, "Weak",
+                       "Spółka słaba", 0, False, 1.5]
+    assert rows[3] == [None, "złyznak", "XYZ.WA", 0.1 + 0.2, None, 30, "Overvalued", None,
+                       "Spółka średnia", None, None, None]
+    assert ws["A2"].number_format == "yyyy-mm-dd hh:mm:ss"
+
+
+def test_conditional_formatting_ranges(tmp_path):
+    ws = round_trip(tmp_path, report())["Sheet1"]
+    ranges = {str(cf.sqref): [(r.operator, r.formula[0], r.dxf.fill.bgColor.rgb) for r in cf.rules]
+              for cf in ws.conditional_formatting}
+    assert set(ranges) == {"G2:G4", "H2:H4", "I2:I4", "J2:J4"}
+    assert ("equal", '"Undervalued"', "FF00FF00") in ranges["G2:G4"]
+    assert ("equal", '"Dobra i tania"', "FF008000") in ranges["I2:I4"]
+    assert ranges["J2:J4"] == [("equal", "1", "FF00CCFF"), ("notEqual", "1", "FFCCCCCC")]
+    assert len(ranges["H2:H4"]) == len(eksport_excel.COLORS)
+
+
+def test_legend_and_extra_sheets(tmp_path):
+    extra = pd.DataFrame({"Ticker": ["A&B.WA"], "Weight": [0.5]})
+    wb = round_trip(tmp_path, report(), extra_sheets={"Wagi <1>": extra})
+    assert wb.sheetnames == ["Sheet1", "Wagi <1>", "Legenda"]
+    assert values(wb["Wagi <1>"]) == [["Ticker", "Weight"], ["A&B.WA", 0.5]]
+    legend = [row[0] for row in values(wb["Legenda"])]
+    assert legend == [row[0] if row else None for row in eksport_excel.LEGEND]
+    assert not round_trip(tmp_path, report(), legend=False).sheetnames.count("Legenda")
+
+
+@pytest.mark.parametrize("df", [pd.DataFrame(), pd.DataFrame({"Ticker": [], "Ocena końcowa": []})])
+def test_empty_frames(tmp_path, df):
+    wb = round_trip(tmp_path, df)
+    assert values(wb["Sheet1"]) == ([list(df.columns)] if len(df.columns) else [])
+    assert wb.sheetnames == ["Sheet1", "Legenda"]
+    assert not list(wb["Sheet1"].conditional_formatting)
+
+
+def test_column_widths():
+    df = pd.DataFrame({"Ticker": ["AB", "ABCDEFGHIJ"], "P/E": [12.5, np.nan]})
+    assert eksport_excel.column_widths(df) == [12, 6]
@@ -0,0 +1,41 @@
+# test_konstrukcja_portfela.py
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+import konstrukcja_portfela as kp  # noqa: E402
+
+
+def covariance(n, seed=0):
+    # Zwroty z kilku czynników rynkowych i szumu własnego spółek
+    rng = np.random.default_rng(seed)
+    returns = rng.normal(0, 0.01, (300, 4)) @ rng.normal(0, 1, (4, n)) + \
+        rng.normal(0, 0.015, (300, n)) * rng.uniform(0.5, 2, n)
+    return kp.shrunk_covariance(returns)[0]
+
+
+def reference(cov, linear, cap):
+    # Sam gradient rzutowany, bez limitu iteracji praktycznie zbieżny
+    return kp._projected_gradient(cov, linear, cap, kp.project_capped_simplex(np.full(len(cov), 1.0 / len(cov)), cap),
+                                  100_000, 1e-15)
+
+
+@pytest.mark.parametrize("n, cap, tilt", [(10, 0.3, 0.0), (60, 0.1, 0.0), (200, 0.1, 0.0), (200, 0.02, 5.0)])
+def test_capped_qp_matches_projected_gradient(n, cap, tilt):
+    cov = covariance(n)
+    scores = np.random.default_rng(1).normal(0, 1, n)
+    w = kp.score_tilted(cov, scores, cap, tilt)
+    linear = tilt * (scores - scores.mean()) / scores.std() * np.mean(np.diag(cov))
+    expected = reference(cov, linear, cap)
+    assert w.sum() == pytest.approx(1.0)
+    assert w.min() >= 0 and w.max() <= cap + 1e-12
+    np.testing.assert_allclose(w, expected, atol=1e-6)
+
+
+def test_warm_start_gives_same_weights():
+    cov, other = covariance(100), covariance(100, seed=2)
+    np.testing.assert_allclose(kp.min_variance(cov, w0=kp.min_variance(other)), kp.min_variance(cov), atol=1e-10)
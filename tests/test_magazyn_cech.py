@@ -0,0 +1,67 @@
+# test_magazyn_cech.py
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+import instrumentacja  # noqa: E402
+import magazyn_cech  # noqa: E402
+import schemat_danych  # noqa: E402
+
+DATE = "2025-06-30"
+
+
+def scored(n=50, seed=0):
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({"Ticker": [f"T{i:03d}.WA" for i in range(n)]})
+    for f in magazyn_cech.FEATURES:
+        if f in schemat_danych.CATEGORIES:
+            df[f] = pd.Categorical(rng.choice(schemat_danych.CATEGORIES[f], n),
+                                   categories=schemat_danych.CATEGORIES[f])
+        else:
+            df[f] = np.where(rng.random(n) < 0.1, np.nan, rng.normal(20, 10, n))
+    return df
+
+
+@pytest.fixture
+def stale_count():
+    instrumentacja.tracer.reset()
+    instrumentacja.tracer.enabled = True
+    yield lambda: instrumentacja.tracer.counters.get("feature_store.stale", 0)
+    instrumentacja.tracer.enabled = False
+
+
+def test_snapshot_reuses_block_written_from_same_frame(tmp_path, stale_count):
+    store = magazyn_cech.FeatureStore(str(tmp_path))
+    df = scored()
+    store.write(DATE, df)
+    df.to_parquet(tmp_path / "ocena.parquet", index=False)
+    block = store.snapshot(pd.read_parquet(tmp_path / "ocena.parquet"), DATE)
+    assert stale_count() == 0
+    expected = magazyn_cech.encode(df, date=DATE)
+    np.testing.assert_array_equal(block.values, expected.values)
+    np.testing.assert_array_equal(block.codes, expected.codes)
+
+
+@pytest.mark.parametrize("change", ["value", "category", "ticker"])
+def test_snapshot_rewrites_changed_frame(tmp_path, stale_count, change):
+    store = magazyn_cech.FeatureStore(str(tmp_path))
+    df = scored()
+    store.write(DATE, df)
+    df = df.copy()
+    if change == "value":
+        df.loc[3, "RSI"] = 99.0
+    elif change == "category":
+        df.loc[3, "Strefa"] = [c for c in schemat_danych.CATEGORIES["Strefa"] if c != df.loc[3, "Strefa"]][0]
+    else:
+        df.loc[3, "Ticker"] = "NOWY.WA"
+    block = store.snapshot(df, DATE)
+    assert stale_count() == 1
+    np.testing.assert_array_equal(block.values, magazyn_cech.encode(df, date=DATE).values)
+    np.testing.assert_array_equal(block.codes, magazyn_cech.encode(df, date=DATE).codes)
+    store.snapshot(df, DATE)
+    assert stale_count() == 1
@@ -0,0 +1,46 @@
+# test_podobienstwo.py
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+import podobienstwo  # noqa: E402
+
+WINDOW = 60
+
+
+def price_windows():
+    # Zapytanie Q i grupa G1, G2 o tym samym przebiegu na innych poziomach cen;
+    # OUT na poziomie ceny Q, ale z innym przebiegiem
+    rng = np.random.default_rng(1)
+    path = np.cumsum(rng.normal(0, 0.02, WINDOW))
+    rows = [
+        np.log(100) + path,
+        np.log(5) + path + rng.normal(0, 0.002, WINDOW),
+        np.log(400) + path + rng.normal(0, 0.002, WINDOW),
+        np.log(100) + np.cumsum(rng.normal(0, 0.02, WINDOW)),
+    ]
+    return podobienstwo.SimilarityIndex(["Q", "G1", "G2", "OUT"], np.array(rows), WINDOW, "prices")
+
+
+@pytest.mark.parametrize("metric", podobienstwo.METRICS)
+def test_group_ranks_above_outsider_at_same_price_level(metric):
+    ranked = price_windows().neighbours("Q", k=3, metric=metric)
+    assert list(ranked["Ticker"]) == ["G1", "G2", "OUT"]
+
+
+def test_euclidean_matches_correlation():
+    index = price_windows()
+    rows = np.arange(len(index))
+    correlation = index.scores(rows, "correlation")
+    distance = index.scores(rows, "euclidean")
+    np.testing.assert_allclose(distance, np.sqrt(np.maximum(2 - 2 * correlation, 0)), atol=1e-3)
+
+
+def test_pattern_ignores_price_level():
+    index = price_windows()
+    pattern = index.z[0] * 3 + np.log(50)
+    assert index.similar_to_pattern(pattern, k=1, metric="euclidean")["Ticker"].iloc[0] == "Q"
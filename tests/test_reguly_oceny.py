@@ -0,0 +1,80 @@
+# test_reguly_oceny.py
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+import reguly_oceny  # noqa: E402
+
+
+# Wierszowe klasyfikacje sprzed reguly_oceny (scalona_ocena.py), dane z "N/A" jako brakiem
+def classify_fundamental_old(row):
+    if row["P/E"] != "N/A" and float(row["P/E"]) < 25 and \
+       row["ROE (%)"] != "N/A" and float(row["ROE (%)"]) > 15 and \
+       row["Debt/Assets"] != "N/A" and float(row["Debt/Assets"]) < 0.5:
+        return "Strong"
+    elif row["P/E"] != "N/A" or row["ROE (%)"] != "N/A" or row["Debt/Assets"] != "N/A":
+        return "Medium"
+    else:
+        return "Weak"
+
+
+def classify_valuation_old(row):
+    try:
+        rsi = float(row["RSI"]) if row.get("RSI", "N/A") != "N/A" else None
+        drop = float(row["Drop from ATH (%)"]) if row.get("Drop from ATH (%)", "N/A") != "N/A" else None
+        if rsi and rsi < 30 or (drop and drop > 20):
+            return "Undervalued"
+        elif rsi and rsi > 70:
+            return "Overvalued"
+        else:
+            return "Fairly Valued"
+    except Exception:
+        return "Unknown"
+
+
+def frames(n=400, seed=0):
+    # Ta sama próbka w dwóch zapisach: stary ("N/A" w kolumnach tekstowych) i nowy (float64 z NaN)
+    rng = np.random.default_rng(seed)
+    values = {
+        "P/E": rng.uniform(0, 50, n),
+        "ROE (%)": rng.uniform(-10, 40, n),
+        "Debt/Assets": rng.uniform(0, 1, n),
+        "RSI": np.where(rng.random(n) < 0.1, 0.0, rng.uniform(0, 100, n)),
+        "Drop from ATH (%)": rng.uniform(0, 60, n),
+    }
+    typed = pd.DataFrame({field: np.where(rng.random(n) < 0.4, np.nan, column)
+                          for field, column in values.items()})
+    # Wiersze bez żadnych danych fundamentalnych
+    typed.loc[:19, ["P/E", "ROE (%)", "Debt/Assets"]] = np.nan
+    legacy = typed.astype(object).where(typed.notna(), "N/A")
+    return legacy, typed
+
+
+@pytest.mark.parametrize("layout", ["legacy", "typed"])
+def test_fundamental_strength_matches_row_wise(layout):
+    legacy, typed = frames()
+    expected = legacy.apply(classify_fundamental_old, axis=1).to_numpy()
+    df = legacy if layout == "legacy" else typed
+    result = reguly_oceny.classify_fundamental_frame(df).to_numpy()
+    np.testing.assert_array_equal(result, expected)
+    assert (result[:20] == "Weak").all()
+
+
+@pytest.mark.parametrize("layout", ["legacy", "typed"])
+def test_valuation_status_matches_row_wise(layout):
+    legacy, typed = frames(seed=1)
+    expected = legacy.apply(classify_valuation_old, axis=1).to_numpy()
+    df = legacy if layout == "legacy" else typed
+    np.testing.assert_array_equal(reguly_oceny.classify_valuation_frame(df).to_numpy(), expected)
+
+
+def test_text_values_are_unknown_but_missing_values_are_not():
+    df = pd.DataFrame({"RSI": ["abc", "N/A", np.nan, None, "25"], "Drop from ATH (%)": [5, 5, 5, 5, 5]})
+    expected = df.apply(classify_valuation_old, axis=1).tolist()
+    assert reguly_oceny.classify_valuation_frame(df).tolist() == expected
+    assert expected[0] == "Unknown" and expected[4] == "Undervalued"
@@ -0,0 +1,34 @@
+# test_rejestr_modeli.py
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+import rejestr_modeli  # noqa: E402
+
+FEATURES = ["P/E", "RSI"]
+
+
+def training_data(seed):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame(rng.normal(size=(40, 2)), columns=FEATURES), rng.integers(0, 2, 40)
+
+
+def test_latest_follows_model_loaded_from_registry(tmp_path):
+    model_dir = str(tmp_path)
+    params = {"n_estimators": 5}
+    _, first = rejestr_modeli.load_or_train(*training_data(0), FEATURES, params, model_dir)
+    _, second = rejestr_modeli.load_or_train(*training_data(1), FEATURES, params, model_dir)
+    assert rejestr_modeli.load_latest(model_dir)[1]["key"] == second
+
+    # Ponowna ocena na danych pierwszego modelu – bez uczenia, ale latest.json wskazuje ten model
+    _, key = rejestr_modeli.load_or_train(*training_data(0), FEATURES, params, model_dir)
+    assert key == first
+    pipeline, meta = rejestr_modeli.load_latest(model_dir)
+    assert meta["key"] == first and meta["rows"] == 40
+    X, _ = training_data(0)
+    expected, _ = rejestr_modeli.load_or_train(*training_data(0), FEATURES, params, model_dir)
+    np.testing.assert_array_equal(pipeline.predict_proba(X), expected.predict_proba(X))
@@ -0,0 +1,49 @@
+# test_tryb_obserwacji.py
+import asyncio
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+import tryb_obserwacji  # noqa: E402
+
+
+class Session:
+    # Minimalna sesja: liczy notowania i przeliczenia
+
+    def __init__(self):
+        self.updates = 0
+        self.rescores = 0
+
+    def apply(self, quote):
+        self.updates += 1
+
+    def rescore(self):
+        self.rescores += 1
+
+
+class Source:
+    def __init__(self, quotes, error=None):
+        self.quotes = quotes
+        self.error = error
+
+    async def updates(self):
+        for quote in self.quotes:
+            yield quote
+        if self.error is not None:
+            raise self.error
+
+
+def test_watch_applies_all_quotes():
+    session = asyncio.run(tryb_obserwacji.watch(Source(range(100)), Session(), interval=0.01))
+    assert session.updates == 100
+
+
+@pytest.mark.parametrize("error", [FileNotFoundError("missing.csv"), KeyError("Price")])
+def test_watch_reraises_source_error(error):
+    session = Session()
+    with pytest.raises(type(error)):
+        asyncio.run(tryb_obserwacji.watch(Source(range(3), error), session, interval=0.01))
+    assert session.updates == 3
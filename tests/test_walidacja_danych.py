@@ -0,0 +1,29 @@
+# test_walidacja_danych.py
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+import walidacja_danych  # noqa: E402
+
+
+@pytest.mark.parametrize("columns", [["RSI"], ["Price", "RSI"], ["Price", "P/E"]])
+def test_absent_key_fields_are_not_missing_values(columns):
+    # Ramka bez części pól kluczowych (analiza techniczna, tryb obserwacji): sprawdzane tylko obecne
+    df = pd.DataFrame({"Ticker": ["A.WA", "B.WA"], **{c: [10.0, 20.0] for c in columns}})
+    status, alerts = walidacja_danych.check_rules(df)
+    assert status.tolist() == ["OK", "OK"]
+    assert alerts.empty
+
+
+def test_present_key_field_with_missing_value():
+    df = pd.DataFrame({"Ticker": ["A.WA", "B.WA", "C.WA"], "Price": [10.0, np.nan, "N/A"],
+                       "P/E": [150.0, 12.0, 12.0]})
+    status, alerts = walidacja_danych.check_rules(df)
+    assert status.tolist() == ["Do sprawdzenia", "Błędne dane", "Błędne dane"]
+    assert alerts[["Ticker", "Problem"]].values.tolist() == [
+        ["B.WA", "Brak danych: Price"], ["C.WA", "Brak danych: Price"], ["A.WA", "Podejrzane P/E"]]